@@ -0,0 +1,360 @@
+"""
+Benchmarks the functions in server/database.py against synthetic
+inventories of different sizes and storage configurations.
+
+Usage:
+    python -m benchmarks.bench_database --sizes 10000,100000 \\
+        --configs wal-normal,delete-full --output results.json
+    python -m benchmarks.bench_database --compare before.json after.json
+
+Every combination of size and configuration gets a fresh database seeded
+with the requested number of items. Each function is then called
+repeatedly and its throughput and latency percentiles are recorded.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from sqlalchemy import insert
+from server import database, serialization
+from server.config import StorageConfig
+from .stats import summarize
+
+# Storage configurations that can be benchmarked, by name
+STORAGE_CONFIGS = {
+    "wal-normal": StorageConfig(),
+    "wal-full": StorageConfig(synchronous="FULL"),
+    "delete-full": StorageConfig(journal_mode="DELETE", synchronous="FULL"),
+    "memory": StorageConfig(url="sqlite://"),
+}
+
+SEED_CHUNK_SIZE = 10000
+
+
+def item_name(index: int):
+    """Return the name of the `index`-th seeded item."""
+    return f"Bench Item {index:08d}"
+
+
+def seed_inventory(size: int, rng: random.Random):
+    """
+    Fill the items table with `size` synthetic items.
+    Rows are inserted directly in large chunks rather than through
+    `add_item`, so seeding a million rows takes seconds.
+    Args:
+        size (int): The number of items.
+        rng (random.Random): The source of item quantities.
+    """
+    with database.engine.begin() as connection:
+        for start in range(0, size, SEED_CHUNK_SIZE):
+            connection.execute(insert(database.Item), [
+                {"name": item_name(i), "quantity": rng.randint(0, 1000)}
+                for i in range(start, min(start + SEED_CHUNK_SIZE, size))
+            ])
+
+
+def time_calls(func, arguments: list):
+    """
+    Call a function once per argument tuple and time each call.
+    Args:
+        func (callable): The function to benchmark.
+        arguments (list): One tuple of positional arguments per call.
+    Returns:
+        dict: The summary from `stats.summarize`.
+    """
+    durations = []
+    for args in arguments:
+        start = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def run_suite(size: int, operations: int, scans: int, rng: random.Random):
+    """
+    Benchmark every database function on the current database.
+    Args:
+        size (int): The number of seeded items.
+        operations (int): Calls per single-item function.
+        scans (int): Calls per function that reads the whole inventory.
+        rng (random.Random): The source of item choices.
+    Returns:
+        dict: One summary per function name.
+    """
+    existing = [item_name(rng.randrange(size)) for _ in range(operations)]
+    new = [f"Bench New {i:08d}" for i in range(operations)]
+    page_size = 100
+    results = {}
+
+    results["add_item"] = time_calls(
+        database.add_item, [(name, 1) for name in new]
+    )
+    results["update_quantity"] = time_calls(
+        database.update_quantity,
+        [(name, rng.randint(0, 1000)) for name in existing]
+    )
+    results["adjust_quantity"] = time_calls(
+        database.adjust_quantity,
+        [(name, rng.choice((-1, 1)), -1000) for name in existing]
+    )
+    results["remove_item"] = time_calls(
+        database.remove_item, [(name,) for name in new]
+    )
+    results["get_inventory_page"] = time_calls(
+        lambda cursor: database.get_inventory_page(page_size, cursor),
+        [
+            (database.encode_cursor(item_name(rng.randrange(size)), 0),)
+            for _ in range(operations)
+        ]
+    )
+    results["get_inventory_page_contains"] = time_calls(
+        lambda q: database.get_inventory_page(
+            page_size, q=q, match="contains"
+        ),
+        [(f"{rng.randrange(1000):03d}",) for _ in range(max(1, scans))]
+    )
+    results["search_items"] = time_calls(
+        database.search_items,
+        [(f"item {rng.randrange(size):08d}"[:-2],) for _ in range(operations)]
+    )
+    results["search_items_fuzzy"] = time_calls(
+        database.search_items,
+        [(f"Bnech Itme {rng.randrange(size):08d}",)
+         for _ in range(max(1, scans))]
+    )
+    results["get_changes_since"] = time_calls(
+        database.get_changes_since,
+        [(max(0, database.get_revision() - operations),)] * operations
+    )
+    batches = [
+        [
+            {"op": "update", "name": item_name(rng.randrange(size)),
+             "quantity": rng.randint(0, 1000)}
+            for _ in range(page_size)
+        ]
+        for _ in range(max(1, operations // page_size))
+    ]
+    results["apply_batch_100"] = time_calls(
+        database.apply_batch, [(batch,) for batch in batches]
+    )
+    results["upsert_items_100"] = time_calls(
+        database.upsert_items,
+        [
+            ([(op["name"], op["quantity"] + 1) for op in batch],)
+            for batch in batches
+        ]
+    )
+    results["get_inventory"] = time_calls(
+        database.get_inventory, [()] * scans
+    )
+    results["get_inventory_rows"] = time_calls(
+        database.get_inventory_rows, [()] * scans
+    )
+    return results
+
+
+def benchmark_database(directory: str, config_name: str, size: int,
+                       operations: int, scans: int, seed: int):
+    """
+    Seed a fresh database and run the suite on it.
+    Args:
+        directory (str): Where file-backed databases are created.
+        config_name (str): A key of `STORAGE_CONFIGS`.
+        size (int): The number of items to seed.
+        operations (int): Calls per single-item function.
+        scans (int): Calls per whole-inventory function.
+        seed (int): Random seed, for reproducible runs.
+    Returns:
+        list: One result dict per function.
+    """
+    config = STORAGE_CONFIGS[config_name]
+    if not config.is_memory:
+        path = os.path.join(directory, f"{config_name}-{size}.db")
+        config = replace(config, url=f"sqlite:///{path}")
+    rng = random.Random(seed)
+    database.configure_database(config)
+    database.create_tables()
+
+    start = time.perf_counter()
+    seed_inventory(size, rng)
+    print(
+        f"{config_name} / {size} items "
+        f"(seeded in {time.perf_counter() - start:.1f}s)", file=sys.stderr
+    )
+
+    results = []
+    for function, summary in run_suite(size, operations, scans, rng).items():
+        results.append({
+            "config": config_name, "size": size, "function": function,
+            **summary
+        })
+        print(
+            f"  {function:<28} {summary['ops_per_sec']:>10.1f} ops/s  "
+            f"p50 {summary['p50_ms']:.3f} ms  p99 {summary['p99_ms']:.3f} ms",
+            file=sys.stderr
+        )
+    return results
+
+
+def benchmark(sizes: list, config_names: list, operations: int,
+              scans: int, seed: int):
+    """
+    Run the suite for every combination of inventory size and storage
+    configuration, each on a fresh database.
+    Args:
+        sizes (list): Inventory sizes to seed.
+        config_names (list): Keys of `STORAGE_CONFIGS`.
+        operations (int): Calls per single-item function.
+        scans (int): Calls per whole-inventory function.
+        seed (int): Random seed, for reproducible runs.
+    Returns:
+        list: One result dict per configuration, size and function.
+    """
+    original = database.storage_config
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for config_name in config_names:
+                for size in sizes:
+                    results.extend(benchmark_database(
+                        directory, config_name, size, operations, scans,
+                        seed
+                    ))
+        finally:
+            # Release the benchmark databases before they are deleted
+            database.configure_database(original)
+    return results
+
+
+def environment():
+    """
+    Describe the machine and code the benchmark ran on.
+    Returns:
+        dict: The commit, Python and SQLite versions, the JSON encoder the
+              server uses, platform and time.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "json_encoder": serialization.ENCODER,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(before: dict, after: dict, threshold: float):
+    """
+    Compare the throughput of two benchmark runs.
+    Args:
+        before (dict): The baseline results file.
+        after (dict): The new results file.
+        threshold (float): The fractional slowdown reported as a
+                           regression, e.g. 0.1 for 10%.
+    Returns:
+        list: Lines describing each result present in both runs, with
+              regressions marked.
+    """
+    baseline = {
+        (r["config"], r["size"], r["function"]): r for r in before["results"]
+    }
+    lines = []
+    for result in after["results"]:
+        key = (result["config"], result["size"], result["function"])
+        if key not in baseline or not baseline[key]["ops_per_sec"]:
+            continue
+        ratio = result["ops_per_sec"] / baseline[key]["ops_per_sec"]
+        marker = "  REGRESSION" if ratio < 1 - threshold else ""
+        lines.append(
+            f"{key[0]:<12} {key[1]:>9} {key[2]:<28} "
+            f"{ratio:>6.2f}x{marker}"
+        )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark server/database.py functions."
+    )
+    parser.add_argument(
+        "--sizes", default="10000,100000",
+        help="Comma-separated inventory sizes (default: 10000,100000)."
+    )
+    parser.add_argument(
+        "--configs", default="wal-normal,delete-full",
+        help="Comma-separated storage configurations: "
+             f"{', '.join(STORAGE_CONFIGS)} (default: wal-normal,delete-full)."
+    )
+    parser.add_argument(
+        "--operations", type=int, default=1000,
+        help="Calls per single-item function (default: 1000)."
+    )
+    parser.add_argument(
+        "--scans", type=int, default=5,
+        help="Calls per whole-inventory function (default: 5)."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", help="Write the results to this JSON file."
+    )
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+        help="Compare two results files instead of running."
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="Slowdown reported as a regression by --compare "
+             "(default: 0.1)."
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        lines = compare(before, after, args.threshold)
+        print("\n".join(lines))
+        return 1 if any(line.endswith("REGRESSION") for line in lines) else 0
+
+    config_names = [name.strip() for name in args.configs.split(",")]
+    unknown = set(config_names) - set(STORAGE_CONFIGS)
+    if unknown:
+        parser.error(f"Unknown configurations: {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            "sizes": sizes, "configs": config_names,
+            "operations": args.operations, "scans": args.scans,
+            "seed": args.seed
+        },
+        "results": benchmark(
+            sizes, config_names, args.operations, args.scans, args.seed
+        ),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
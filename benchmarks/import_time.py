@@ -0,0 +1,158 @@
+"""
+Measures how long a fresh interpreter takes to import the project's entry
+modules, and checks them against import-time budgets.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --modules server,server.app --repeat 9
+    python -m benchmarks.import_time --enforce
+
+Every import runs in a new interpreter, so nothing is cached between
+measurements; the median of --repeat runs is reported. With --enforce the
+exit status is 1 if a module exceeds its budget or loads a dependency it
+must not load.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Seconds each module may take to import, measured in a fresh interpreter.
+# The light modules are imported by tools and by the GUI process, which
+# should not pay for the server stack or Qt. server.app measures about
+# 0.95 s, nearly all of it FastAPI and SQLAlchemy.
+IMPORT_BUDGETS = {
+    "server": 0.05,
+    "server.config": 0.05,
+    "server.metrics": 0.05,
+    "ui": 0.05,
+    "server.app": 1.2,
+}
+
+# Heavy dependencies each module must not load
+FORBIDDEN_IMPORTS = {
+    "server": ("fastapi", "sqlalchemy", "uvicorn", "numpy"),
+    "server.config": ("fastapi", "sqlalchemy", "pydantic"),
+    "server.metrics": ("fastapi", "sqlalchemy", "pydantic"),
+    "ui": ("PyQt6", "requests"),
+    "server.app": ("uvicorn", "PyQt6", "numpy"),
+}
+
+# Run in the child interpreter: time one import and list what it loaded
+_MEASURE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure(module: str, repeat: int = 5):
+    """
+    Import a module in `repeat` fresh interpreters.
+    Args:
+        module (str): The dotted module name.
+        repeat (int): The number of interpreters to start.
+    Returns:
+        dict: The median and minimum import time in seconds, and the
+              top-level packages loaded by the import.
+    Raises:
+        RuntimeError: If the module cannot be imported.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _MEASURE, module], cwd=root,
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Importing {module} failed:\n{result.stderr.strip()}"
+            )
+        sample = json.loads(result.stdout)
+        timings.append(sample["seconds"])
+    return {
+        "module": module,
+        "median_seconds": round(statistics.median(timings), 4),
+        "min_seconds": round(min(timings), 4),
+        "packages": sorted({
+            name.split(".")[0] for name in sample["modules"]
+        }),
+    }
+
+
+def check(result: dict, timing: bool = True):
+    """
+    Compare a measurement with the module's budget and forbidden imports.
+    Args:
+        result (dict): A result from `measure`.
+        timing (bool): Whether to check the budget; forbidden imports are
+                       always checked.
+    Returns:
+        list: Descriptions of every violation; empty if there are none.
+    """
+    module = result["module"]
+    problems = []
+    budget = IMPORT_BUDGETS.get(module)
+    if (timing and budget is not None
+            and result["median_seconds"] > budget):
+        problems.append(
+            f"{module} took {result['median_seconds'] * 1000:.0f} ms to "
+            f"import, over its {budget * 1000:.0f} ms budget"
+        )
+    for package in FORBIDDEN_IMPORTS.get(module, ()):
+        if package in result["packages"]:
+            problems.append(f"{module} imports {package}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure import times of the project's modules."
+    )
+    parser.add_argument(
+        "--modules", default=",".join(IMPORT_BUDGETS),
+        help="Comma-separated modules to import (default: every module "
+             "with a budget)."
+    )
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Fresh interpreters per module (default: 5).")
+    parser.add_argument("--enforce", action="store_true",
+                        help="Exit with status 1 if a budget is exceeded.")
+    parser.add_argument("--output", help="Write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = []
+    problems = []
+    for module in args.modules.split(","):
+        result = measure(module.strip(), args.repeat)
+        result["problems"] = check(result)
+        results.append(result)
+        problems.extend(result["problems"])
+        budget = IMPORT_BUDGETS.get(result["module"])
+        print(
+            f"{result['module']:<16} {result['median_seconds'] * 1000:>8.1f} "
+            f"ms" + (f"  (budget {budget * 1000:.0f} ms)" if budget else ""),
+            file=sys.stderr
+        )
+    for problem in problems:
+        print(f"  {problem}", file=sys.stderr)
+
+    report = {"results": [
+        {key: value for key, value in result.items() if key != "packages"}
+        for result in results
+    ]}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 1 if args.enforce and problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""
+Drives the FastAPI server with simulated Blender plugin and GUI seats.
+
+Usage:
+    python -m benchmarks.load_test --plugins 20 --guis 5 --duration 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 \\
+        --plugins 10 --guis 2 --stages 1,2,4,8 --max-p99 500
+
+Without --url the app from server/app.py is served in-process through
+httpx's ASGI transport, against a temporary database. Each stage runs the
+base seat counts multiplied by the stage factor for --duration seconds;
+ramping stops at the first stage whose p99 latency or error rate exceeds
+the given limits, and the last stage within them is reported as the
+saturation point.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+import httpx
+from .stats import summarize
+
+# Page sizes used by the clients
+PLUGIN_PAGE_SIZE = 100
+GUI_PAGE_SIZE = 10
+
+# Statuses that are normal answers rather than errors
+EXPECTED_STATUSES = {200, 201, 304, 409}
+
+
+class Recorder:
+    """Collects the latency and outcome of every request in a stage."""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str,
+                      method: str, url: str, **kwargs):
+        """
+        Send a request and record its latency under `endpoint`.
+        Returns:
+            httpx.Response: The response, or None if the request failed.
+        """
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.durations[endpoint].append(time.perf_counter() - start)
+        if response is None or response.status_code not in EXPECTED_STATUSES:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, elapsed: float):
+        """
+        Summarize the stage per endpoint and overall.
+        Args:
+            elapsed (float): The wall-clock duration of the stage.
+        Returns:
+            dict: Per-endpoint summaries with an 'error_rate', plus a
+                  'total' entry across all endpoints.
+        """
+        report = {}
+        everything = []
+        for endpoint, durations in sorted(self.durations.items()):
+            everything.extend(durations)
+            report[endpoint] = {
+                **summarize(durations, elapsed),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(durations), 4),
+            }
+        errors = sum(self.errors.values())
+        report["total"] = {
+            **summarize(everything, elapsed),
+            "errors": errors,
+            "error_rate": round(errors / len(everything), 4)
+            if everything else 0.0,
+        }
+        return report
+
+
+async def plugin_seat(client, recorder, stop: asyncio.Event, items: int,
+                      poll_interval: float, transform_interval: float,
+                      burst: int, rng: random.Random):
+    """
+    Simulate one Blender plugin: poll the first inventory page with
+    If-None-Match on the plugin's timer, and every `transform_interval`
+    seconds send a burst of /transform requests, as when an artist drags
+    an object around.
+    """
+    etag = None
+    next_burst = time.monotonic() + rng.uniform(0, transform_interval)
+    # Start at a random point of the timer so that seats do not poll in step
+    await asyncio.sleep(rng.uniform(0, poll_interval))
+    while not stop.is_set():
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await recorder.request(
+            client, "GET /get_inventory (plugin)", "GET", "/get_inventory",
+            params={"limit": PLUGIN_PAGE_SIZE}, headers=headers
+        )
+        if response is not None and response.status_code == 200:
+            etag = response.headers.get("ETag")
+
+        if time.monotonic() >= next_burst:
+            name = f"Load Object {rng.randrange(items)}"
+            for step in range(burst):
+                await recorder.request(
+                    client, "POST /transform", "POST", "/transform",
+                    json={"object": name, "transform": {
+                        "position": [step * 0.1, rng.random(), 0],
+                        "rotation": [0, 0, step],
+                        "scale": [1, 1, 1],
+                    }}
+                )
+            next_burst = time.monotonic() + transform_interval
+
+        try:
+            await asyncio.wait_for(stop.wait(), poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def gui_seat(client, recorder, stop: asyncio.Event, items: int,
+                   interval: float, rng: random.Random):
+    """
+    Simulate one GUI user: browse a page of the inventory, then buy or
+    return one unit of an item, every `interval` seconds on average.
+    """
+    await asyncio.sleep(rng.uniform(0, interval))
+    while not stop.is_set():
+        await recorder.request(
+            client, "GET /get_inventory (gui)", "GET", "/get_inventory",
+            params={
+                "limit": GUI_PAGE_SIZE,
+                "q": f"Load Item {rng.randrange(10)}"
+            }
+        )
+        await recorder.request(
+            client, "POST /adjust-quantity", "POST", "/adjust-quantity",
+            json={"name": f"Load Item {rng.randrange(items)}",
+                  "delta": rng.choice((-1, 1)), "min": 0}
+        )
+        try:
+            await asyncio.wait_for(
+                stop.wait(), rng.uniform(0.5 * interval, 1.5 * interval)
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_stage(client, plugins: int, guis: int, duration: float,
+                    args, seed: int):
+    """
+    Run the given numbers of seats for `duration` seconds.
+    Returns:
+        dict: The stage report from `Recorder.report`.
+    """
+    recorder = Recorder()
+    stop = asyncio.Event()
+    rng = random.Random(seed)
+    seats = [
+        plugin_seat(
+            client, recorder, stop, args.items, args.poll_interval,
+            args.transform_interval, args.burst,
+            random.Random(rng.random())
+        )
+        for _ in range(plugins)
+    ] + [
+        gui_seat(
+            client, recorder, stop, args.items, args.gui_interval,
+            random.Random(rng.random())
+        )
+        for _ in range(guis)
+    ]
+    tasks = [asyncio.create_task(seat) for seat in seats]
+    start = time.perf_counter()
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return recorder.report(time.perf_counter() - start)
+
+
+async def seed_inventory(client, items: int):
+    """Create the items the seats buy and return through the import."""
+    body = "".join(
+        json.dumps({"name": f"Load Item {i}", "quantity": 1000}) + "\n"
+        for i in range(items)
+    )
+    response = await client.post("/inventory/import", content=body)
+    response.raise_for_status()
+
+
+def in_process_client(args):
+    """
+    Serve server/app.py in-process against a temporary database.
+    Returns:
+        tuple: The client and a function that restores the original
+               database and removes the temporary one.
+    """
+    from dataclasses import replace
+    from server import database, latency
+    from server.app import app
+    from server.request_log import request_logger
+
+    original = database.storage_config
+    directory = tempfile.TemporaryDirectory()
+    database.configure_database(replace(
+        database.storage_config,
+        url=f"sqlite:///{os.path.join(directory.name, 'load.db')}"
+    ))
+    database.create_tables()
+    latency.set_latency_profile(latency.load_latency_profile(
+        {"DCC_LATENCY_PROFILE": args.latency_profile}
+    ))
+    request_logger.default_rate = args.log_sample_rate
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://load-test", timeout=args.timeout
+    )
+
+    def cleanup():
+        database.configure_database(original)
+        directory.cleanup()
+
+    return client, cleanup
+
+
+def print_stage(stage: dict):
+    print(
+        f"\nStage x{stage['factor']}: {stage['plugins']} plugin seats, "
+        f"{stage['guis']} GUI seats", file=sys.stderr
+    )
+    for endpoint, summary in stage["endpoints"].items():
+        print(
+            f"  {endpoint:<30} {summary['ops_per_sec']:>8.1f} req/s  "
+            f"p50 {summary['p50_ms']:>8.1f} ms  "
+            f"p95 {summary['p95_ms']:>8.1f} ms  "
+            f"p99 {summary['p99_ms']:>8.1f} ms  "
+            f"errors {summary['error_rate']:.2%}",
+            file=sys.stderr
+        )
+
+
+async def run(args):
+    """
+    Seed the inventory and run every stage of the ramp.
+    Returns:
+        dict: The report, with one entry per stage that ran and the
+              factor of the last stage within the limits.
+    """
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        cleanup = None
+    else:
+        client, cleanup = in_process_client(args)
+
+    stages = []
+    saturation = None
+    try:
+        async with client:
+            await seed_inventory(client, args.items)
+            for index, factor in enumerate(args.stages):
+                plugins, guis = args.plugins * factor, args.guis * factor
+                endpoints = await run_stage(
+                    client, plugins, guis, args.duration, args,
+                    args.seed + index
+                )
+                stage = {
+                    "factor": factor, "plugins": plugins, "guis": guis,
+                    "endpoints": endpoints,
+                }
+                stages.append(stage)
+                print_stage(stage)
+
+                total = endpoints["total"]
+                if (total["p99_ms"] > args.max_p99
+                        or total["error_rate"] > args.max_error_rate):
+                    break
+                saturation = factor
+    finally:
+        if cleanup is not None:
+            cleanup()
+
+    return {
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key != "output"
+        },
+        "stages": stages,
+        "last_healthy_factor": saturation,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate plugin and GUI seats against the server."
+    )
+    parser.add_argument(
+        "--url", help="Server to load; defaults to an in-process app."
+    )
+    parser.add_argument("--plugins", type=int, default=10,
+                        help="Plugin seats in the first stage.")
+    parser.add_argument("--guis", type=int, default=2,
+                        help="GUI seats in the first stage.")
+    parser.add_argument(
+        "--stages", default="1",
+        help="Comma-separated seat multipliers to ramp through, e.g. 1,2,4."
+    )
+    parser.add_argument("--duration", type=float, default=30,
+                        help="Seconds per stage.")
+    parser.add_argument("--items", type=int, default=1000,
+                        help="Items seeded before the run.")
+    parser.add_argument(
+        "--poll-interval", type=float, default=10,
+        help="Seconds between plugin inventory polls (the plugin's "
+             "fallback timer)."
+    )
+    parser.add_argument("--transform-interval", type=float, default=5,
+                        help="Seconds between a plugin's transform bursts.")
+    parser.add_argument("--burst", type=int, default=5,
+                        help="Transform requests per burst.")
+    parser.add_argument("--gui-interval", type=float, default=3,
+                        help="Mean seconds between GUI purchases/returns.")
+    parser.add_argument("--max-p99", type=float, default=1000,
+                        help="p99 latency in ms that ends the ramp.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Error rate that ends the ramp.")
+    parser.add_argument("--timeout", type=float, default=30,
+                        help="Request timeout in seconds.")
+    parser.add_argument(
+        "--latency-profile", default="off",
+        help="DCC_LATENCY_PROFILE for the in-process app (default: off)."
+    )
+    parser.add_argument(
+        "--log-sample-rate", type=float, default=0,
+        help="Request log sample rate for the in-process app (default: 0)."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report to this file.")
+    args = parser.parse_args(argv)
+    args.stages = [int(factor) for factor in args.stages.split(",")]
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
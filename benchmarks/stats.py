@@ -0,0 +1,49 @@
+import math
+
+
+def percentile(sorted_values: list, fraction: float):
+    """
+    Return a percentile of already sorted values, interpolating linearly
+    between the two nearest ranks.
+    Args:
+        sorted_values (list): The values, in ascending order.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return (
+        sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+    )
+
+
+def summarize(durations: list, elapsed: float | None = None):
+    """
+    Summarize the latencies of a series of operations.
+    Args:
+        durations (list): The duration of each operation, in seconds.
+        elapsed (float, optional): The wall-clock time the operations took.
+                                   Defaults to the sum of the durations,
+                                   which is right for sequential runs.
+    Returns:
+        dict: The operation count, throughput in operations per second and
+              the mean, p50, p95, p99 and max latency in milliseconds.
+    """
+    values = sorted(durations)
+    if elapsed is None:
+        elapsed = sum(values)
+    return {
+        "count": len(values),
+        "ops_per_sec": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(values) / len(values), 3)
+        if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 0.50), 3),
+        "p95_ms": round(1000 * percentile(values, 0.95), 3),
+        "p99_ms": round(1000 * percentile(values, 0.99), 3),
+        "max_ms": round(1000 * values[-1], 3) if values else 0.0,
+    }
@@ -1,31 +1,89 @@
-from server import app as fastapi_app
-from ui import app as gui_app, window
-import uvicorn
+import subprocess
 import sys
 import threading
 import atexit
 import os
 import signal
 
+# Seconds to wait before restarting a server that exited unexpectedly
+RESTART_DELAY = 2
 
-def run_fastapi():
-    uvicorn.run(fastapi_app, host="0.0.0.0", port=8000)
+# Seconds a stopping server is given to shut down before it is killed
+STOP_TIMEOUT = 10
 
 
-def stop_fastapi():
-    print("Stopping FastAPI server...")
-    os.kill(os.getpid(), signal.SIGINT)
+class ServerProcess:
+    """
+    Runs the FastAPI server (`python -m server`) as a child process.
+    Running the server in its own process, or processes with --workers,
+    keeps request handling from competing with the GUI for the GIL. The
+    child is restarted if it exits unexpectedly, and is asked to shut down
+    gracefully when the GUI exits.
+    """
+
+    def __init__(self, args: list):
+        self.args = args
+        self.process = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._monitor = None
+
+    def start(self):
+        """Start the server and a thread restarting it if it dies."""
+        self._spawn()
+        self._monitor = threading.Thread(target=self._watch, daemon=True)
+        self._monitor.start()
+
+    def _spawn(self):
+        kwargs = {}
+        if os.name == "nt":
+            # Lets stop() send CTRL_BREAK_EVENT to the server alone
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "server", *self.args],
+            cwd=os.path.dirname(os.path.abspath(__file__)), **kwargs
+        )
+
+    def _watch(self):
+        while not self._stopping.is_set():
+            code = self.process.wait()
+            if self._stopping.wait(RESTART_DELAY):
+                return
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                print(f"FastAPI server exited with code {code}, "
+                      "restarting...")
+                self._spawn()
+
+    def stop(self):
+        """Ask the server to shut down, killing it if it does not."""
+        print("Stopping FastAPI server...")
+        with self._lock:
+            self._stopping.set()
+        if self.process is None or self.process.poll() is not None:
+            return
+        if os.name == "nt":
+            self.process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            self.process.terminate()
+        try:
+            self.process.wait(STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
 
 
 if __name__ == "__main__":
-    # Start the FastAPI server in a separate thread
-    fastapi_thread = threading.Thread(target=run_fastapi)
-    fastapi_thread.daemon = True
-    fastapi_thread.start()
+    # Arguments such as --workers 4 are passed on to the server
+    server = ServerProcess(sys.argv[1:])
+    server.start()
 
-    # Register the stop_fastapi function to be called on exit
-    atexit.register(stop_fastapi)
+    # Stop the server when the GUI exits
+    atexit.register(server.stop)
 
-    # Start the PyQt GUI
+    # Start the PyQt GUI; Qt is imported while the server starts up
+    from ui import create_app
+    gui_app, window = create_app()
     window.show()
     sys.exit(gui_app.exec())
@@ -1,18 +1,77 @@
+import base64
 import bpy
+import hashlib
+import json
+import numpy as np
+import queue
 import requests
 import threading
+import time
+
+# msgpack and zstandard are optional; without them the plugin speaks JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # FastAPI server URL
 SERVER_URL = "http://127.0.0.1:8000"
 
+# Number of inventory items fetched and shown in the sidebar
+INVENTORY_PAGE_SIZE = 100
+
+# Number of search results shown in the sidebar, best matches first
+SEARCH_LIMIT = 20
+
+# Magic number opening a dictionary-compressed (dcz) response body
+DCZ_HEADER = b"\x5e\x2a\x4d\x18\x20\x00\x00\x00"
+
+# Seconds to wait before asking again for a dictionary the server lacks
+DICTIONARY_RETRY_INTERVAL = 60
+
+# Request bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 256
+
+# Seconds to wait for the server to accept a transform job or report on
+# jobs, and seconds between reports while jobs are running
+JOB_REQUEST_TIMEOUT = 2
+JOB_POLL_INTERVAL = 0.5
+
+# Seconds to wait for the outcome of a transform from a server that does
+# not run transforms as jobs
+TRANSFORM_REQUEST_TIMEOUT = 30
+
+# Global variables for content negotiation
+_dictionary_hash = None  # SHA-256 of the server's compression dictionary
+_dictionary_decompressor = None
+_dictionary_checked = 0.0  # When the dictionary was last requested
+
 # Global variables for inventory plugin
 inventory_data = []
+inventory_truncated = False  # True if the server has more items to show
 _pending_data = None  # Temporary storage for fetched data
+_inventory_etag = None  # ETag of the last inventory fetched
+_inventory_revision = None  # Server revision the displayed data reflects
+_event_stream_connected = False  # True while /events is delivering changes
+_stop_event_stream = threading.Event()
+_reload_requested = threading.Event()  # Set when the page may have shifted
+_reload_thread = None  # Thread reloading the displayed page, if any
+_search_query = ""  # Text of the active inventory search, if any
+search_results = []  # Results of the active search
+_pending_search = None  # (query, results) fetched by the search thread
 
 # Global variables for transformation plugin
 server_response_message = ""
 current_selected_object = None
 last_known_transform = {"position": None, "rotation": None, "scale": None}
+_job_submissions = queue.Queue()  # (endpoint, data) for the job thread
+_job_messages = queue.Queue()  # Job outcomes for the UI, from the job thread
+_stop_job_thread = threading.Event()
 
 # Available endpoints for transformation plugin
 ENDPOINTS = {
@@ -35,6 +94,91 @@ ENDPOINTS = {
 }
 
 
+# Content Negotiation
+def load_dictionary():
+    """Fetches the server's zstd dictionary for item names, if it has one"""
+    global _dictionary_hash, _dictionary_decompressor, _dictionary_checked
+    if (zstandard is None or _dictionary_hash is not None
+            or time.monotonic() - _dictionary_checked
+            < DICTIONARY_RETRY_INTERVAL):
+        return
+    _dictionary_checked = time.monotonic()
+    try:
+        response = requests.get(f"{SERVER_URL}/codec/dictionary", timeout=10)
+    except requests.exceptions.RequestException:
+        return
+    if response.status_code != 200:
+        return
+    _dictionary_decompressor = zstandard.ZstdDecompressor(
+        dict_data=zstandard.ZstdCompressionDict(response.content)
+    )
+    _dictionary_hash = hashlib.sha256(response.content).digest()
+
+
+def codec_headers():
+    """
+    Returns the headers asking the server for msgpack and zstd responses,
+    as far as the installed packages can decode them
+    """
+    headers = {"Accept-Encoding": "identity"}
+    if msgpack is not None:
+        headers["Accept"] = "application/msgpack, application/json;q=0.9"
+    if zstandard is not None:
+        load_dictionary()
+        headers["Accept-Encoding"] = "zstd"
+        if _dictionary_hash is not None:
+            digest = base64.b64encode(_dictionary_hash).decode()
+            headers["Accept-Encoding"] = "dcz, zstd"
+            headers["Available-Dictionary"] = f":{digest}:"
+    return headers
+
+
+def codec_get(url, **kwargs):
+    """
+    Sends a GET request with the negotiation headers and returns the
+    response along with its decoded body
+    """
+    headers = {**codec_headers(), **kwargs.pop("headers", {})}
+    response = requests.get(url, headers=headers, stream=True, **kwargs)
+    return response, decode_body(response, response.raw.read(
+        decode_content=False
+    ))
+
+
+def decode_body(response, body):
+    """Decodes a raw response body according to its headers"""
+    encoding = response.headers.get("Content-Encoding", "identity")
+    if encoding == "dcz":
+        body = _dictionary_decompressor.decompress(
+            body[len(DCZ_HEADER) + 32:]
+        )
+    elif encoding == "zstd":
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    content_type = response.headers.get("Content-Type", "")
+    if content_type.startswith("application/msgpack"):
+        return msgpack.unpackb(body)
+    if content_type.startswith("application/json"):
+        return json.loads(body)
+    return body.decode(errors="replace")
+
+
+def encode_body(data):
+    """
+    Encodes a request body as msgpack and compresses it with zstd when the
+    packages are available, returning the body and its headers
+    """
+    if msgpack is None:
+        body = json.dumps(data).encode()
+        headers = {"Content-Type": "application/json"}
+    else:
+        body = msgpack.packb(data)
+        headers = {"Content-Type": "application/msgpack"}
+    if zstandard is not None and len(body) >= MIN_COMPRESS_SIZE:
+        body = zstandard.ZstdCompressor().compress(body)
+        headers["Content-Encoding"] = "zstd"
+    return body, headers
+
+
 # Inventory Plugin Classes
 class DCCInventoryPanel(bpy.types.Panel):
     """Creates the Inventory Display Panel in the Sidebar"""
@@ -46,6 +190,16 @@ class DCCInventoryPanel(bpy.types.Panel):
 
     def draw(self, context):
         layout = self.layout
+        layout.prop(context.scene, "dcc_inventory_search", text="",
+                    icon="VIEWZOOM")
+
+        if _search_query:
+            if not search_results:
+                layout.label(text="No matching items.")
+            for item in search_results:
+                row = layout.row()
+                row.label(text=f"{item['name']}: {item['quantity']}")
+            return
 
         if not inventory_data:
             layout.label(text="No inventory data available.")
@@ -56,28 +210,209 @@ class DCCInventoryPanel(bpy.types.Panel):
             row = layout.row()
             row.label(text=f"{item['name']}: {item['quantity']}")
 
+        if inventory_truncated:
+            layout.label(text=f"Showing first {INVENTORY_PAGE_SIZE} items.")
+
 
 def fetch_inventory():
     """Fetches inventory data from the FastAPI server in a background thread"""
-    global _pending_data
+    global _pending_data, _inventory_etag, _inventory_revision
+    headers = {"If-None-Match": _inventory_etag} if _inventory_etag else {}
     try:
-        response = requests.get(f"{SERVER_URL}/get_inventory", timeout=15)
+        response, data = codec_get(
+            f"{SERVER_URL}/get_inventory",
+            params={"limit": INVENTORY_PAGE_SIZE},
+            headers=headers,
+            timeout=15
+        )
+        if response.status_code in (200, 304):
+            revision = response.headers.get("X-Inventory-Revision")
+            _inventory_revision = int(revision) if revision else None
+        if response.status_code == 304:
+            return  # Inventory unchanged since the last fetch
         if response.status_code == 200:
-            _pending_data = response.json()["inventory"]
+            _pending_data = (data["inventory"], bool(data.get("next_cursor")))
+            _inventory_etag = response.headers.get("ETag")
         else:
-            print(f"Error fetching inventory: {response.text}")
+            print(f"Error fetching inventory: {data}")
     except Exception as e:
         print(f"Error: {e}")
 
 
+def search_inventory(query):
+    """Runs a ranked name search on the server in a background thread"""
+    global _pending_search
+    try:
+        response, data = codec_get(
+            f"{SERVER_URL}/search",
+            params={"q": query, "limit": SEARCH_LIMIT},
+            timeout=15
+        )
+        if response.status_code == 200:
+            _pending_search = (query, data["results"])
+        else:
+            print(f"Error searching inventory: {data}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def update_search(self, context):
+    """Starts a search when the text in the search field is confirmed"""
+    global _search_query, search_results
+    _search_query = self.dcc_inventory_search.strip()
+    search_results = []
+    if _search_query:
+        threading.Thread(
+            target=search_inventory, args=(_search_query,), daemon=True
+        ).start()
+
+
+def apply_quantities(quantities):
+    """Updates the quantities of displayed items from a name -> qty dict"""
+    global _pending_data
+    items, truncated = _pending_data or (inventory_data, inventory_truncated)
+    if any(item["name"] in quantities for item in items):
+        _pending_data = (
+            [
+                dict(item, quantity=quantities[item["name"]])
+                if item["name"] in quantities else item
+                for item in items
+            ],
+            truncated
+        )
+
+
+def sync_inventory():
+    """
+    Brings the displayed inventory up to date by fetching only the changes
+    made since the last known revision. Falls back to reloading the
+    displayed page when items were added or removed within it, or when the
+    server can no longer provide the changes.
+    """
+    global _inventory_revision
+    if _inventory_revision is None:
+        fetch_inventory()
+        return
+
+    try:
+        response, changes = codec_get(
+            f"{SERVER_URL}/get_inventory/changes",
+            params={
+                "since": _inventory_revision,
+                "limit": INVENTORY_PAGE_SIZE
+            },
+            timeout=15
+        )
+        if response.status_code != 200:
+            print(f"Error fetching inventory changes: {changes}")
+            return
+        if changes["resync_required"] or changes["deleted"]:
+            fetch_inventory()
+            return
+
+        # A new item needs a reload if it sorts into the displayed page
+        items, truncated = (
+            _pending_data or (inventory_data, inventory_truncated)
+        )
+        shown = {item["name"] for item in items}
+        for item in changes["upserted"]:
+            if item["name"] not in shown and (
+                not truncated or item["name"] < items[-1]["name"]
+            ):
+                fetch_inventory()
+                return
+
+        apply_quantities(
+            {item["name"]: item["quantity"] for item in changes["upserted"]}
+        )
+        _inventory_revision = changes["revision"]
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def apply_inventory_event(event, data):
+    """Applies a change event from the server to the displayed inventory"""
+    revision = data.get("revision")
+    if (revision is not None and _inventory_revision is not None
+            and revision <= _inventory_revision):
+        return  # Already reflected by the displayed data
+
+    if event == "quantity_changed":
+        # Quantity changes of visible items are applied locally. The
+        # revision is left alone: other changes of the same revision may
+        # still be on their way
+        apply_quantities({data["name"]: data["quantity"]})
+        for item in search_results:
+            if item["name"] == data["name"]:
+                item["quantity"] = data["quantity"]
+    elif event in ("added", "removed", "resync"):
+        # The visible page may have shifted; update_inventory_display
+        # reloads it once for any number of these events
+        _reload_requested.set()
+
+
+def reload_inventory():
+    """Reloads the displayed page and search results in a background thread"""
+    fetch_inventory()
+    if _search_query:
+        search_inventory(_search_query)
+
+
+def listen_for_inventory_events():
+    """
+    Keeps a server-sent events connection to the server open in a background
+    thread and applies inventory changes as they arrive. While connected,
+    the inventory is no longer polled.
+    """
+    global _event_stream_connected
+
+    while not _stop_event_stream.is_set():
+        try:
+            with requests.get(
+                f"{SERVER_URL}/events", stream=True, timeout=(5, 60)
+            ) as response:
+                if response.status_code != 200:
+                    raise requests.exceptions.RequestException(response.text)
+                _event_stream_connected = True
+                sync_inventory()  # Catch up on changes missed while offline
+
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if _stop_event_stream.is_set():
+                        break
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event:
+                        apply_inventory_event(event, json.loads(line[5:]))
+                        event = None
+        except Exception as e:
+            print(f"Inventory event stream error: {e}")
+        finally:
+            _event_stream_connected = False
+        _stop_event_stream.wait(5.0)
+
+
 def update_inventory_display():
     """Checks for new data, updates inventory, and refreshes UI"""
-    global inventory_data, _pending_data
+    global inventory_data, inventory_truncated, _pending_data
+    global search_results, _pending_search, _reload_thread
 
+    redraw = False
     if _pending_data is not None:
-        inventory_data = _pending_data  # Update global data safely
+        # Update global data safely
+        inventory_data, inventory_truncated = _pending_data
         _pending_data = None  # Reset pending data
+        redraw = True
+
+    if _pending_search is not None:
+        query, results = _pending_search
+        _pending_search = None
+        # Results of a search the user has since changed are dropped
+        if query == _search_query:
+            search_results = results
+            redraw = True
 
+    if redraw:
         # Ensure all 3D view areas are updated
         for area in bpy.context.screen.areas:
             if area.type == "VIEW_3D":
@@ -85,7 +420,21 @@ def update_inventory_display():
 
         bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
 
-    threading.Thread(target=fetch_inventory, daemon=True).start()
+    if _event_stream_connected:
+        # Changes are pushed by the server; events asking for a reload are
+        # handled together, one reload at a time
+        if _reload_requested.is_set() and not (
+            _reload_thread and _reload_thread.is_alive()
+        ):
+            _reload_requested.clear()
+            _reload_thread = threading.Thread(
+                target=reload_inventory, daemon=True
+            )
+            _reload_thread.start()
+        return 1.0
+
+    # Fall back to polling while the event stream is unavailable
+    threading.Thread(target=sync_inventory, daemon=True).start()
     return 10.0
 
 
@@ -179,6 +528,11 @@ class DCCPluginPanel(bpy.types.Panel):
             text="Submit to Server",
             icon="EXPORT"
         )
+        layout.operator(
+            "dcc.send_scene_transforms",
+            text="Sync Scene to Server",
+            icon="WORLD"
+        )
 
         # Display the last received server response
         global server_response_message
@@ -198,6 +552,7 @@ class SendTransformOperator(bpy.types.Operator):
     bl_label = "Send Transform Data"
 
     def execute(self, context):
+        global server_response_message
         obj = context.active_object
         if obj is None:
             self.report({"WARNING"}, "No object selected!")
@@ -211,38 +566,185 @@ class SendTransformOperator(bpy.types.Operator):
         for field in endpoint_info["fields"]:
             transform_data["transform"][field] = list(getattr(props, field))
 
-        # Start request in a new thread
+        # The job thread sends it; the server queues the transform
+        _job_submissions.put((endpoint_info["path"], transform_data))
+        server_response_message = f"{endpoint_info['path']}: sending"
+        if context.area is not None:
+            context.area.tag_redraw()
+
+        return {"FINISHED"}
+
+
+class SendSceneTransformsOperator(bpy.types.Operator):
+    """
+    Operator for sending the transforms of every selected object (or of
+    the whole scene if nothing is selected) to the FastAPI server in a
+    single batch request.
+    """
+    bl_idname = "dcc.send_scene_transforms"
+    bl_label = "Send Scene Transforms"
+
+    def execute(self, context):
+        objects = list(context.selected_objects) or list(context.scene.objects)
+        if not objects:
+            self.report({"WARNING"}, "No objects in the scene!")
+            return {"CANCELLED"}
+
+        # Columnar payload: one float32 buffer per component, sent as raw
+        # bytes in msgpack bodies and as base64 text in JSON ones
+        batch = {"objects": [obj.name for obj in objects]}
+        for field, attribute in (
+            ("position", "location"),
+            ("rotation", "rotation_euler"),
+            ("scale", "scale")
+        ):
+            values = np.array(
+                [tuple(getattr(obj, attribute)) for obj in objects],
+                dtype="<f4"
+            )
+            batch[field] = (
+                values.tobytes() if msgpack is not None
+                else base64.b64encode(values.tobytes()).decode()
+            )
+
         thread = threading.Thread(
-            target=self.send_request,
-            args=(endpoint_info["path"], transform_data)
+            target=post_transform_data,
+            args=("/transform/batch", batch)
         )
         thread.start()
 
         return {"FINISHED"}
 
-    def send_request(self, endpoint, transform_data):
-        """
-        Sends the transformation data to the FastAPI server
-        and updates the UI with the response.
-        """
-        global server_response_message
 
+def post_transform_data(endpoint, transform_data):
+    """
+    Sends transformation data to the FastAPI server
+    and updates the UI with the response.
+    """
+    global server_response_message
+
+    try:
+        body, headers = encode_body(transform_data)
+        response = requests.post(
+            SERVER_URL + endpoint,
+            data=body,
+            headers={**headers, **codec_headers()},
+            stream=True
+        )
+        data = decode_body(response, response.raw.read(decode_content=False))
+        server_response_message = (
+            f"{response.status_code}: {json.dumps(data)}"
+        )
+        print(f"Server Response: {server_response_message}")
+
+    except requests.exceptions.RequestException as e:
+        server_response_message = f"Error: {e}"
+        print(f"Request failed: {e}")
+
+    # Update the UI
+    bpy.app.timers.register(update_ui, first_interval=0.5)
+
+
+def submit_transform_job(endpoint, transform_data, pending):
+    """
+    Sends transformation data to the FastAPI server to be applied as a
+    background job, adding the job to `pending`. The server replies with
+    the job id within milliseconds; servers without job support reply with
+    the outcome itself. Runs on the job thread
+    """
+    try:
+        body, headers = encode_body(transform_data)
+        response = requests.post(
+            SERVER_URL + endpoint,
+            data=body,
+            headers={
+                **headers, **codec_headers(), "Prefer": "respond-async"
+            },
+            stream=True,
+            timeout=(JOB_REQUEST_TIMEOUT, TRANSFORM_REQUEST_TIMEOUT)
+        )
+        data = decode_body(response, response.raw.read(decode_content=False))
+    except requests.exceptions.RequestException as e:
+        _job_messages.put(f"Error: {e}")
+        return
+
+    if response.status_code != 202:
+        _job_messages.put(f"{response.status_code}: {json.dumps(data)}")
+        return
+
+    pending[data["job_id"]] = endpoint
+    _job_messages.put(f"{endpoint}: queued")
+
+
+def poll_transform_jobs(pending):
+    """
+    Asks the server about every transform job in `pending`, reports the
+    outcome of those that finished and removes them. Runs on the job thread
+    """
+    try:
+        response, data = codec_get(
+            SERVER_URL + "/jobs",
+            params={"ids": list(pending)},
+            timeout=JOB_REQUEST_TIMEOUT
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"Job status request failed: {e}")
+        return
+    if response.status_code != 200:
+        return
+
+    for job_id in data["missing"]:
+        pending.pop(job_id, None)
+    for job in data["jobs"]:
+        if job["status"] == "succeeded":
+            _job_messages.put(f"200: {json.dumps(job['result'])}")
+        elif job["status"] == "failed":
+            _job_messages.put(f"Error: {job['error']}")
+        else:
+            continue
+        pending.pop(job["id"], None)
+
+
+def run_transform_jobs():
+    """
+    Submits the transforms queued by the operator in order and polls the
+    server until their jobs finish, in a background thread so that
+    Blender's UI never waits on the network
+    """
+    pending = {}  # Endpoints of the jobs still running, by id
+    polled = time.monotonic()
+    while not _stop_job_thread.is_set():
         try:
-            response = requests.post(
-                SERVER_URL + endpoint,
-                json=transform_data
+            endpoint, transform_data = _job_submissions.get(
+                timeout=JOB_POLL_INTERVAL
             )
-            server_response_message = (
-                f"{response.status_code}: {response.text}"
-            )
-            print(f"Server Response: {server_response_message}")
+        except queue.Empty:
+            pass
+        else:
+            submit_transform_job(endpoint, transform_data, pending)
+        if pending and time.monotonic() - polled >= JOB_POLL_INTERVAL:
+            poll_transform_jobs(pending)
+            polled = time.monotonic()
 
-        except requests.exceptions.RequestException as e:
-            server_response_message = f"Error: {e}"
-            print(f"Request failed: {e}")
 
-        # Update the UI
-        bpy.app.timers.register(update_ui, first_interval=0.5)
+def show_job_messages():
+    """Shows the job outcomes reported by the job thread since last run"""
+    global server_response_message
+
+    shown = False
+    while True:
+        try:
+            server_response_message = _job_messages.get_nowait()
+        except queue.Empty:
+            break
+        print(f"Server Response: {server_response_message}")
+        shown = True
+
+    if shown:
+        for area in bpy.context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+    return JOB_POLL_INTERVAL
 
 
 def update_ui():
@@ -304,14 +806,27 @@ def register():
     # Inventory Plugin
     bpy.utils.register_class(DCCInventoryPanel)
     bpy.app.timers.register(update_inventory_display, first_interval=1.0)
+    _stop_event_stream.clear()
+    threading.Thread(target=listen_for_inventory_events, daemon=True).start()
 
     # Transformation Plugin
+    _stop_job_thread.clear()
+    threading.Thread(target=run_transform_jobs, daemon=True).start()
+    bpy.app.timers.register(
+        show_job_messages, first_interval=JOB_POLL_INTERVAL
+    )
     bpy.utils.register_class(DCCPluginProperties)
     bpy.utils.register_class(DCCPluginPanel)
     bpy.utils.register_class(SendTransformOperator)
+    bpy.utils.register_class(SendSceneTransformsOperator)
     bpy.types.Scene.dcc_plugin = bpy.props.PointerProperty(
         type=DCCPluginProperties
     )
+    bpy.types.Scene.dcc_inventory_search = bpy.props.StringProperty(
+        name="Search",
+        description="Search inventory item names on the server",
+        update=update_search
+    )
     bpy.app.handlers.depsgraph_update_post.append(
         update_plugin_properties_from_object
     )
@@ -322,12 +837,17 @@ def unregister():
     # Inventory Plugin
     bpy.utils.unregister_class(DCCInventoryPanel)
     bpy.app.timers.unregister(update_inventory_display)
+    _stop_event_stream.set()
 
     # Transformation Plugin
+    _stop_job_thread.set()
+    bpy.app.timers.unregister(show_job_messages)
     bpy.utils.unregister_class(DCCPluginProperties)
     bpy.utils.unregister_class(DCCPluginPanel)
     bpy.utils.unregister_class(SendTransformOperator)
+    bpy.utils.unregister_class(SendSceneTransformsOperator)
     del bpy.types.Scene.dcc_plugin
+    del bpy.types.Scene.dcc_inventory_search
     bpy.app.handlers.depsgraph_update_post.remove(
         update_plugin_properties_from_object
     )
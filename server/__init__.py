@@ -1,4 +1,22 @@
-from .app import app
-from .endpoints import router
+import importlib
 
 __all__ = ["app", "router"]
+
+# Attributes loaded on first access, so that importing the package (or a
+# light submodule such as server.config) does not load FastAPI and the rest
+# of the application. `server:app` and `server.app:app` both name the
+# FastAPI app. Once looked up on the package, `server.app` is the app, as
+# when the package imported it eagerly; code that imports the submodule
+# first finds the submodule there instead and should use server.app:app.
+_LAZY_ATTRIBUTES = {"app": ".app", "router": ".endpoints"}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+    value = getattr(module, name)
+    # Importing the submodule bound its name here; bind the attribute
+    # instead so that later lookups agree with this one
+    globals()[name] = value
+    return value
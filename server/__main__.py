@@ -0,0 +1,72 @@
+"""
+Runs the inventory server.
+
+Usage:
+    python -m server
+    python -m server --workers 4 --port 8000
+
+With --workers N the server runs as N processes accepting connections on
+the same socket and sharing the database. The tables are created, and the
+jobs interrupted by the previous run are marked as failed, once here
+before the workers start.
+"""
+import argparse
+import os
+import sys
+import uvicorn
+from . import database
+from .jobs import fail_interrupted_jobs
+from .config import load_server_config
+
+
+def main(argv=None):
+    config = load_server_config()
+    parser = argparse.ArgumentParser(
+        prog="python -m server", description="Run the inventory server."
+    )
+    parser.add_argument(
+        "--host", default=config.host,
+        help=f"Interface to listen on (default: {config.host})."
+    )
+    parser.add_argument(
+        "--port", type=int, default=config.port,
+        help=f"Port to listen on (default: {config.port})."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=config.workers,
+        help=f"Server processes to run (default: {config.workers})."
+    )
+    parser.add_argument("--log-level", default="info",
+                        help="Uvicorn log level (default: info).")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1:
+        if database.storage_config.is_memory:
+            parser.error(
+                "An in-memory database cannot be shared by several workers"
+            )
+        if "{pid}" in os.environ.get("DATABASE_URL", ""):
+            parser.error(
+                "DATABASE_URL contains {pid}, which would give each worker "
+                "its own database"
+            )
+
+    # Create the tables before the workers start, so that they do not race
+    # to create them; each worker then only finds them in place
+    database.create_tables()
+    fail_interrupted_jobs()
+    database.engine.dispose()
+
+    # Read by every worker's lifespan to decide how to follow changes
+    os.environ["DCC_WORKERS"] = str(args.workers)
+    uvicorn.run(
+        "server.app:app", host=args.host, port=args.port,
+        workers=args.workers, log_level=args.log_level
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import math
+import os
+import time
+from fastapi import HTTPException, Request
+from .metrics import registry, Counter, Gauge, Histogram
+
+# Routes limited when DCC_ADMISSION_LIMITS is unset: the transform
+# endpoints, which hold their connection for the whole backend operation
+DEFAULT_ADMISSION_LIMITS = (
+    "/transform=32:128,/translation=32:128,/rotation=32:128,"
+    "/scale=32:128,/transform/batch=8:32"
+)
+
+# Milliseconds a request may wait in a route's queue for a free slot
+DEFAULT_QUEUE_TIMEOUT_MS = 30000
+
+# Weight of the newest request in the moving average of slot hold times
+HOLD_TIME_SMOOTHING = 0.2
+
+admission_in_use = registry.register(Gauge(
+    "dcc_admission_in_use",
+    "Requests holding one of their route's concurrency slots.", ("route",)
+))
+admission_queue_depth = registry.register(Gauge(
+    "dcc_admission_queue_depth",
+    "Requests waiting for one of their route's concurrency slots.",
+    ("route",)
+))
+admission_queue_duration = registry.register(Histogram(
+    "dcc_admission_queue_seconds",
+    "Time admitted requests waited for a concurrency slot.", ("route",)
+))
+admission_shed = registry.register(Counter(
+    "dcc_admission_shed_total",
+    "Requests rejected with 503, by route and whether the queue was full "
+    "or the request waited too long.", ("route", "reason")
+))
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is not admitted.
+    Attributes:
+        reason (str): 'queue_full' or 'queue_timeout'.
+        retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server is busy ({reason.replace('_', ' ')}).")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimit:
+    """
+    Admits at most `limit` concurrent requests to a route.
+    Requests beyond the limit wait in a first-in first-out queue of at most
+    `max_queue` requests, for at most `queue_timeout` seconds each. When
+    the queue is full a request is rejected at once, so that a burst costs
+    the server a bounded number of waiting coroutines and connections and
+    clients learn quickly that they should back off.
+    Args:
+        route (str): The route path, used to label the metrics.
+        limit (int): The most requests handled at once.
+        max_queue (int): The most requests waiting for a slot.
+        queue_timeout (float, optional): Seconds a request may wait for a
+                                         slot. Defaults to no deadline.
+    """
+
+    def __init__(self, route: str, limit: int, max_queue: int,
+                 queue_timeout: float | None = None):
+        self.route = route
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.hold_time = None
+        self._waiters = collections.deque()
+
+    @property
+    def queued(self):
+        """The number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    def retry_after(self):
+        """
+        Estimate how long a new request would wait for a slot.
+        Returns:
+            int: Whole seconds, at least 1.
+        """
+        hold_time = 1.0 if self.hold_time is None else self.hold_time
+        return max(1, math.ceil(hold_time * (self.queued + 1) / self.limit))
+
+    async def acquire(self):
+        """
+        Wait for a slot, in arrival order.
+        Raises:
+            Overloaded: If the queue is full, or no slot became free within
+                        the queue timeout.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            admission_in_use.inc(route=self.route)
+            admission_queue_duration.observe(0.0, route=self.route)
+            return
+        if self.queued >= self.max_queue:
+            self._shed("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        admission_queue_depth.set(self.queued, route=self.route)
+        start = time.perf_counter()
+        try:
+            # `release` hands its slot over by resolving the future
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # A slot was handed over just as the request gave up
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            admission_queue_depth.set(self.queued, route=self.route)
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed("queue_timeout")
+            raise
+        admission_queue_duration.observe(
+            time.perf_counter() - start, route=self.route
+        )
+
+    def release(self, held: float | None = None):
+        """
+        Give up a slot, handing it to the longest waiting request.
+        Args:
+            held (float, optional): Seconds the slot was held, used to
+                                    estimate Retry-After values.
+        """
+        if held is not None:
+            self.hold_time = held if self.hold_time is None else (
+                HOLD_TIME_SMOOTHING * held
+                + (1 - HOLD_TIME_SMOOTHING) * self.hold_time
+            )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                admission_queue_depth.set(self.queued, route=self.route)
+                return
+        self.active -= 1
+        admission_in_use.dec(route=self.route)
+
+    def _shed(self, reason: str):
+        admission_shed.inc(route=self.route, reason=reason)
+        raise Overloaded(reason, self.retry_after())
+
+
+def load_admission_limits(environ=None):
+    """
+    Build the per-route concurrency limits from environment variables.
+    DCC_ADMISSION_LIMITS lists the limited routes as comma-separated
+    'route=limit:queue' pairs, e.g. '/transform=32:128,/scale=8:0'; an
+    omitted queue size defaults to four times the limit, and 'off'
+    disables admission control. DCC_ADMISSION_QUEUE_TIMEOUT_MS sets how
+    long a request may wait for a slot; 0 removes the deadline.
+    Args:
+        environ (dict, optional): The environment to read. Defaults to
+                                  `os.environ`.
+    Returns:
+        dict: A `ConcurrencyLimit` per route path.
+    Raises:
+        ValueError: If a variable has an invalid value.
+    """
+    environ = os.environ if environ is None else environ
+    source = environ.get("DCC_ADMISSION_LIMITS", DEFAULT_ADMISSION_LIMITS)
+    if source.strip().lower() == "off":
+        return {}
+    try:
+        timeout_ms = int(environ.get(
+            "DCC_ADMISSION_QUEUE_TIMEOUT_MS", DEFAULT_QUEUE_TIMEOUT_MS
+        ))
+    except ValueError:
+        timeout_ms = -1
+    if timeout_ms < 0:
+        raise ValueError(
+            "DCC_ADMISSION_QUEUE_TIMEOUT_MS must be a non-negative integer"
+        )
+
+    limits = {}
+    for pair in source.split(","):
+        if not pair.strip():
+            continue
+        route, _, value = pair.partition("=")
+        route = route.strip()
+        limit, _, max_queue = value.partition(":")
+        try:
+            limit = int(limit)
+            max_queue = int(max_queue) if max_queue.strip() else 4 * limit
+        except ValueError:
+            limit = max_queue = -1
+        if limit < 1 or max_queue < 0:
+            raise ValueError(
+                f"DCC_ADMISSION_LIMITS[{route}] must be 'limit:queue' with "
+                f"a positive limit, got {value!r}"
+            )
+        limits[route] = ConcurrencyLimit(
+            route, limit, max_queue, timeout_ms / 1000 or None
+        )
+    return limits
+
+
+_limits = load_admission_limits()
+
+
+def set_admission_limits(limits: dict):
+    """
+    Replace the active per-route concurrency limits.
+    Args:
+        limits (dict): A `ConcurrencyLimit` per route path; empty to
+                       disable admission control.
+    Returns:
+        None
+    """
+    global _limits
+    _limits = limits
+
+
+async def admission_control(request: Request):
+    """
+    Hold one of the route's concurrency slots for the whole request.
+    Used as a router dependency, ahead of the simulated latency so that
+    the slot covers the backend work; routes without a limit pass through.
+    Args:
+        request (Request): The incoming request.
+    Yields:
+        None
+    Raises:
+        HTTPException: 503 with a Retry-After header if the request is not
+                       admitted.
+    """
+    route = request.scope.get("route")
+    limit = _limits.get(route.path if route else request.url.path)
+    if limit is None:
+        yield
+        return
+    try:
+        await limit.acquire()
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503, detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        limit.release(time.perf_counter() - start)
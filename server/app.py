@@ -1,17 +1,65 @@
-import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .endpoints import router
-from .database import create_tables
+from .endpoints import router, monitoring_router
+from .config import load_server_config
+from .database import (
+    create_tables, add_change_listener, remove_change_listener
+)
+from .events import event_bus, ChangelogFollower
+from .jobs import fail_interrupted_jobs
+from .singleflight import read_coalescer
+from .codec import ContentNegotiationMiddleware
+from .metrics import MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepare the process before it serves its first request.
+    Creates or upgrades the tables once at startup rather than when the
+    module is imported. When the server runs as several worker processes,
+    the event stream is fed by a `ChangelogFollower` instead of this
+    process's change listeners, so that clients see every worker's writes.
+    Jobs left unfinished by a previous run are marked as failed.
+    Args:
+        app (FastAPI): The application being started.
+    """
+    create_tables()
+    config = load_server_config()
+    follower = None
+    if config.workers == 1:
+        # With several workers this is done before they start, as the
+        # other workers may already be running jobs
+        fail_interrupted_jobs()
+    else:
+        remove_change_listener(event_bus.publish)
+        follower = ChangelogFollower(
+            event_bus, config.changelog_poll_ms / 1000,
+            (read_coalescer.invalidate,)
+        )
+        follower.start()
+    try:
+        yield
+    finally:
+        if follower is not None:
+            follower.stop()
+            add_change_listener(event_bus.publish)
 
-# Initialize FastAPI app
-app = FastAPI()
 
-# Create tables on startup
-create_tables()
+# Initialize FastAPI app
+app = FastAPI(lifespan=lifespan)
 
 # Include all routes from endpoints.py
 app.include_router(router)
+app.include_router(monitoring_router)
+
+# Speak msgpack and zstd to clients that ask for them
+app.add_middleware(ContentNegotiationMiddleware)
+
+# Count and time every request; added last so that it wraps the others
+app.add_middleware(MetricsMiddleware)
 
 # Run FastAPI with Uvicorn
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,149 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from . import database
+from .group_commit import GroupCommitter
+
+# Database calls run here so they never block the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=database.storage_config.executor_workers,
+    thread_name_prefix="db"
+)
+
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """
+    Run a blocking database function on the dedicated database executor.
+    Args:
+        func (callable): The function to run.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+    Returns:
+        The return value of the function.
+    Raises:
+        Exception: Any exception raised by the function.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+async def _apply_writes(calls: list):
+    return await run_in_db_executor(database.apply_writes, calls)
+
+
+# Concurrent single-item writes share transactions, see `GroupCommitter`
+write_coalescer = GroupCommitter(
+    _apply_writes,
+    max_ops=database.storage_config.group_commit_max_ops,
+    window=database.storage_config.group_commit_window_ms / 1000
+)
+
+
+async def add_item(name: str, quantity: int):
+    """
+    Asynchronously add a new item to the database.
+    The write is committed together with concurrent writes.
+    See `database.add_item`.
+    """
+    return await write_coalescer.submit("add_item", name, quantity)
+
+
+async def remove_item(name: str):
+    """
+    Asynchronously remove an item from the database by its name.
+    The write is committed together with concurrent writes.
+    See `database.remove_item`.
+    """
+    return await write_coalescer.submit("remove_item", name)
+
+
+async def update_quantity(name: str, new_quantity: int):
+    """
+    Asynchronously update the quantity of an item in the database.
+    The write is committed together with concurrent writes.
+    See `database.update_quantity`.
+    """
+    return await write_coalescer.submit(
+        "update_quantity", name, new_quantity
+    )
+
+
+async def adjust_quantity(name: str, delta: int, minimum: int = 0):
+    """
+    Asynchronously add a delta to the quantity of an item in the database.
+    The write is committed together with concurrent writes.
+    See `database.adjust_quantity`.
+    """
+    return await write_coalescer.submit(
+        "adjust_quantity", name, delta, minimum
+    )
+
+
+async def get_inventory_page(*args, **kwargs):
+    """
+    Asynchronously retrieve one page of items.
+    See `database.get_inventory_page`.
+    """
+    return await run_in_db_executor(
+        database.get_inventory_page, *args, **kwargs
+    )
+
+
+async def search_items(q: str, limit: int = 20, fuzzy: bool = True):
+    """
+    Asynchronously search item names, best matches first.
+    See `database.search_items`.
+    """
+    return await run_in_db_executor(database.search_items, q, limit, fuzzy)
+
+
+async def get_inventory():
+    """
+    Asynchronously retrieve all items from the inventory database.
+    See `database.get_inventory`.
+    """
+    return await run_in_db_executor(database.get_inventory)
+
+
+async def get_changes_since(since: int, limit: int = 10000):
+    """
+    Asynchronously describe how the inventory changed after a revision.
+    See `database.get_changes_since`.
+    """
+    return await run_in_db_executor(database.get_changes_since, since, limit)
+
+
+async def apply_batch(operations: list):
+    """
+    Asynchronously apply a list of operations in a single transaction.
+    See `database.apply_batch`.
+    """
+    return await run_in_db_executor(database.apply_batch, operations)
+
+
+async def upsert_items(records: list):
+    """
+    Asynchronously insert or update items by name in one transaction.
+    See `database.upsert_items`.
+    """
+    return await run_in_db_executor(database.upsert_items, records)
+
+
+async def iter_inventory(batch_size: int = 1000):
+    """
+    Asynchronously stream every item, ordered by name, in batches.
+    Each batch is fetched on the database executor, so a slow consumer
+    holds the cursor open but not an executor thread.
+    See `database.iter_inventory`.
+    """
+    batches = database.iter_inventory(batch_size)
+    try:
+        while True:
+            batch = await run_in_db_executor(next, batches, None)
+            if batch is None:
+                return
+            yield batch
+    finally:
+        await run_in_db_executor(batches.close)
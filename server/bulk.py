@@ -0,0 +1,109 @@
+import csv
+import codecs
+import io
+from .serialization import dumps, loads
+
+# Media types of the supported bulk formats
+BULK_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CSV_HEADER = ("name", "quantity")
+CSV_HEADER_LINE = b"name,quantity\n"
+
+
+def format_rows(rows, fmt: str):
+    """
+    Serialize a batch of inventory rows for an export stream.
+    Args:
+        rows (list): Rows with 'name' and 'quantity' fields.
+        fmt (str): 'ndjson' for one JSON object per line or 'csv'.
+    Returns:
+        bytes: The serialized rows, each terminated by a newline.
+    """
+    if fmt == "ndjson":
+        return b"".join(
+            dumps({"name": row.name, "quantity": row.quantity}) + b"\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows((row.name, row.quantity) for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _parse_record(fields, line_number: int):
+    """
+    Validate one imported record.
+    Args:
+        fields: The parsed record, a dict for NDJSON or a list for CSV.
+        line_number (int): The line the record came from, for errors.
+    Returns:
+        tuple: The item name and quantity.
+    Raises:
+        ValueError: If the record is malformed.
+    """
+    if isinstance(fields, dict):
+        name, quantity = fields.get("name"), fields.get("quantity")
+    elif len(fields) == 2:
+        name, quantity = fields
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            raise ValueError(f"Line {line_number}: Invalid quantity.")
+    else:
+        raise ValueError(
+            f"Line {line_number}: Expected a name and a quantity."
+        )
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Line {line_number}: Invalid name.")
+    if not isinstance(quantity, int) or isinstance(quantity, bool):
+        raise ValueError(f"Line {line_number}: Invalid quantity.")
+    return name, quantity
+
+
+async def read_records(chunks, fmt: str):
+    """
+    Parse an uploaded NDJSON or CSV stream into inventory records.
+    The stream is split into lines as it arrives, so memory use is bounded
+    by the longest line rather than the size of the upload. A CSV stream
+    may start with a 'name,quantity' header; every record must fit on one
+    line.
+    Args:
+        chunks: An async iterator of the uploaded bytes.
+        fmt (str): 'ndjson' or 'csv'.
+    Yields:
+        tuple: The item name and quantity of each record.
+    Raises:
+        ValueError: If a record is malformed.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+
+    async def lines():
+        nonlocal pending
+        async for chunk in chunks:
+            text = pending + decoder.decode(chunk)
+            *complete, pending = text.split("\n")
+            for line in complete:
+                yield line
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    async for line in lines():
+        line_number += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                fields = loads(line)
+            except ValueError:
+                raise ValueError(f"Line {line_number}: Invalid JSON.")
+            if not isinstance(fields, dict):
+                raise ValueError(f"Line {line_number}: Expected an object.")
+        else:
+            fields = next(csv.reader([line]))
+            if line_number == 1 and tuple(fields) == CSV_HEADER:
+                continue
+        yield _parse_record(fields, line_number)
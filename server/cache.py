@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from .database import (
+    get_inventory_rows, get_inventory_page, get_revision, get_database_epoch
+)
+from .serialization import render_inventory
+
+
+def make_etag(revision: int, variant: str = ""):
+    """
+    Build a strong ETag for a view of the inventory at a given revision.
+    The ETag includes the database epoch, so it stays valid across server
+    restarts and worker processes but never matches a different database.
+    Args:
+        revision (int): The inventory revision the view was built from.
+        variant (str): Identifies the view, e.g. the request's query string.
+                       Defaults to the full inventory.
+    Returns:
+        str: The quoted ETag value.
+    """
+    tag = f"{get_database_epoch():x}-{revision}"
+    if not variant:
+        return f'"{tag}"'
+    digest = hashlib.blake2s(variant.encode(), digest_size=8).hexdigest()
+    return f'"{tag}-{digest}"'
+
+
+def current_etag(variant: str = ""):
+    """
+    Build the ETag for a view of the inventory at the current revision.
+    Args:
+        variant (str): Identifies the view. Defaults to the full inventory.
+    Returns:
+        tuple: The current revision and its ETag.
+    """
+    revision = get_revision()
+    return revision, make_etag(revision, variant)
+
+
+def etag_matches(if_none_match: str | None, etag: str):
+    """
+    Check whether an If-None-Match header matches an ETag.
+    Args:
+        if_none_match (str, optional): The If-None-Match request header.
+        etag (str): The current ETag of the resource.
+    Returns:
+        bool: True if the client's cached copy is still current.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", etag):
+            return True
+    return False
+
+
+def render_inventory_page(limit: int | None = None, cursor: str | None = None,
+                          sort: str = "name", order: str = "asc",
+                          q: str | None = None, match: str = "prefix"):
+    """
+    Read one page of items and serialize it as a response body.
+    See `database.get_inventory_page` for the arguments.
+    Returns:
+        bytes: A JSON body with the items and the 'next_cursor'.
+    Raises:
+        ValueError: If an argument or the cursor is invalid.
+    """
+    items, next_cursor = get_inventory_page(
+        limit, cursor, sort, order, q, match
+    )
+    return render_inventory(items, next_cursor=next_cursor)
+
+
+class InventorySnapshot:
+    """
+    Holds the full inventory as a pre-serialized JSON response body.
+    The snapshot is tagged with the inventory revision it was built from
+    and is rebuilt lazily the first time it is requested after a write has
+    bumped the revision, so repeated reads of an unchanged inventory skip
+    both the database query and the serialization.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revision = None
+        self._body = None
+
+    def get(self):
+        """
+        Return the current snapshot, rebuilding it if it is out of date.
+        Returns:
+            tuple: The revision and the serialized JSON response body.
+        """
+        revision = get_revision()
+        with self._lock:
+            if self._revision == revision:
+                return self._revision, self._body
+
+            # Read the revision before the query so that a write landing
+            # mid-query leaves the snapshot stale rather than mislabeled
+            self._body = render_inventory(get_inventory_rows())
+            self._revision = revision
+            return self._revision, self._body
+
+
+inventory_snapshot = InventorySnapshot()
@@ -0,0 +1,671 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+import msgpack
+import zstandard
+from fastapi import HTTPException
+from sqlalchemy import select, insert
+from .async_database import run_in_db_executor
+from .database import (
+    get_database_session, get_inventory_rows, _begin_write_transaction,
+    CodecDictionary
+)
+from .serialization import loads
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Content encodings offered to clients, in order of preference
+ZSTD_ENCODING = "zstd"
+DICTIONARY_ENCODING = "dcz"
+
+ZSTD_LEVEL = 3
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 256
+
+# Dictionary compression only beats plain zstd on small bodies such as
+# pages and change sets; large ones carry enough context on their own
+DICTIONARY_MAX_BODY = 64 * 1024
+DICTIONARY_SIZE = 32 * 1024
+
+# Items needed before a dictionary is trained
+DICTIONARY_MIN_ITEMS = 64
+
+# Magic number opening a dictionary-compressed zstd (dcz) body, followed by
+# the SHA-256 of the dictionary (RFC 9842)
+DCZ_HEADER = b"\x5e\x2a\x4d\x18\x20\x00\x00\x00"
+
+# Encoded bodies of ETag-tagged responses kept for reuse
+ENCODED_CACHE_SIZE = 32
+
+# Largest request body accepted, compressed or once decompressed; larger
+# bodies are rejected with 413 before they are fully decompressed
+MAX_REQUEST_BODY = 32 * 1024 * 1024
+
+# Bytes of decompressed output produced at a time
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+# Routes that read their body as a stream: compressed uploads to them are
+# decompressed as they arrive rather than buffered, and only the output of
+# each received chunk is bounded by MAX_REQUEST_BODY
+STREAMED_ROUTES = ("/inventory/import",)
+
+
+class BodyTooLarge(ValueError):
+    """Raised when a request body exceeds `MAX_REQUEST_BODY`."""
+
+
+def _parse_accept(header: str | None):
+    """
+    Parse an Accept or Accept-Encoding header into its preferred values.
+    Args:
+        header (str, optional): The header value.
+    Returns:
+        dict: The lower-cased values mapped to their quality, excluding any
+              the client refused with q=0.
+    """
+    accepted = {}
+    for part in (header or "").split(","):
+        value, *params = part.strip().split(";")
+        quality = 1.0
+        for param in params:
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if value and quality > 0:
+            accepted[value.strip().lower()] = quality
+    return accepted
+
+
+def _parse_dictionary_hash(header: str | None):
+    """
+    Parse an Available-Dictionary header.
+    Args:
+        header (str, optional): The header value, a structured-field byte
+                                sequence such as ':base64-sha256:'.
+    Returns:
+        bytes: The dictionary hash, or None if the header is missing or
+               malformed.
+    """
+    if not header:
+        return None
+    value = header.strip()
+    if len(value) < 2 or value[0] != ":" or value[-1] != ":":
+        return None
+    try:
+        return base64.b64decode(value[1:-1], validate=True)
+    except ValueError:
+        return None
+
+
+def _json_default(value):
+    """
+    Convert msgpack binary values to base64 text when re-encoding a request
+    body as JSON, matching how packed columns are sent in JSON bodies.
+    """
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+class _BoundedOutput:
+    """
+    Collects the output of a zstd stream writer, raising `BodyTooLarge` as
+    soon as more than `limit` bytes have been written since the last
+    `take`.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self.chunks = []
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise BodyTooLarge(
+                f"Request body exceeds {self.limit} bytes once decompressed."
+            )
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _decompress(decompressor, body: bytes, limit: int):
+    """
+    Decompress a zstd frame, refusing to produce more than `limit` bytes.
+    Args:
+        decompressor (zstandard.ZstdDecompressor): The decompressor.
+        body (bytes): The zstd frame.
+        limit (int): The largest output accepted.
+    Returns:
+        bytes: The decompressed body.
+    Raises:
+        BodyTooLarge: If the output exceeds `limit`.
+        zstandard.ZstdError: If the frame is invalid.
+    """
+    output = _BoundedOutput(limit)
+    writer = decompressor.stream_writer(
+        output, write_size=DECOMPRESS_CHUNK_SIZE, closefd=False
+    )
+    writer.write(body)
+    return output.take()
+
+
+def _load_dictionary(digest: bytes | None = None):
+    """
+    Read a stored dictionary.
+    Args:
+        digest (bytes, optional): The SHA-256 of the dictionary. Defaults
+                                  to the current dictionary.
+    Returns:
+        bytes: The raw dictionary, or None if there is no such dictionary.
+    """
+    query = select(CodecDictionary.data)
+    if digest is None:
+        query = query.order_by(CodecDictionary.created_at.desc()).limit(1)
+    else:
+        query = query.where(CodecDictionary.hash == digest)
+    with get_database_session() as session:
+        return session.scalar(query)
+
+
+def _store_dictionary(data: bytes):
+    """
+    Make a newly trained dictionary current, unless another process stored
+    one first.
+    Args:
+        data (bytes): The raw dictionary.
+    Returns:
+        bytes: The current dictionary, `data` or the one stored first.
+    """
+    with get_database_session() as session:
+        _begin_write_transaction(session)
+        current = session.scalar(
+            select(CodecDictionary.data)
+            .order_by(CodecDictionary.created_at.desc()).limit(1)
+        )
+        if current is not None:
+            return current
+        session.execute(insert(CodecDictionary).values(
+            hash=hashlib.sha256(data).digest(), data=data,
+            created_at=time.time_ns() // 1_000_000
+        ))
+        return data
+
+
+class CompressionDictionary:
+    """
+    A zstd dictionary trained on the inventory's item records.
+    Item names are long and repetitive, so a shared dictionary lets small
+    responses compress well even though each one alone has little context.
+    The dictionary is trained the first time it is requested once the
+    inventory is large enough, and stored in the database, so that every
+    worker process uses the same one and clients can cache it by its hash.
+    Bodies compressed with any stored dictionary can be decompressed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._hash = None
+        self._compressor = None
+        self._decompressors = {}  # For every dictionary seen, by hash
+
+    @property
+    def hash(self):
+        """The SHA-256 of the dictionary, or None before it is loaded."""
+        return self._hash
+
+    def get(self):
+        """
+        Return the current dictionary, reading it from the database or
+        training it first if necessary.
+        Returns:
+            bytes: The raw dictionary, or None if the inventory is still too
+                   small to train one.
+        """
+        with self._lock:
+            if self._data is None:
+                data = _load_dictionary()
+                if data is None:
+                    data = self._train()
+                if data is not None:
+                    self.load(data)
+            return self._data
+
+    def knows(self, digest: bytes):
+        """
+        Tell whether a dictionary is loaded in this process.
+        Args:
+            digest (bytes): The SHA-256 of the dictionary.
+        Returns:
+            bool: True if bodies compressed with it can be decompressed.
+        """
+        return digest in self._decompressors
+
+    def find(self, digest: bytes):
+        """
+        Load a stored dictionary by its hash, and the current dictionary if
+        this process has not loaded it yet.
+        Args:
+            digest (bytes): The SHA-256 of the dictionary.
+        Returns:
+            bool: True if the dictionary is known.
+        """
+        with self._lock:
+            if self._data is None:
+                data = _load_dictionary()
+                if data is not None:
+                    self.load(data)
+            if digest not in self._decompressors:
+                data = _load_dictionary(digest)
+                if data is not None:
+                    self._decompressors[digest] = zstandard.ZstdDecompressor(
+                        dict_data=zstandard.ZstdCompressionDict(data)
+                    )
+            return digest in self._decompressors
+
+    def _train(self):
+        rows = get_inventory_rows()
+        if len(rows) < DICTIONARY_MIN_ITEMS:
+            return None
+        samples = []
+        for row in rows:
+            record = {"name": row.name, "quantity": row.quantity}
+            samples.append(json.dumps(record).encode())
+            samples.append(msgpack.packb(record))
+        try:
+            trained = zstandard.train_dictionary(DICTIONARY_SIZE, samples)
+        except zstandard.ZstdError:
+            return None
+        return _store_dictionary(trained.as_bytes())
+
+    def load(self, data: bytes):
+        """
+        Use an existing dictionary instead of training one.
+        Args:
+            data (bytes): The raw dictionary.
+        """
+        dictionary = zstandard.ZstdCompressionDict(data)
+        self._compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL, dict_data=dictionary
+        )
+        self._hash = hashlib.sha256(data).digest()
+        self._decompressors[self._hash] = zstandard.ZstdDecompressor(
+            dict_data=dictionary
+        )
+        self._data = data
+
+    def compress(self, body: bytes):
+        """
+        Compress a body into the dcz format.
+        Args:
+            body (bytes): The body to compress.
+        Returns:
+            bytes: The dcz header, the dictionary hash and the zstd frame.
+        """
+        return DCZ_HEADER + self._hash + self._compressor.compress(body)
+
+    def decompress(self, body: bytes, limit: int = MAX_REQUEST_BODY):
+        """
+        Decompress a dcz body.
+        Args:
+            body (bytes): The dcz body.
+            limit (int): The largest output accepted.
+        Returns:
+            bytes: The original body.
+        Raises:
+            BodyTooLarge: If the output exceeds `limit`.
+            ValueError: If the body was not compressed with a dictionary
+                        loaded in this process, see `find`.
+        """
+        prefix = len(DCZ_HEADER)
+        decompressor = self._decompressors.get(body[prefix:prefix + 32])
+        if not body.startswith(DCZ_HEADER) or decompressor is None:
+            raise ValueError(
+                "Body was not compressed with a known dictionary."
+            )
+        return _decompress(decompressor, body[prefix + 32:], limit)
+
+
+compression_dictionary = CompressionDictionary()
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def decode_request_body(body: bytes, content_type: str,
+                        content_encoding: str):
+    """
+    Turn a compressed or msgpack request body into plain JSON.
+    Args:
+        body (bytes): The raw request body.
+        content_type (str): The media type of the body.
+        content_encoding (str): The content encoding of the body.
+    Returns:
+        tuple: The JSON body and whether it was changed.
+    Raises:
+        BodyTooLarge: If the body decompresses to more than
+                      `MAX_REQUEST_BODY` bytes.
+        ValueError: If the body cannot be decoded.
+    """
+    changed = False
+    if content_encoding in (ZSTD_ENCODING, DICTIONARY_ENCODING):
+        try:
+            if content_encoding == DICTIONARY_ENCODING:
+                body = compression_dictionary.decompress(body)
+            else:
+                body = _decompress(
+                    _zstd_decompressor, body, MAX_REQUEST_BODY
+                )
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd body: {e}")
+        changed = True
+    elif content_encoding not in ("", "identity"):
+        raise ValueError(f"Unsupported content encoding: {content_encoding}")
+    if content_type in MSGPACK_MEDIA_TYPES:
+        try:
+            data = msgpack.unpackb(body)
+        except (msgpack.UnpackException, ValueError) as e:
+            raise ValueError(f"Invalid msgpack body: {e}")
+        body = json.dumps(data, default=_json_default).encode()
+        changed = True
+    return body, changed
+
+
+def choose_representation(accept: str | None, accept_encoding: str | None,
+                          available_dictionary: str | None):
+    """
+    Pick the response media type and content encoding a client prefers.
+    Args:
+        accept (str, optional): The Accept request header.
+        accept_encoding (str, optional): The Accept-Encoding request header.
+        available_dictionary (str, optional): The Available-Dictionary
+                                              request header.
+    Returns:
+        tuple: Whether to send msgpack, whether zstd is accepted, and
+               whether the client holds the current dictionary.
+    """
+    media = _parse_accept(accept)
+    msgpack_quality = max(
+        (media.get(m, 0) for m in MSGPACK_MEDIA_TYPES), default=0
+    )
+    use_msgpack = msgpack_quality > 0 and msgpack_quality >= media.get(
+        JSON_MEDIA_TYPE, media.get("*/*", 0)
+    )
+    encodings = _parse_accept(accept_encoding)
+    use_zstd = ZSTD_ENCODING in encodings
+    use_dictionary = (
+        DICTIONARY_ENCODING in encodings
+        and compression_dictionary.hash is not None
+        and _parse_dictionary_hash(available_dictionary)
+        == compression_dictionary.hash
+    )
+    return use_msgpack, use_zstd, use_dictionary
+
+
+def encode_response_body(body: bytes, use_msgpack: bool, use_zstd: bool,
+                         use_dictionary: bool):
+    """
+    Re-encode a JSON response body in the client's preferred format.
+    Args:
+        body (bytes): The JSON body.
+        use_msgpack (bool): Send msgpack instead of JSON.
+        use_zstd (bool): The client accepts zstd.
+        use_dictionary (bool): The client holds the current dictionary.
+    Returns:
+        tuple: The body, its media type and its content encoding (None if
+               it is not compressed).
+    """
+    media_type = JSON_MEDIA_TYPE
+    if use_msgpack:
+        body = msgpack.packb(loads(body))
+        media_type = MSGPACK_MEDIA_TYPES[0]
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, media_type, None
+    if use_dictionary and len(body) <= DICTIONARY_MAX_BODY:
+        return (
+            compression_dictionary.compress(body), media_type,
+            DICTIONARY_ENCODING
+        )
+    if use_zstd or use_dictionary:
+        return _zstd_compressor.compress(body), media_type, ZSTD_ENCODING
+    return body, media_type, None
+
+
+class ContentNegotiationMiddleware:
+    """
+    ASGI middleware speaking msgpack and zstd alongside JSON.
+    Request bodies sent as msgpack and/or compressed with zstd (or dcz,
+    using the dictionary from /codec/dictionary) are turned back into JSON
+    before they reach the endpoints. Buffered JSON responses are re-encoded
+    according to the request's Accept, Accept-Encoding and
+    Available-Dictionary headers; streaming responses such as /events pass
+    through untouched. Re-encoded responses carry a weak ETag, so a cached
+    copy still revalidates against the endpoint's ETag.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._cache = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        content_encoding = headers.get("content-encoding", "").strip()
+        if content_type in MSGPACK_MEDIA_TYPES or content_encoding:
+            scope, receive = await self._decode_request(
+                scope, receive, send, content_type, content_encoding.lower()
+            )
+            if scope is None:
+                return
+
+        available_dictionary = headers.get("available-dictionary")
+        if compression_dictionary.hash is None and available_dictionary:
+            # The client may hold the dictionary stored by another worker
+            digest = _parse_dictionary_hash(available_dictionary)
+            if digest is not None:
+                await run_in_db_executor(compression_dictionary.find, digest)
+        representation = choose_representation(
+            headers.get("accept"), headers.get("accept-encoding"),
+            available_dictionary
+        )
+        if representation == (False, False, False):
+            await self.app(scope, receive, send)
+            return
+        await self._encode_response(scope, receive, send, representation)
+
+    async def _decode_request(self, scope, receive, send, content_type,
+                              content_encoding):
+        if (content_encoding == ZSTD_ENCODING
+                and content_type not in MSGPACK_MEDIA_TYPES
+                and scope["path"] in STREAMED_ROUTES):
+            return self._decode_stream(scope, receive)
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None, None
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > MAX_REQUEST_BODY:
+                await self._send_error(
+                    send, 413,
+                    f"Request body exceeds {MAX_REQUEST_BODY} bytes."
+                )
+                return None, None
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        if content_encoding == DICTIONARY_ENCODING:
+            # The body may use a dictionary another worker stored
+            prefix = len(DCZ_HEADER)
+            digest = body[prefix:prefix + 32]
+            if not compression_dictionary.knows(digest):
+                await run_in_db_executor(compression_dictionary.find, digest)
+        try:
+            body, changed = decode_request_body(
+                body, content_type, content_encoding
+            )
+        except BodyTooLarge as e:
+            await self._send_error(send, 413, str(e))
+            return None, None
+        except ValueError as e:
+            await self._send_error(send, 400, str(e))
+            return None, None
+
+        if changed:
+            headers = [
+                (key, value) for key, value in scope["headers"]
+                if key not in (
+                    b"content-type", b"content-encoding", b"content-length"
+                )
+            ]
+            headers.append((b"content-type", JSON_MEDIA_TYPE.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+            # Update the scope in place so that outer middleware sees the
+            # route the request is matched to
+            scope["headers"] = headers
+
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return scope, replay
+
+    @staticmethod
+    def _decode_stream(scope, receive):
+        # Decompress a zstd upload chunk by chunk as the endpoint reads it.
+        # Errors surface in the endpoint: invalid data as a ValueError, too
+        # much output from one chunk as a 413 HTTPException
+        output = _BoundedOutput(MAX_REQUEST_BODY)
+        writer = _zstd_decompressor.stream_writer(
+            output, write_size=DECOMPRESS_CHUNK_SIZE, closefd=False
+        )
+        scope["headers"] = [
+            (key, value) for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ]
+
+        async def decompressing_receive():
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            try:
+                writer.write(message.get("body", b""))
+            except BodyTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Invalid zstd body: {e}")
+            return {**message, "body": output.take()}
+
+        return scope, decompressing_receive
+
+    async def _encode_response(self, scope, receive, send, representation):
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                media_type = headers.get(b"content-type", b"").split(b";")[0]
+                if (media_type.decode("latin-1") != JSON_MEDIA_TYPE
+                        or b"content-encoding" in headers):
+                    passthrough = True
+                    await send(self._with_weak_etag(message))
+                    return
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._send_encoded(
+                send, scope, start, b"".join(chunks), representation
+            )
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _send_encoded(self, send, scope, start, body, representation):
+        headers = [
+            (key, value) for key, value in start.get("headers", [])
+            if key not in (b"content-type", b"content-length", b"vary")
+        ]
+        etag = dict(headers).get(b"etag")
+        key = None
+        if etag:
+            key = (scope["path"], start["status"], etag, representation)
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            encoded = self._cache[key]
+        else:
+            encoded = encode_response_body(body, *representation)
+            if key is not None:
+                self._cache[key] = encoded
+                if len(self._cache) > ENCODED_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        body, media_type, content_encoding = encoded
+
+        headers.append((b"content-type", media_type.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        headers.append((b"vary", b"Accept, Accept-Encoding"))
+        if content_encoding:
+            headers.append((b"content-encoding", content_encoding.encode()))
+        message = {**start, "headers": headers}
+        if media_type != JSON_MEDIA_TYPE or content_encoding:
+            message = self._with_weak_etag(message)
+        await send(message)
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _with_weak_etag(message):
+        headers = []
+        for key, value in message.get("headers", []):
+            if key == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            headers.append((key, value))
+        return {**message, "headers": headers}
+
+    @staticmethod
+    async def _send_error(send, status_code: int, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", JSON_MEDIA_TYPE.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
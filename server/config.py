@@ -0,0 +1,248 @@
+import os
+from dataclasses import dataclass
+
+DEFAULT_DATABASE_URL = "sqlite:///inventory.db"
+
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+
+
+@dataclass(frozen=True)
+class StorageConfig:
+    """
+    Database connection and tuning settings.
+    Attributes:
+        url (str): The SQLAlchemy database URL. A '{pid}' placeholder is
+                   replaced with the process id, giving each process its
+                   own database file.
+        journal_mode (str): SQLite journal mode. WAL lets readers proceed
+                            while a writer is active.
+        synchronous (str): SQLite synchronous level. NORMAL is durable
+                           across application crashes in WAL mode and only
+                           syncs at checkpoints.
+        mmap_size (int): Bytes of the database file SQLite may memory-map.
+        cache_size (int): SQLite page cache size; negative values are KiB.
+        busy_timeout (int): Milliseconds to wait for a lock before failing.
+        executor_workers (int): Threads running blocking database calls
+                                for the async endpoints.
+        pool_size (int): Connections kept open in the pool.
+        max_overflow (int): Extra connections allowed beyond `pool_size`.
+        changelog_retention (int): Revisions of item changes kept for
+                                   delta sync before being compacted.
+        group_commit_max_ops (int): Most concurrent writes committed
+                                    together in one transaction; 1 commits
+                                    every write on its own.
+        group_commit_window_ms (int): Milliseconds a group commit waits for
+                                      more writes before committing; 0
+                                      commits as soon as the previous
+                                      group has.
+    """
+    url: str = DEFAULT_DATABASE_URL
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64 * 1024
+    busy_timeout: int = 5000
+    executor_workers: int = 4
+    pool_size: int = 5
+    max_overflow: int = 10
+    changelog_retention: int = 100000
+    group_commit_max_ops: int = 64
+    group_commit_window_ms: int = 0
+
+    @property
+    def is_sqlite(self):
+        """True if the URL points at a SQLite database."""
+        return self.url.startswith("sqlite")
+
+    @property
+    def is_memory(self):
+        """True if the URL points at an in-memory SQLite database."""
+        return self.url in ("sqlite://", "sqlite:///:memory:") or (
+            self.is_sqlite and "mode=memory" in self.url
+        )
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """
+    Process layout of the HTTP server.
+    Attributes:
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+        workers (int): Server processes sharing the listening socket and
+                       the database.
+        changelog_poll_ms (int): Milliseconds between changelog polls when
+                                 several workers run, see
+                                 `events.ChangelogFollower`.
+        job_workers (int): Threads running transform jobs in each server
+                           process.
+        job_queue_size (int): Most jobs waiting to run in each server
+                              process before new jobs are rejected.
+        job_retention_s (int): Seconds finished jobs can still be looked
+                               up.
+    """
+    host: str = DEFAULT_HOST
+    port: int = DEFAULT_PORT
+    workers: int = 1
+    changelog_poll_ms: int = 250
+    job_workers: int = 8
+    job_queue_size: int = 1000
+    job_retention_s: int = 3600
+
+
+def _env_int(environ, key: str, default: int):
+    """
+    Read an integer environment variable.
+    Args:
+        environ (dict): The environment to read.
+        key (str): The variable name.
+        default (int): The value used when the variable is unset or empty.
+    Returns:
+        int: The parsed value.
+    Raises:
+        ValueError: If the variable is not an integer.
+    """
+    value = environ.get(key)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{key} must be an integer, got {value!r}")
+
+
+def _env_choice(environ, key: str, default: str, choices: tuple):
+    """
+    Read an environment variable restricted to a set of upper-case values.
+    Args:
+        environ (dict): The environment to read.
+        key (str): The variable name.
+        default (str): The value used when the variable is unset.
+        choices (tuple): The allowed values.
+    Returns:
+        str: The upper-cased value.
+    Raises:
+        ValueError: If the value is not one of `choices`.
+    """
+    value = environ.get(key, default).upper()
+    if value not in choices:
+        raise ValueError(f"{key} must be one of {', '.join(choices)}")
+    return value
+
+
+def load_storage_config(environ=None):
+    """
+    Build the storage configuration from environment variables.
+    Recognised variables are DATABASE_URL, DCC_SQLITE_JOURNAL_MODE,
+    DCC_SQLITE_SYNCHRONOUS, DCC_SQLITE_MMAP_SIZE, DCC_SQLITE_CACHE_SIZE,
+    DCC_SQLITE_BUSY_TIMEOUT, DCC_DB_EXECUTOR_WORKERS, DCC_DB_POOL_SIZE,
+    DCC_DB_MAX_OVERFLOW, DCC_CHANGELOG_RETENTION, DCC_GROUP_COMMIT_MAX_OPS
+    and DCC_GROUP_COMMIT_WINDOW_MS. Unset variables keep
+    their defaults, except that the pool is sized to cover every executor
+    thread plus one connection for callers outside the executor.
+    Args:
+        environ (dict, optional): The environment to read. Defaults to
+                                  `os.environ`.
+    Returns:
+        StorageConfig: The resulting configuration.
+    Raises:
+        ValueError: If a variable has an invalid value.
+    """
+    environ = os.environ if environ is None else environ
+    workers = _env_int(environ, "DCC_DB_EXECUTOR_WORKERS", 4)
+    if workers < 1:
+        raise ValueError("DCC_DB_EXECUTOR_WORKERS must be at least 1")
+    group_ops = _env_int(
+        environ, "DCC_GROUP_COMMIT_MAX_OPS", StorageConfig.group_commit_max_ops
+    )
+    if group_ops < 1:
+        raise ValueError("DCC_GROUP_COMMIT_MAX_OPS must be at least 1")
+    group_window = _env_int(
+        environ, "DCC_GROUP_COMMIT_WINDOW_MS",
+        StorageConfig.group_commit_window_ms
+    )
+    if group_window < 0:
+        raise ValueError("DCC_GROUP_COMMIT_WINDOW_MS cannot be negative")
+
+    return StorageConfig(
+        url=environ.get("DATABASE_URL", DEFAULT_DATABASE_URL).replace(
+            "{pid}", str(os.getpid())
+        ),
+        journal_mode=_env_choice(
+            environ, "DCC_SQLITE_JOURNAL_MODE", "WAL", JOURNAL_MODES
+        ),
+        synchronous=_env_choice(
+            environ, "DCC_SQLITE_SYNCHRONOUS", "NORMAL", SYNCHRONOUS_MODES
+        ),
+        mmap_size=_env_int(
+            environ, "DCC_SQLITE_MMAP_SIZE", StorageConfig.mmap_size
+        ),
+        cache_size=_env_int(
+            environ, "DCC_SQLITE_CACHE_SIZE", StorageConfig.cache_size
+        ),
+        busy_timeout=_env_int(
+            environ, "DCC_SQLITE_BUSY_TIMEOUT", StorageConfig.busy_timeout
+        ),
+        executor_workers=workers,
+        pool_size=_env_int(environ, "DCC_DB_POOL_SIZE", workers + 1),
+        max_overflow=_env_int(
+            environ, "DCC_DB_MAX_OVERFLOW", StorageConfig.max_overflow
+        ),
+        changelog_retention=_env_int(
+            environ, "DCC_CHANGELOG_RETENTION",
+            StorageConfig.changelog_retention
+        ),
+        group_commit_max_ops=group_ops,
+        group_commit_window_ms=group_window,
+    )
+
+
+def load_server_config(environ=None):
+    """
+    Build the server configuration from environment variables.
+    Recognised variables are DCC_HOST, DCC_PORT, DCC_WORKERS,
+    DCC_CHANGELOG_POLL_MS, DCC_JOB_WORKERS, DCC_JOB_QUEUE_SIZE and
+    DCC_JOB_RETENTION_S.
+    Args:
+        environ (dict, optional): The environment to read. Defaults to
+                                  `os.environ`.
+    Returns:
+        ServerConfig: The resulting configuration.
+    Raises:
+        ValueError: If a variable has an invalid value.
+    """
+    environ = os.environ if environ is None else environ
+    workers = _env_int(environ, "DCC_WORKERS", ServerConfig.workers)
+    if workers < 1:
+        raise ValueError("DCC_WORKERS must be at least 1")
+    poll_ms = _env_int(
+        environ, "DCC_CHANGELOG_POLL_MS", ServerConfig.changelog_poll_ms
+    )
+    if poll_ms < 1:
+        raise ValueError("DCC_CHANGELOG_POLL_MS must be at least 1")
+    job_workers = _env_int(
+        environ, "DCC_JOB_WORKERS", ServerConfig.job_workers
+    )
+    if job_workers < 1:
+        raise ValueError("DCC_JOB_WORKERS must be at least 1")
+    job_queue_size = _env_int(
+        environ, "DCC_JOB_QUEUE_SIZE", ServerConfig.job_queue_size
+    )
+    if job_queue_size < 1:
+        raise ValueError("DCC_JOB_QUEUE_SIZE must be at least 1")
+
+    return ServerConfig(
+        host=environ.get("DCC_HOST") or DEFAULT_HOST,
+        port=_env_int(environ, "DCC_PORT", DEFAULT_PORT),
+        workers=workers,
+        changelog_poll_ms=poll_ms,
+        job_workers=job_workers,
+        job_queue_size=job_queue_size,
+        job_retention_s=_env_int(
+            environ, "DCC_JOB_RETENTION_S", ServerConfig.job_retention_s
+        ),
+    )
@@ -1,12 +1,93 @@
-from sqlalchemy import create_engine, Column, Integer, String
+import base64
+import json
+import logging
+import threading
+import secrets
+from sqlalchemy import (
+    create_engine, event, inspect, text, bindparam, Column, Integer, String,
+    Boolean, LargeBinary, Index, select, insert, update, delete, tuple_
+)
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from sqlalchemy.pool import StaticPool
 from contextlib import contextmanager
+from .config import StorageConfig, load_storage_config
+from .metrics import (
+    registry, instrument_engine, db_sessions, db_sessions_active, db_pool
+)
+
+storage_config = load_storage_config()
+DATABASE_URL = storage_config.url
+
+# Maximum number of bound parameters used per IN (...) clause in bulk queries
+BATCH_CHUNK_SIZE = 500
+
+
+def create_database_engine(config: StorageConfig):
+    """
+    Create a SQLAlchemy engine for the given storage configuration.
+    For SQLite, every new connection is tuned with the configured journal
+    mode, synchronous level, mmap size, cache size and busy timeout. An
+    in-memory database uses a single shared connection so that every thread
+    sees the same data; a thread holds it from checkout to checkin, so the
+    transactions of different sessions never interleave on it.
+    Args:
+        config (StorageConfig): The storage configuration.
+    Every engine reports its statement counts and timings to the metrics
+    registry.
+    Returns:
+        Engine: The configured engine.
+    """
+    if not config.is_sqlite:
+        new_engine = create_engine(
+            config.url,
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_pre_ping=True
+        )
+        instrument_engine(new_engine)
+        return new_engine
+
+    connect_args = {"check_same_thread": False}
+    if config.is_memory:
+        new_engine = create_engine(
+            config.url, connect_args=connect_args, poolclass=StaticPool
+        )
+        # Reentrant, as a thread may check the connection out again while
+        # its session still holds it
+        connection_lock = threading.RLock()
+
+        @event.listens_for(new_engine, "checkout")
+        def lock_connection(dbapi_connection, connection_record, proxy):
+            connection_lock.acquire()
+
+        @event.listens_for(new_engine, "checkin")
+        def unlock_connection(dbapi_connection, connection_record):
+            connection_lock.release()
+    else:
+        new_engine = create_engine(
+            config.url,
+            connect_args=connect_args,
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow
+        )
+
+    @event.listens_for(new_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={config.synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={config.mmap_size:d}")
+        cursor.execute(f"PRAGMA cache_size={config.cache_size:d}")
+        cursor.execute(f"PRAGMA busy_timeout={config.busy_timeout:d}")
+        cursor.close()
+
+    instrument_engine(new_engine)
+    return new_engine
 
-DATABASE_URL = "sqlite:///inventory.db"
 
 # Initialize DB
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_database_engine(storage_config)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -19,6 +100,64 @@ Base = declarative_base()
 Session = scoped_session(SessionLocal)
 
 
+def configure_database(config: StorageConfig):
+    """
+    Point the module at a different database.
+    The current engine is disposed and sessions created from now on use a
+    new engine built from `config`. Intended for tools and tests that need
+    to switch storage configurations within one process.
+    Args:
+        config (StorageConfig): The new storage configuration.
+    Returns:
+        Engine: The new engine.
+    """
+    global engine, storage_config, DATABASE_URL
+    Session.remove()
+    engine.dispose()
+    storage_config = config
+    DATABASE_URL = config.url
+    engine = create_database_engine(config)
+    SessionLocal.configure(bind=engine)
+    _epoch_cache.clear()
+    _search_index_cache.clear()
+    return engine
+
+
+# Serializes revision allocation, commit and listener notification within
+# this process, so listeners always observe revisions in increasing order
+_commit_lock = threading.Lock()
+
+# Revisions between automatic changelog compactions
+COMPACTION_INTERVAL = 1000
+
+# Cached database epoch, see get_database_epoch()
+_epoch_cache = {}
+
+# Functions called with (revision, changes) after every committed change
+_change_listeners = []
+
+# Whether the current database has the name search index, see
+# _has_search_index()
+_search_index_cache = {}
+
+# Rows read per search phase, which bounds the cost of common search terms
+SEARCH_CANDIDATES = 500
+
+# Least share of the search text's trigrams a name must contain to be
+# returned as a fuzzy match
+FUZZY_MIN_SIMILARITY = 0.3
+
+# Rarest trigrams of the search text used to look up fuzzy candidates
+FUZZY_TRIGRAMS = 8
+
+
+class InsufficientQuantityError(ValueError):
+    """
+    Raised when a quantity adjustment would take an item below its
+    allowed minimum.
+    """
+
+
 class Item(Base):
     """
     Represents an item in the database.
@@ -26,12 +165,164 @@ class Item(Base):
         id (int): The unique id for the item. Auto-incremented primary key.
         name (str): The name of the item. Must be unique and cannot be null.
         quantity (int): The quantity of the item. Cannot be null.
+        revision (int): The inventory revision that last changed the item.
     """
     __tablename__ = "items"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, nullable=False)
     quantity = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Supports keyset pagination ordered by quantity
+        Index("ix_items_quantity_id", "quantity", "id"),
+        # Supports delta sync of items changed since a revision
+        Index("ix_items_revision", "revision"),
+    )
+
+
+class ItemChange(Base):
+    """
+    Represents one committed change to an item, kept for delta sync.
+    Attributes:
+        id (int): Auto-incremented primary key, never reused.
+        revision (int): The inventory revision the change was committed in.
+        kind (str): 'added', 'removed' or 'quantity_changed'.
+        name (str): The name of the changed item.
+        quantity (int): The item's quantity after the change, or None if
+                        it was removed.
+    """
+    __tablename__ = "item_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    revision = Column(Integer, nullable=False, index=True)
+    kind = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    quantity = Column(Integer)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class InventoryMeta(Base):
+    """
+    Key/value counters describing the inventory as a whole.
+    Keys:
+        revision: The latest committed inventory revision.
+        compacted_through: Changes up to this revision have been deleted
+                           from the changelog.
+        epoch: A random number identifying this database, so revisions
+               from a different or recreated database are never confused.
+    """
+    __tablename__ = "inventory_meta"
+
+    key = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+
+class ObjectTransform(Base):
+    """
+    The latest known transform of a scene object.
+    Attributes:
+        name (str): The object name. Primary key.
+        state (bytes): Position, rotation and scale as nine little-endian
+                       float32 values.
+        updated_at (int): When the state last changed, in milliseconds
+                          since the Unix epoch.
+        since_keyframe (int): History records written since the object's
+                              last keyframe record.
+    """
+    __tablename__ = "object_transforms"
+
+    name = Column(String, primary_key=True)
+    state = Column(LargeBinary, nullable=False)
+    updated_at = Column(Integer, nullable=False)
+    since_keyframe = Column(Integer, nullable=False, default=0)
+
+
+class TransformHistory(Base):
+    """
+    One change to an object's transform, appended to its history.
+    Attributes:
+        id (int): Auto-incremented primary key giving the record order.
+        name (str): The object name.
+        timestamp (int): When the change was recorded, in milliseconds
+                         since the Unix epoch.
+        keyframe (bool): True if `record` holds the full state, False if
+                         it only holds the components that changed.
+        record (bytes): The encoded record, see `server.transform_store`.
+    """
+    __tablename__ = "transform_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False)
+    timestamp = Column(Integer, nullable=False)
+    keyframe = Column(Boolean, nullable=False)
+    record = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_transform_history_name_timestamp", "name", "timestamp"),
+    )
+
+
+class TransformJob(Base):
+    """
+    A transform request running as a background job, see `server.jobs`.
+    Jobs are kept in the database so that any worker process can report
+    the status of a job accepted by another.
+    Attributes:
+        id (str): The job id handed to the client. Primary key.
+        route (str): The endpoint the job was submitted to.
+        priority (int): Jobs with a higher priority run first.
+        status (str): 'queued', 'running', 'succeeded' or 'failed'.
+        result (str): The JSON response of the finished operation.
+        error (str): Why the job failed.
+        created_at (int): When the job was submitted, in milliseconds
+                          since the Unix epoch.
+        updated_at (int): When the status last changed, in milliseconds
+                          since the Unix epoch.
+    """
+    __tablename__ = "transform_jobs"
+
+    id = Column(String, primary_key=True)
+    route = Column(String, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False)
+    result = Column(String)
+    error = Column(String)
+    created_at = Column(Integer, nullable=False)
+    updated_at = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Supports deleting finished jobs past their retention
+        Index("ix_transform_jobs_status_updated", "status", "updated_at"),
+    )
+
+
+class CodecDictionary(Base):
+    """
+    A zstd dictionary for request and response bodies, see `server.codec`.
+    Dictionaries are kept in the database so that every worker process
+    compresses with the same one, and can decompress bodies compressed
+    with any of them.
+    Attributes:
+        hash (bytes): The SHA-256 of the dictionary. Primary key.
+        data (bytes): The raw dictionary.
+        created_at (int): When the dictionary was stored, in milliseconds
+                          since the Unix epoch. The newest is current.
+    """
+    __tablename__ = "codec_dictionaries"
+
+    hash = Column(LargeBinary, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(Integer, nullable=False)
+
+
+# Supports case-insensitive prefix search, see search_items()
+Index("ix_items_name_nocase", Item.name.collate("NOCASE"))
+
+# Columns the inventory can be sorted by, keyed by their public name
+SORT_COLUMNS = {"name": Item.name, "quantity": Item.quantity, "id": Item.id}
 
 
 def create_tables():
@@ -40,10 +331,110 @@ def create_tables():
     This function initializes the database by creating all the tables defined
     in the metadata of the Base class. It uses the engine to connect to the
     database and execute the necessary SQL commands to create the tables.
+    Tables created by earlier versions are upgraded in place, and the
+    inventory counters are initialized if they are missing.
     Returns:
         None
     """
     Base.metadata.create_all(engine)
+    _upgrade_tables()
+    _create_search_index()
+
+    with get_database_session() as session:
+        present = set(session.scalars(select(InventoryMeta.key)))
+        defaults = {
+            "revision": 0,
+            "compacted_through": 0,
+            "epoch": secrets.randbits(31)
+        }
+        session.add_all(
+            InventoryMeta(key=key, value=value)
+            for key, value in defaults.items() if key not in present
+        )
+
+
+def _upgrade_tables():
+    """
+    Add columns and indexes introduced after a database was first created.
+    `create_all` only creates missing tables, so existing `items` tables
+    are given the `revision` column and the newer indexes here.
+    Returns:
+        None
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("items")}
+    if "revision" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE items "
+                "ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"
+            ))
+    for index in Item.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def _create_search_index():
+    """
+    Create the full-text index used by `search_items` on SQLite.
+    `items_fts` is an FTS5 table with the trigram tokenizer over
+    `items.name`, so any run of three or more characters of a name can be
+    looked up case-insensitively. It stores no copy of the names; triggers
+    keep it in step with every insert, delete and rename of an item, so all
+    write paths update it in the same transaction. `items_fts_vocab` lists
+    how many names contain each trigram. An index created for an existing
+    database is filled from the items already stored.
+    If SQLite was built without FTS5 or the trigram tokenizer, no index is
+    created and searches fall back to scanning names.
+    Returns:
+        None
+    """
+    if not storage_config.is_sqlite:
+        return
+    with engine.begin() as connection:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'items_fts'"
+        )).first()
+        try:
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+                "name, content='items', content_rowid='id', "
+                "tokenize='trigram')"
+            ))
+        except OperationalError:
+            logging.warning(
+                "SQLite lacks FTS5 trigram support; name search will scan "
+                "the items table"
+            )
+            return
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts_vocab "
+            "USING fts5vocab(items_fts, 'row')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS items_fts_insert "
+            "AFTER INSERT ON items BEGIN "
+            "INSERT INTO items_fts (rowid, name) VALUES (new.id, new.name); "
+            "END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS items_fts_delete "
+            "AFTER DELETE ON items BEGIN "
+            "INSERT INTO items_fts (items_fts, rowid, name) "
+            "VALUES ('delete', old.id, old.name); "
+            "END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS items_fts_update "
+            "AFTER UPDATE OF name ON items BEGIN "
+            "INSERT INTO items_fts (items_fts, rowid, name) "
+            "VALUES ('delete', old.id, old.name); "
+            "INSERT INTO items_fts (rowid, name) VALUES (new.id, new.name); "
+            "END"
+        ))
+        if not exists:
+            connection.execute(text(
+                "INSERT INTO items_fts (items_fts) VALUES ('rebuild')"
+            ))
+    _search_index_cache.clear()
 
 
 @contextmanager
@@ -61,15 +452,332 @@ def get_database_session():
                    with the error message.
     """
     session = Session()
+    if session.bind is not engine:
+        # This thread's session predates `configure_database`
+        Session.remove()
+        session = Session()
+    outcome = "error"
+    db_sessions_active.inc()
     try:
         yield session
-        session.commit()
+        changes = session.info.pop("inventory_changes", None)
+        if not changes:
+            session.commit()
+        else:
+            with _commit_lock:
+                revision = _write_changelog(session, changes)
+                session.commit()
+                _notify_change_listeners(revision, changes)
+        outcome = "commit"
     except SQLAlchemyError as e:
         session.rollback()
+        outcome = "rollback"
         raise Exception(f"Database error: {e}")
     finally:
+        session.info.pop("inventory_changes", None)
         session.expunge_all()
         session.close()
+        db_sessions_active.dec()
+        db_sessions.inc(outcome=outcome)
+
+
+def _collect_pool_stats():
+    """
+    Refresh the connection pool gauges before metrics are rendered.
+    Pools that do not track their connections, such as the single shared
+    connection of an in-memory database, are skipped.
+    """
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return
+    db_pool.set(pool.size(), state="size")
+    db_pool.set(pool.checkedin(), state="idle")
+    db_pool.set(pool.checkedout(), state="checked_out")
+    db_pool.set(max(pool.overflow(), 0), state="overflow")
+
+
+registry.add_collector(_collect_pool_stats)
+
+
+def _record_change(session, kind: str, name: str, quantity: int | None):
+    """
+    Record a change to the items made in the session's current transaction.
+    When the transaction commits, the changes are written to the changelog
+    under a new inventory revision, which invalidates cached views of the
+    inventory, and the change listeners are notified.
+    Args:
+        session (Session): The session making the change.
+        kind (str): 'added', 'removed' or 'quantity_changed'.
+        name (str): The name of the changed item.
+        quantity (int, optional): The item's quantity after the change.
+    Returns:
+        None
+    """
+    session.info.setdefault("inventory_changes", []).append(
+        (kind, name, quantity)
+    )
+
+
+def _write_changelog(session, changes: list):
+    """
+    Allocate the next revision and write a transaction's changes under it.
+    The revision counter is incremented with a single UPDATE ... RETURNING,
+    which is atomic across threads and processes. The changes are appended
+    to the changelog, and the changed items are stamped with the revision.
+    Every `COMPACTION_INTERVAL` revisions, changelog entries older than
+    the configured retention are deleted.
+    Args:
+        session (Session): The session whose transaction made the changes.
+        changes (list): The (kind, name, quantity) tuples.
+    Returns:
+        int: The new revision.
+    """
+    revision = session.execute(
+        update(InventoryMeta)
+        .where(InventoryMeta.key == "revision")
+        .values(value=InventoryMeta.value + 1)
+        .returning(InventoryMeta.value)
+    ).scalar_one()
+
+    session.execute(insert(ItemChange), [
+        {"revision": revision, "kind": kind, "name": name, "quantity": q}
+        for kind, name, q in changes
+    ])
+
+    # The last change to each item decides whether it still exists
+    final_kinds = {name: kind for kind, name, _ in changes}
+    present = [n for n, kind in final_kinds.items() if kind != "removed"]
+    for chunk in _chunks(present, BATCH_CHUNK_SIZE):
+        session.execute(
+            update(Item).where(Item.name.in_(chunk)).values(revision=revision)
+        )
+
+    if revision % COMPACTION_INTERVAL == 0:
+        retention = storage_config.changelog_retention
+        _compact_changelog(session, revision - retention)
+    return revision
+
+
+def _compact_changelog(session, through_revision: int):
+    """
+    Delete changelog entries up to and including a revision.
+    Clients that last synced before that revision must then do a full
+    resync.
+    Args:
+        session (Session): The session to use.
+        through_revision (int): The newest revision to delete.
+    Returns:
+        None
+    """
+    if through_revision <= 0:
+        return
+    session.execute(
+        delete(ItemChange).where(ItemChange.revision <= through_revision)
+    )
+    session.execute(
+        update(InventoryMeta)
+        .where(
+            InventoryMeta.key == "compacted_through",
+            InventoryMeta.value < through_revision
+        )
+        .values(value=through_revision)
+    )
+
+
+def compact_changelog(through_revision: int):
+    """
+    Delete changelog entries up to and including a revision.
+    Args:
+        through_revision (int): The newest revision to delete.
+    Returns:
+        None
+    """
+    with get_database_session() as session:
+        _compact_changelog(session, through_revision)
+
+
+def _notify_change_listeners(revision: int, changes: list):
+    """
+    Call every change listener with a committed revision.
+    A failing listener is logged and does not affect the write or the other
+    listeners.
+    Args:
+        revision (int): The committed revision.
+        changes (list): The (kind, name, quantity) tuples committed with it.
+    Returns:
+        None
+    """
+    for listener in list(_change_listeners):
+        try:
+            listener(revision, changes)
+        except Exception:
+            logging.exception("Inventory change listener failed")
+
+
+def add_change_listener(listener):
+    """
+    Register a function to be called after every committed change.
+    The listener is called from the thread that committed the transaction,
+    with the new revision and the list of (kind, name, quantity) tuples.
+    Args:
+        listener (callable): The function to register.
+    Returns:
+        None
+    """
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener):
+    """
+    Unregister a function added with `add_change_listener`.
+    Args:
+        listener (callable): The function to unregister.
+    Returns:
+        None
+    """
+    _change_listeners.remove(listener)
+
+
+def get_revision():
+    """
+    Return the current inventory revision.
+    The revision is stored in the database and increases monotonically
+    every time a committed transaction adds, removes or updates items, so
+    it is shared by every process using the database.
+    Returns:
+        int: The current revision.
+    """
+    with get_database_session() as session:
+        return session.scalar(
+            select(InventoryMeta.value)
+            .where(InventoryMeta.key == "revision")
+        ) or 0
+
+
+def get_database_epoch():
+    """
+    Return the random epoch identifying the current database.
+    Returns:
+        int: The epoch, or 0 if the tables have not been created.
+    """
+    if "epoch" not in _epoch_cache:
+        with get_database_session() as session:
+            epoch = session.scalar(
+                select(InventoryMeta.value)
+                .where(InventoryMeta.key == "epoch")
+            )
+        if epoch is None:
+            return 0
+        _epoch_cache["epoch"] = epoch
+    return _epoch_cache["epoch"]
+
+
+def get_changes_since(since: int, limit: int = 10000):
+    """
+    Describe how the inventory changed after a given revision.
+    Items stamped with a newer revision are returned with their current
+    quantity, and items removed since then are listed by name. If the
+    changelog no longer reaches back to `since`, if `since` is ahead of the
+    database, or if more than `limit` items changed, the caller is told to
+    reload the whole inventory instead.
+    Args:
+        since (int): The last revision the caller has seen.
+        limit (int): The maximum number of changed items to return.
+                     Defaults to 10000.
+    Returns:
+        dict: The current 'revision' and 'resync_required' flag, plus
+              'upserted' (a list of dicts with 'name' and 'quantity' keys)
+              and 'deleted' (a list of names) when no resync is required.
+    """
+    with get_database_session() as session:
+        meta = dict(session.execute(
+            select(InventoryMeta.key, InventoryMeta.value)
+        ).all())
+        revision = meta.get("revision", 0)
+        resync = {"revision": revision, "resync_required": True}
+        if since < meta.get("compacted_through", 0) or since > revision:
+            return resync
+
+        upserted = session.execute(
+            select(Item.name, Item.quantity)
+            .where(Item.revision > since)
+            .order_by(Item.revision)
+            .limit(limit + 1)
+        ).all()
+        deleted = session.scalars(
+            select(ItemChange.name).distinct()
+            .outerjoin(Item, Item.name == ItemChange.name)
+            .where(
+                ItemChange.revision > since,
+                ItemChange.kind == "removed",
+                Item.id.is_(None)
+            )
+            .limit(limit + 1)
+        ).all()
+
+    if len(upserted) + len(deleted) > limit:
+        return resync
+    return {
+        "revision": revision,
+        "resync_required": False,
+        "upserted": [
+            {"name": name, "quantity": quantity}
+            for name, quantity in upserted
+        ],
+        "deleted": list(deleted)
+    }
+
+
+def get_changelog(since: int, max_revisions: int = 1000):
+    """
+    Read the changes committed after a revision, revision by revision.
+    Unlike `get_changes_since`, every change is returned as it was
+    committed, so the result can be replayed to change listeners.
+    Args:
+        since (int): The last revision already read.
+        max_revisions (int): The maximum number of revisions to return.
+                             Defaults to 1000.
+    Returns:
+        tuple: The newest revision covered by the result and a list of
+               (revision, changes) tuples in revision order, where changes
+               are (kind, name, quantity) tuples. None if the changelog no
+               longer reaches back to `since` or `since` is ahead of the
+               database.
+    """
+    with get_database_session() as session:
+        meta = dict(session.execute(
+            select(InventoryMeta.key, InventoryMeta.value)
+        ).all())
+        revision = meta.get("revision", 0)
+        if since < meta.get("compacted_through", 0) or since > revision:
+            return None
+
+        through = min(revision, since + max_revisions)
+        rows = session.execute(
+            select(
+                ItemChange.revision, ItemChange.kind, ItemChange.name,
+                ItemChange.quantity
+            )
+            .where(ItemChange.revision > since,
+                   ItemChange.revision <= through)
+            .order_by(ItemChange.revision, ItemChange.id)
+        ).all()
+
+    changelog = []
+    for change_revision, kind, name, quantity in rows:
+        if not changelog or changelog[-1][0] != change_revision:
+            changelog.append((change_revision, []))
+        changelog[-1][1].append((kind, name, quantity))
+    return through, changelog
+
+
+def _add_item(session, name: str, quantity: int):
+    new_item = Item(name=name, quantity=quantity)
+    session.add(new_item)
+    session.flush()
+    session.refresh(new_item)
+    _record_change(session, "added", name, new_item.quantity)
+    return new_item
 
 
 def add_item(name: str, quantity: int):
@@ -82,11 +790,16 @@ def add_item(name: str, quantity: int):
         Item: The newly added item with its latest state from the database.
     """
     with get_database_session() as session:
-        new_item = Item(name=name, quantity=quantity)
-        session.add(new_item)
-        session.flush()
-        session.refresh(new_item)
-        return new_item
+        return _add_item(session, name, quantity)
+
+
+def _remove_item(session, name: str):
+    item = session.query(Item).filter_by(name=name).first()
+    if item:
+        session.delete(item)
+        _record_change(session, "removed", name, None)
+        return item
+    raise ValueError("Item not found.")
 
 
 def remove_item(name: str):
@@ -100,11 +813,18 @@ def remove_item(name: str):
         ValueError: If the item with the given name is not found.
     """
     with get_database_session() as session:
-        item = session.query(Item).filter_by(name=name).first()
-        if item:
-            session.delete(item)
-            return item
-        raise ValueError("Item not found.")
+        return _remove_item(session, name)
+
+
+def _update_quantity(session, name: str, new_quantity: int):
+    item = session.query(Item).filter_by(name=name).first()
+    if item:
+        item.quantity = new_quantity
+        session.flush()  # Ensure changes are applied
+        session.refresh(item)  # Refresh to get the latest state
+        _record_change(session, "quantity_changed", name, item.quantity)
+        return item
+    raise ValueError("Item not found.")
 
 
 def update_quantity(name: str, new_quantity: int):
@@ -119,13 +839,417 @@ def update_quantity(name: str, new_quantity: int):
         ValueError: If the item with the specified name is not found.
     """
     with get_database_session() as session:
-        item = session.query(Item).filter_by(name=name).first()
-        if item:
-            item.quantity = new_quantity
-            session.flush()  # Ensure changes are applied
-            session.refresh(item)  # Refresh to get the latest state
-            return item
-        raise ValueError("Item not found.")
+        return _update_quantity(session, name, new_quantity)
+
+
+def _adjust_quantity(session, name: str, delta: int, minimum: int = 0):
+    row = session.execute(
+        update(Item)
+        .where(Item.name == name, Item.quantity + delta >= minimum)
+        .values(quantity=Item.quantity + delta)
+        .returning(Item.name, Item.quantity)
+    ).first()
+    if row:
+        _record_change(session, "quantity_changed", row.name, row.quantity)
+        return row.name, row.quantity
+
+    # Only pay for a lookup on the failure path
+    exists = session.execute(
+        select(Item.id).where(Item.name == name)
+    ).first()
+    if exists:
+        raise InsufficientQuantityError(
+            f"Quantity cannot go below {minimum}."
+        )
+    raise ValueError("Item not found.")
+
+
+def adjust_quantity(name: str, delta: int, minimum: int = 0):
+    """
+    Atomically add a delta to the quantity of an item in the database.
+    The change is applied with a single conditional UPDATE ... RETURNING
+    statement, so concurrent adjustments never overwrite each other and the
+    quantity can never drop below `minimum`.
+    Args:
+        name (str): The name of the item to adjust.
+        delta (int): The amount to add to the quantity (negative to remove).
+        minimum (int): The lowest quantity the item is allowed to reach.
+                       Defaults to 0.
+    Returns:
+        tuple: The item's name and its new quantity.
+    Raises:
+        ValueError: If the item with the specified name is not found.
+        InsufficientQuantityError: If the adjustment would take the quantity
+                                   below `minimum`.
+    """
+    with get_database_session() as session:
+        return _adjust_quantity(session, name, delta, minimum)
+
+
+# Write functions that `apply_writes` can run together in one transaction
+WRITE_FUNCTIONS = {
+    "add_item": _add_item,
+    "remove_item": _remove_item,
+    "update_quantity": _update_quantity,
+    "adjust_quantity": _adjust_quantity,
+}
+
+
+def _begin_write_transaction(session):
+    """
+    Start the session's transaction by taking SQLite's write lock.
+    The sqlite3 driver only opens a transaction before the first data
+    changing statement, so a SAVEPOINT issued first would open and, when
+    released, commit a transaction of its own. Beginning the transaction
+    explicitly keeps every savepoint inside it, and taking the write lock
+    up front means the reads made by the operations cannot be invalidated
+    by another writer before their own writes.
+    Args:
+        session (Session): The session about to run the writes.
+    """
+    if not storage_config.is_sqlite:
+        return
+    dbapi_connection = session.connection().connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        # Not already inside a transaction opened by this session's writes
+        session.execute(text("BEGIN IMMEDIATE"))
+
+
+def apply_writes(calls: list):
+    """
+    Run several independent writes in a single transaction.
+    This is the group commit used for concurrent write requests: the writes
+    share one commit, and so one fsync and one inventory revision, instead
+    of paying for one each. Every write runs under its own SAVEPOINT, so a
+    write that fails is rolled back on its own and does not affect the
+    others, and each caller receives the outcome of its own write.
+    Args:
+        calls (list): (name, args) tuples, where name is a key of
+                      `WRITE_FUNCTIONS` and args are the arguments of the
+                      public function of that name.
+    Returns:
+        list: One (succeeded, value) tuple per call, in the same order. The
+              value is the function's return value, with items detached
+              from the session, or the exception it raised.
+    Raises:
+        Exception: If the transaction itself cannot be committed, in which
+                   case none of the writes were applied.
+    """
+    outcomes = []
+    with get_database_session() as session:
+        _begin_write_transaction(session)
+        for name, args in calls:
+            changes = session.info.setdefault("inventory_changes", [])
+            recorded = len(changes)
+            try:
+                with session.begin_nested():
+                    result = WRITE_FUNCTIONS[name](session, *args)
+            except Exception as e:
+                # Forget the changes recorded by the rolled back write
+                del changes[recorded:]
+                if isinstance(e, SQLAlchemyError):
+                    e = Exception(f"Database error: {e}")
+                outcomes.append((False, e))
+                continue
+            if isinstance(result, Item):
+                # Later writes in the batch may change the same item
+                result = Item(
+                    id=result.id, name=result.name, quantity=result.quantity
+                )
+            outcomes.append((True, result))
+    return outcomes
+
+
+def encode_cursor(value, item_id: int):
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    Args:
+        value: The value of the sort column for the last row.
+        item_id (int): The id of the last row, used as a tiebreaker.
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = json.dumps([value, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor produced by `encode_cursor`.
+    Args:
+        cursor (str): The cursor string.
+    Returns:
+        tuple: The sort column value and the item id.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return value, int(item_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def get_inventory_page(limit: int | None = None, cursor: str | None = None,
+                       sort: str = "name", order: str = "asc",
+                       q: str | None = None, match: str = "prefix"):
+    """
+    Retrieve one page of items using keyset pagination.
+    Rows are ordered by the sort column with the item id as a tiebreaker,
+    and the cursor holds the sort key of the last row of the previous page,
+    so each page is an index range scan whose cost does not depend on how
+    many rows come before it.
+    Args:
+        limit (int, optional): The maximum number of items to return. If not
+                               given, all matching items are returned.
+        cursor (str, optional): The cursor returned with the previous page.
+        sort (str): The column to sort by: 'name', 'quantity' or 'id'.
+                    Defaults to 'name'.
+        order (str): 'asc' or 'desc'. Defaults to 'asc'.
+        q (str, optional): Only return items whose name matches this text.
+        match (str): How `q` is matched: 'prefix' (case-sensitive, index
+                     backed) or 'contains' (case-insensitive substring).
+                     Defaults to 'prefix'.
+    Returns:
+        tuple: A list of rows with 'id', 'name' and 'quantity' fields and
+               the cursor for the next page, or None if this is the last
+               page.
+    Raises:
+        ValueError: If the sort column, order, match mode or cursor is
+                    invalid.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Invalid sort column: {sort}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Invalid sort order: {order}")
+    if match not in ("prefix", "contains"):
+        raise ValueError(f"Invalid match mode: {match}")
+
+    column = SORT_COLUMNS[sort]
+    query = select(Item.id, Item.name, Item.quantity)
+
+    if q:
+        if match == "prefix":
+            query = query.where(Item.name >= q, Item.name < q + "\U0010ffff")
+        else:
+            query = query.where(
+                Item.name.ilike(f"%{_escape_like(q)}%", escape="\\")
+            )
+
+    if cursor:
+        value, item_id = decode_cursor(cursor)
+        key = tuple_(column, Item.id)
+        if order == "asc":
+            query = query.where(key > tuple_(value, item_id))
+        else:
+            query = query.where(key < tuple_(value, item_id))
+
+    if order == "asc":
+        query = query.order_by(column.asc(), Item.id.asc())
+    else:
+        query = query.order_by(column.desc(), Item.id.desc())
+
+    if limit is not None:
+        # Fetch one extra row to find out whether there is a next page
+        query = query.limit(limit + 1)
+
+    items = _read_rows(query)
+
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, column.key), last.id)
+    return items, next_cursor
+
+
+def _escape_like(value: str):
+    """Escape the LIKE wildcards in a string, using backslash as escape."""
+    return (
+        value.replace("\\", "\\\\").replace("%", "\\%")
+        .replace("_", "\\_")
+    )
+
+
+def _trigrams(value: str):
+    """
+    Return the lower-cased three-character runs of a string, padded with a
+    space at each end so that word boundaries count as well.
+    """
+    value = f" {value.lower()} "
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _fts_string(value: str):
+    """Quote a string for use in an FTS5 MATCH expression."""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _has_search_index(session):
+    """
+    Check whether the current database has the FTS5 name index.
+    Args:
+        session (Session): The session to query with.
+    Returns:
+        bool: True if `items_fts` exists.
+    """
+    if "ready" not in _search_index_cache:
+        _search_index_cache["ready"] = storage_config.is_sqlite and bool(
+            session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'items_fts'"
+            )).first()
+        )
+    return _search_index_cache["ready"]
+
+
+def search_items(q: str, limit: int = 20, fuzzy: bool = True):
+    """
+    Search item names, best matches first.
+    Names starting with `q` come first, in name order. They are followed by
+    names containing `q` elsewhere, ranked by bm25, and then, if `fuzzy` is
+    set, by names containing at least `FUZZY_MIN_SIMILARITY` of the
+    trigrams of `q`, most similar first, which catches misspellings.
+    Matching is case-insensitive (for ASCII letters).
+    Each phase reads at most `SEARCH_CANDIDATES` rows through an index, so
+    a search costs about the same however large the inventory grows.
+    Substring and fuzzy matching need at least three characters and the
+    FTS5 trigram index; without the index, substrings are found by
+    scanning names and fuzzy matching is skipped.
+    Args:
+        q (str): The text to search for.
+        limit (int): The maximum number of results. Defaults to 20.
+        fuzzy (bool): Whether to include approximate matches. Defaults to
+                      True.
+    Returns:
+        list: Dicts with 'name', 'quantity' and 'match' ('prefix',
+              'substring' or 'fuzzy') keys.
+    Raises:
+        ValueError: If `q` is empty or `limit` is not positive.
+    """
+    q = q.strip()
+    if not q:
+        raise ValueError("Search text must not be empty.")
+    if limit < 1:
+        raise ValueError("Limit must be at least 1.")
+
+    results = {}
+
+    def collect(rows, match):
+        for name, quantity in rows:
+            if len(results) == limit:
+                return
+            results.setdefault(
+                name, {"name": name, "quantity": quantity, "match": match}
+            )
+
+    with get_database_session() as session:
+        key = Item.name.collate("NOCASE")
+        collect(session.execute(
+            select(Item.name, Item.quantity)
+            .where(key >= q, key < q + "\U0010ffff")
+            .order_by(key)
+            .limit(limit)
+        ).all(), "prefix")
+
+        if len(results) == limit or len(q) < 3:
+            return list(results.values())
+
+        indexed = _has_search_index(session)
+        if indexed:
+            # Rank a bounded set of candidates rather than every match
+            rows = session.execute(text(
+                "SELECT items.name, items.quantity FROM ("
+                "SELECT rowid, rank FROM items_fts WHERE items_fts MATCH :q "
+                "LIMIT :candidates) AS matches "
+                "JOIN items ON items.id = matches.rowid "
+                "ORDER BY matches.rank LIMIT :limit"
+            ), {
+                "q": _fts_string(q), "candidates": SEARCH_CANDIDATES,
+                "limit": 2 * limit
+            }).all()
+        else:
+            rows = session.execute(
+                select(Item.name, Item.quantity)
+                .where(Item.name.ilike(f"%{_escape_like(q)}%", escape="\\"))
+                .limit(2 * limit)
+            ).all()
+        collect(rows, "substring")
+
+        if len(results) == limit or not fuzzy or not indexed:
+            return list(results.values())
+
+        grams = _trigrams(q)
+        terms = session.scalars(
+            text(
+                "SELECT term FROM items_fts_vocab WHERE term IN :terms "
+                "ORDER BY doc LIMIT :count"
+            ).bindparams(bindparam("terms", expanding=True)),
+            {"terms": sorted(grams), "count": FUZZY_TRIGRAMS}
+        ).all()
+        if not terms:
+            return list(results.values())
+        candidates = session.execute(text(
+            "SELECT name, quantity FROM items WHERE id IN ("
+            "SELECT rowid FROM items_fts WHERE items_fts MATCH :terms "
+            "LIMIT :candidates)"
+        ), {
+            "terms": " OR ".join(_fts_string(term) for term in terms),
+            "candidates": SEARCH_CANDIDATES
+        }).all()
+
+    scored = []
+    for name, quantity in candidates:
+        if name in results:
+            continue
+        similarity = len(grams & _trigrams(name)) / len(grams)
+        if similarity >= FUZZY_MIN_SIMILARITY:
+            scored.append((-similarity, len(name), name, quantity))
+    scored.sort()
+    collect([(name, quantity) for _, _, name, quantity in scored], "fuzzy")
+    return list(results.values())
+
+
+def _read_rows(query):
+    """
+    Run a read-only query on a plain connection, without building ORM
+    objects or tracking them in a session.
+    Args:
+        query (Select): The Core select to run.
+    Returns:
+        list: The result rows as named tuples.
+    """
+    with engine.connect() as connection:
+        return connection.execute(query).all()
+
+
+def get_inventory_rows():
+    """
+    Retrieve the name and quantity of every item, ordered by name.
+    Returns:
+        list: The rows as (name, quantity) named tuples.
+    """
+    return _read_rows(
+        select(Item.name, Item.quantity).order_by(Item.name)
+    )
+
+
+def iter_inventory(batch_size: int = 1000):
+    """
+    Stream every item, ordered by name, in batches.
+    The rows are read through a single server-side cursor, so only one
+    batch is held in memory at a time however large the inventory is.
+    Args:
+        batch_size (int): The number of rows fetched per batch.
+    Yields:
+        list: The next batch of (name, quantity) rows.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(
+            select(Item.name, Item.quantity).order_by(Item.name)
+        )
+        for partition in result.partitions():
+            yield partition
 
 
 def get_inventory():
@@ -138,3 +1262,163 @@ def get_inventory():
     """
     with get_database_session() as session:
         return session.query(Item).all()
+
+
+def _chunks(values, size):
+    """
+    Split a list into consecutive chunks of at most `size` elements.
+    Args:
+        values (list): The list to split.
+        size (int): The maximum chunk length.
+    Yields:
+        list: The next chunk of values.
+    """
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def apply_batch(operations: list):
+    """
+    Apply a list of add/remove/update operations in a single transaction.
+    The operations are resolved in order against one bulk lookup of the
+    referenced items, and the net result is written back with bulk
+    INSERT, UPDATE and DELETE statements followed by a single commit.
+    An operation that cannot be applied (for example, removing an item that
+    does not exist) is reported in its result and does not affect the others.
+    Args:
+        operations (list): A list of dicts with 'op' ('add', 'remove' or
+                           'update'), 'name' and, for add and update
+                           operations, 'quantity' keys.
+    Returns:
+        list: One result dict per operation, in the same order, with the
+              operation, item name, 'status' ('success' or 'error') and
+              either the resulting 'quantity' or an error 'detail'.
+    """
+    names = list({op["name"] for op in operations})
+    results = []
+
+    with get_database_session() as session:
+        # Lock before the lookup, so concurrent batches cannot both
+        # decide to insert the same name
+        _begin_write_transaction(session)
+        existing = {}
+        for chunk in _chunks(names, BATCH_CHUNK_SIZE):
+            rows = session.execute(
+                select(Item.id, Item.name, Item.quantity)
+                .where(Item.name.in_(chunk))
+            )
+            for row in rows:
+                existing[row.name] = (row.id, row.quantity)
+
+        # Replay the operations against an in-memory view of the items
+        state = {name: quantity for name, (_, quantity) in existing.items()}
+        for op in operations:
+            kind, name = op["op"], op["name"]
+            result = {"op": kind, "name": name}
+            quantity = op.get("quantity")
+
+            if kind in ("add", "update") and quantity is None:
+                error = "Quantity is required."
+            elif kind == "add" and name in state:
+                error = "Item already exists."
+            elif kind in ("remove", "update") and name not in state:
+                error = "Item not found."
+            elif kind not in ("add", "remove", "update"):
+                error = f"Unknown operation: {kind}"
+            else:
+                error = None
+
+            if error:
+                result.update(status="error", detail=error)
+            elif kind == "remove":
+                result.update(status="success", quantity=state.pop(name))
+            else:
+                state[name] = quantity
+                result.update(status="success", quantity=quantity)
+            results.append(result)
+
+        deletes = [
+            item_id for name, (item_id, _) in existing.items()
+            if name not in state
+        ]
+        inserts = [
+            {"name": name, "quantity": quantity}
+            for name, quantity in state.items() if name not in existing
+        ]
+        updates = [
+            {"id": existing[name][0], "quantity": quantity}
+            for name, quantity in state.items()
+            if name in existing and existing[name][1] != quantity
+        ]
+
+        for chunk in _chunks(deletes, BATCH_CHUNK_SIZE):
+            session.execute(delete(Item).where(Item.id.in_(chunk)))
+        if inserts:
+            session.execute(insert(Item), inserts)
+        if updates:
+            session.execute(update(Item), updates)
+
+        for name in existing:
+            if name not in state:
+                _record_change(session, "removed", name, None)
+            elif existing[name][1] != state[name]:
+                _record_change(
+                    session, "quantity_changed", name, state[name]
+                )
+        for row in inserts:
+            _record_change(session, "added", row["name"], row["quantity"])
+
+    return results
+
+
+def upsert_items(records: list):
+    """
+    Insert or update items by name in a single transaction.
+    Items that do not exist yet are added with the given quantity and
+    existing items have their quantity set to it. When a name appears more
+    than once, its last quantity wins.
+    Args:
+        records (list): A list of (name, quantity) pairs.
+    Returns:
+        dict: The number of items 'added', 'updated' and left 'unchanged'.
+    """
+    quantities = dict(records)
+
+    with get_database_session() as session:
+        # Lock before the lookup, so concurrent imports cannot both decide
+        # to insert the same name
+        _begin_write_transaction(session)
+        existing = {}
+        for chunk in _chunks(list(quantities), BATCH_CHUNK_SIZE):
+            rows = session.execute(
+                select(Item.id, Item.name, Item.quantity)
+                .where(Item.name.in_(chunk))
+            )
+            for row in rows:
+                existing[row.name] = (row.id, row.quantity)
+
+        inserts = [
+            {"name": name, "quantity": quantity}
+            for name, quantity in quantities.items() if name not in existing
+        ]
+        updates = [
+            {"id": existing[name][0], "quantity": quantity}
+            for name, quantity in quantities.items()
+            if name in existing and existing[name][1] != quantity
+        ]
+        if inserts:
+            session.execute(insert(Item), inserts)
+        if updates:
+            session.execute(update(Item), updates)
+
+        for row in inserts:
+            _record_change(session, "added", row["name"], row["quantity"])
+        for name, quantity in quantities.items():
+            if name in existing and existing[name][1] != quantity:
+                _record_change(session, "quantity_changed", name, quantity)
+
+    return {
+        "added": len(inserts),
+        "updated": len(updates),
+        "unchanged": len(quantities) - len(inserts) - len(updates)
+    }
@@ -1,26 +1,76 @@
-import logging
 import asyncio
-from fastapi import APIRouter, HTTPException
+import time
+from typing import Literal
+from fastapi import (
+    APIRouter, Depends, HTTPException, Query, Request, Response
+)
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from .database import add_item, remove_item, update_quantity, get_inventory
+from .database import get_revision, InsufficientQuantityError
+from .async_database import (
+    add_item, remove_item, update_quantity, adjust_quantity,
+    get_changes_since, apply_batch, upsert_items, iter_inventory,
+    search_items, run_in_db_executor
+)
+from .bulk import BULK_FORMATS, CSV_HEADER_LINE, format_rows, read_records
+from .cache import (
+    inventory_snapshot, render_inventory_page, make_etag, current_etag,
+    etag_matches
+)
+from .codec import compression_dictionary
+from .serialization import FastJSONResponse
+from .events import event_bus, format_event, hello_event
+from .admission import admission_control
+from .latency import simulate_latency, delay_for
+from .jobs import (
+    job_queue, create_job, set_job_status, get_jobs, prefers_async,
+    JobQueueFull
+)
+from .singleflight import read_coalescer
+from .request_log import request_logger
+from .metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .transforms import (
+    decode_batch, parse_transform, summarize_batch, TRANSFORM_FIELDS
+)
+# server.transform_store is imported by the endpoints that use it: it loads
+# numpy, which the application should not pay for until a transform arrives
 
-# Initialize Router
-router = APIRouter()
+# Seconds between keepalive comments on idle event streams
+EVENT_KEEPALIVE_INTERVAL = 15
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Most jobs whose status can be looked up in one request
+MAX_JOB_LOOKUP = 100
 
+# Rows per chunk of an export stream and records per import transaction
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
 
-def log_request(endpoint: str, data: dict):
+# Initialize Router; concurrency limits are configured by
+# DCC_ADMISSION_LIMITS and simulated latency by DCC_LATENCY_PROFILE
+router = APIRouter(
+    dependencies=[Depends(admission_control), Depends(simulate_latency)],
+    default_response_class=FastJSONResponse
+)
+
+# Operational endpoints, kept free of simulated latency
+monitoring_router = APIRouter()
+
+
+def log_request(endpoint: str, data=None):
     """
     Logs an incoming request to a specified endpoint with the provided data.
+    Only a sampled fraction of requests is logged (see DCC_LOG_SAMPLE_RATE
+    and DCC_LOG_SAMPLE_RATES), and the record is rendered and written as
+    JSON on a background thread.
     Args:
         endpoint (str): The endpoint that received the request.
-        data (dict): The data associated with the request.
+        data: The data associated with the request: a dict, a request
+              model or a callable returning either, rendered only if the
+              request is logged.
     Returns:
         None
     """
-    logging.info(f"Received request to {endpoint} with data: {data}")
+    request_logger.log(endpoint, data)
 
 
 # Request Models
@@ -29,6 +79,13 @@ class TransformData(BaseModel):
     transform: dict
 
 
+class BatchTransformData(BaseModel):
+    objects: list[str]
+    position: list[float] | str | None = None
+    rotation: list[float] | str | None = None
+    scale: list[float] | str | None = None
+
+
 class AddItem(BaseModel):
     name: str
     quantity: int
@@ -43,68 +100,365 @@ class UpdateItem(BaseModel):
     new_quantity: int
 
 
-# Transformation Endpoints
+class AdjustItem(BaseModel):
+    name: str
+    delta: int
+    min: int = 0
+
+
+class BatchOperation(BaseModel):
+    op: Literal["add", "remove", "update"]
+    name: str
+    quantity: int | None = None
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation]
+
+
+# Response Models, used to document the read endpoints; their bodies are
+# serialized directly rather than validated against these
+class InventoryItem(BaseModel):
+    name: str
+    quantity: int
+
+
+class InventoryResponse(BaseModel):
+    status: str
+    inventory: list[InventoryItem]
+    next_cursor: str | None = None
+
+
+class SearchResult(BaseModel):
+    name: str
+    quantity: int
+    match: Literal["prefix", "substring", "fuzzy"]
+
+
+class SearchResponse(BaseModel):
+    status: str
+    results: list[SearchResult]
+
+
+class InventoryChangesResponse(BaseModel):
+    status: str
+    revision: int
+    resync_required: bool
+    upserted: list[InventoryItem] = []
+    deleted: list[str] = []
+
+
+async def store_transform(data: TransformData,
+                          fields: tuple = TRANSFORM_FIELDS):
+    """
+    Persists the storable components of a single object's transform.
+    Args:
+        data (TransformData): The transformation data.
+        fields (tuple): The components handled by the endpoint.
+    Returns:
+        None
+    Raises:
+        HTTPException: If the transform could not be stored
+                       (status code 400).
+    """
+    from .transform_store import record_transforms
+    arrays = parse_transform(data.transform, fields)
+    if not arrays:
+        return
+    try:
+        await run_in_db_executor(record_transforms, [data.object], arrays)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _run_transform_job(route: str, name: str, arrays: dict, result: dict):
+    """
+    Perform a transform submitted as a background job.
+    Runs on a job worker thread, which also waits out the route's
+    simulated latency that the request itself skipped.
+    Args:
+        route (str): The endpoint the job was submitted to.
+        name (str): The object name.
+        arrays (dict): The parsed transform components.
+        result (dict): The response the endpoint would have returned.
+    Returns:
+        dict: `result`, once the transform is stored.
+    """
+    from .transform_store import record_transforms
+    delay = delay_for(route)
+    if delay > 0:
+        time.sleep(delay)
+    if arrays:
+        record_transforms([name], arrays)
+    return result
+
+
+async def run_transform(request: Request, data: TransformData,
+                        fields: tuple, result: dict, priority: int):
+    """
+    Stores a single object's transform, or queues it as a background job.
+    When the client sent 'Prefer: respond-async', the transform is queued
+    behind any earlier jobs for the same object and a 202 response
+    pointing at its job is returned right away; otherwise the transform
+    is stored before `result` is returned.
+    Args:
+        request (Request): The incoming request.
+        data (TransformData): The transformation data.
+        fields (tuple): The components handled by the endpoint.
+        result (dict): The response of the endpoint.
+        priority (int): The job's priority; higher runs first.
+    Returns:
+        dict | Response: `result`, or the 202 response of a queued job.
+    Raises:
+        HTTPException: If the transform could not be stored (status code
+                       400), or if too many jobs are waiting (status code
+                       503).
+    """
+    if not prefers_async(request):
+        await store_transform(data, fields)
+        return result
+
+    route = request.scope["route"].path
+    arrays = parse_transform(data.transform, fields)
+    job_id = await run_in_db_executor(create_job, route, priority)
+    try:
+        job_queue.submit(
+            job_id, _run_transform_job, route, data.object, arrays, result,
+            priority=priority, key=data.object
+        )
+    except JobQueueFull as e:
+        await run_in_db_executor(
+            set_job_status, job_id, "failed", error=str(e)
+        )
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
+    return FastJSONResponse(
+        {"status": "accepted", "job_id": job_id},
+        status_code=202,
+        headers={
+            "Location": f"/jobs/{job_id}",
+            "Preference-Applied": "respond-async"
+        }
+    )
+
+
+# Transformation Endpoints; each runs as a background job when the client
+# sends 'Prefer: respond-async', see run_transform()
 @router.post("/transform", status_code=200)
-async def transform(data: TransformData):
+async def transform(data: TransformData, request: Request,
+                    priority: int = 0):
     """
     Asynchronously transforms the given data.
     Args:
         data (TransformData): The data to be transformed.
+        request (Request): The incoming request.
+        priority (int): The priority of the job, if run as one.
     Returns:
         dict: A dictionary containing the status of the transformation and the
         transformed data.
     """
-    await asyncio.sleep(10)
-    log_request("/transform", data.model_dump())
-    return {"status": "success", "data": data}
+    log_request("/transform", data)
+    return await run_transform(
+        request, data, TRANSFORM_FIELDS,
+        {"status": "success", "data": data.model_dump()}, priority
+    )
 
 
 @router.post("/translation", status_code=200)
-async def translation(data: TransformData):
+async def translation(data: TransformData, request: Request,
+                      priority: int = 0):
     """
     Handle the translation request.
     Args:
         data (TransformData): The transformation data containing the
         position information.
+        request (Request): The incoming request.
+        priority (int): The priority of the job, if run as one.
     Returns:
         dict: A dictionary containing the status of the request and the
         position data.
     """
-    await asyncio.sleep(10)
-    log_request("/translation", data.model_dump())
-    return {"status": "success", "position": data.transform.get('position')}
+    log_request("/translation", data)
+    return await run_transform(
+        request, data, ("position",),
+        {"status": "success", "position": data.transform.get('position')},
+        priority
+    )
 
 
 @router.post("/rotation", status_code=200)
-async def rotation(data: TransformData):
+async def rotation(data: TransformData, request: Request,
+                   priority: int = 0):
     """
     Handle the rotation endpoint.
     Args:
         data (TransformData): The transformation data containing the
         transformation information.
+        request (Request): The incoming request.
+        priority (int): The priority of the job, if run as one.
     Returns:
         dict: A dictionary containing the status of the request and the
         rotation data.
     """
-    await asyncio.sleep(10)
-    log_request("/rotation", data.model_dump())
-    return {"status": "success", "rotation": data.transform.get('rotation')}
+    log_request("/rotation", data)
+    return await run_transform(
+        request, data, ("rotation",),
+        {"status": "success", "rotation": data.transform.get('rotation')},
+        priority
+    )
 
 
 @router.post("/scale", status_code=200)
-async def scale(data: TransformData):
+async def scale(data: TransformData, request: Request, priority: int = 0):
     """
     Asynchronously scales a given transform data.
     Args:
         data (TransformData): The transformation data containing the
         scale information.
+        request (Request): The incoming request.
+        priority (int): The priority of the job, if run as one.
     Returns:
         dict: A dictionary containing the status of the request and the
         scale value.
     """
-    await asyncio.sleep(10)
-    log_request("/scale", data.model_dump())
-    return {"status": "success", "scale": data.transform.get('scale')}
+    log_request("/scale", data)
+    return await run_transform(
+        request, data, ("scale",),
+        {"status": "success", "scale": data.transform.get('scale')},
+        priority
+    )
+
+
+@router.post("/transform/batch", status_code=200)
+async def transform_batch(data: BatchTransformData):
+    """
+    Asynchronously transforms many objects in one request.
+    The transforms are sent in columnar form: a list of object names and,
+    for each of position, rotation and scale, either a flat list of three
+    numbers per object or a base64 string of little-endian float32 values.
+    Each column is validated and processed as a whole array.
+    Args:
+        data (BatchTransformData): The object names and transform columns.
+    Returns:
+        dict: A dictionary containing the status of the request, the number
+        of objects processed, the fields received and their per-axis
+        bounds.
+    Raises:
+        HTTPException: If the batch is malformed (status code 422).
+    """
+    from .transform_store import record_transforms
+    log_request("/transform/batch", {
+        "objects": len(data.objects),
+        "fields": [f for f in TRANSFORM_FIELDS if getattr(data, f) is not None]
+    })
+    try:
+        arrays = decode_batch(
+            data.objects, {f: getattr(data, f) for f in TRANSFORM_FIELDS}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        changed = await run_in_db_executor(
+            record_transforms, data.objects, arrays
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "success",
+        "count": len(data.objects),
+        "changed": changed,
+        "fields": list(arrays),
+        "bounds": summarize_batch(arrays)
+    }
+
+
+@router.get("/transforms", status_code=200)
+async def current_transforms(objects: list[str] | None = Query(None)):
+    """
+    Asynchronously retrieves the latest stored transform of every object.
+    Args:
+        objects (list, optional): Only return these objects.
+    Returns:
+        dict: A dictionary containing the status of the request and the
+        transforms keyed by object name, each with 'position', 'rotation',
+        'scale' and 'updated_at' (milliseconds since the Unix epoch).
+    """
+    from .transform_store import get_current_transforms
+    log_request("/transforms", {"objects": objects})
+    transforms = await run_in_db_executor(get_current_transforms, objects)
+    return {"status": "success", "transforms": transforms}
+
+
+@router.get("/transforms/{name}/history", status_code=200)
+async def transform_history(name: str, start: int | None = None,
+                            end: int | None = None):
+    """
+    Asynchronously retrieves the transform history of an object.
+    Args:
+        name (str): The object name.
+        start (int, optional): Earliest timestamp to include, in
+        milliseconds since the Unix epoch.
+        end (int, optional): Latest timestamp to include.
+    Returns:
+        dict: A dictionary containing the status of the request, the object
+        name and its history, oldest first.
+    Raises:
+        HTTPException: If the object has no stored history
+        (status code 404).
+    """
+    from .transform_store import get_transform_history
+    log_request("/transforms/history", {
+        "name": name, "start": start, "end": end
+    })
+    try:
+        history = await run_in_db_executor(
+            get_transform_history, name, start, end
+        )
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Object not found")
+    return {"status": "success", "object": name, "history": history}
+
+
+# Job Endpoints
+@router.get("/jobs/{job_id}", status_code=200)
+async def get_job(job_id: str):
+    """
+    Asynchronously reports the status of a background job.
+    Args:
+        job_id (str): The id returned when the job was submitted.
+    Returns:
+        dict: A dictionary containing the status of the request and the
+        job: its 'status' ('queued', 'running', 'succeeded' or 'failed')
+        and, once finished, its 'result' or 'error'.
+    Raises:
+        HTTPException: If the job is unknown or has expired (status code
+        404).
+    """
+    jobs = await run_in_db_executor(get_jobs, [job_id])
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "job": jobs[job_id]}
+
+
+@router.get("/jobs", status_code=200)
+async def get_job_batch(ids: list[str] = Query(
+    ..., min_length=1, max_length=MAX_JOB_LOOKUP
+)):
+    """
+    Asynchronously reports the status of several background jobs.
+    Args:
+        ids (list): The job ids, as repeated 'ids' query parameters.
+    Returns:
+        dict: A dictionary containing the status of the request, the known
+        jobs in the requested order and the ids of unknown or expired jobs.
+    """
+    jobs = await run_in_db_executor(get_jobs, ids)
+    return {
+        "status": "success",
+        "jobs": [jobs[job_id] for job_id in ids if job_id in jobs],
+        "missing": [job_id for job_id in ids if job_id not in jobs]
+    }
 
 
 # File Path Endpoint
@@ -120,7 +474,6 @@ async def file_path(projectpath: bool = False):
         dict: A dictionary containing the key 'path' with the corresponding
         file path as its value.
     """
-    await asyncio.sleep(10)
     log_request("/file-path", {"projectpath": projectpath})
     if projectpath:
         return {"path": "/path/to/project/folder"}
@@ -141,10 +494,9 @@ async def add_inventory_item(item: AddItem):
     Raises:
         HTTPException: If there is an error adding the item to the inventory.
     """
-    await asyncio.sleep(10)
-    log_request("/add-item", item.model_dump())
+    log_request("/add-item", item)
     try:
-        added_item = add_item(item.name, item.quantity)
+        added_item = await add_item(item.name, item.quantity)
         return {
             "status": "success",
             "item": {
@@ -171,10 +523,9 @@ async def remove_inventory_item(item: RemoveItem):
         HTTPException: If the item is not found (404) or if any other error
                        occurs (400).
     """
-    await asyncio.sleep(10)
-    log_request("/remove-item", item.model_dump())
+    log_request("/remove-item", item)
     try:
-        removed_item = remove_item(item.name)
+        removed_item = await remove_item(item.name)
         return {"status": "success", "item": removed_item.name}
     except ValueError:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -198,10 +549,9 @@ async def update_inventory_quantity(item: UpdateItem):
         HTTPException: If the item is not found (status code 404)
         or if any other error occurs (status code 400).
     """
-    await asyncio.sleep(10)
-    log_request("/update-quantity", item.model_dump())
+    log_request("/update-quantity", item)
     try:
-        updated_item = update_quantity(item.name, item.new_quantity)
+        updated_item = await update_quantity(item.name, item.new_quantity)
         return {
             "status": "success",
             "item": {
@@ -215,20 +565,374 @@ async def update_inventory_quantity(item: UpdateItem):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/get_inventory", status_code=200)
-async def get_inventory_items():
+@router.post("/adjust-quantity", status_code=200)
+async def adjust_inventory_quantity(item: AdjustItem):
     """
-    Asynchronously retrieves inventory items.
+    Asynchronously adds a delta to the quantity of an inventory item.
+    The adjustment is applied atomically on the server, so concurrent
+    purchases and returns of the same item never overwrite each other.
+    Args:
+        item (AdjustItem): The item name, the delta to apply and the minimum
+        quantity the item may reach.
+    Returns:
+        dict: A dictionary containing the status of the update and the updated
+        item details.
+    Raises:
+        HTTPException: If the item is not found (status code 404), if the
+        adjustment would go below the minimum (status code 409) or if any
+        other error occurs (status code 400).
+    """
+    log_request("/adjust-quantity", item)
+    try:
+        name, quantity = await adjust_quantity(item.name, item.delta, item.min)
+        return {
+            "status": "success",
+            "item": {"name": name, "quantity": quantity}
+        }
+    except InsufficientQuantityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Item not found")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/batch", status_code=200)
+async def batch_inventory_operations(batch: BatchRequest):
+    """
+    Asynchronously applies a batch of add, remove and update operations.
+    All operations are executed in a single database transaction. Operations
+    that cannot be applied are reported individually and do not abort the
+    rest of the batch.
+    Args:
+        batch (BatchRequest): The list of operations to apply, in order.
     Returns:
         dict: A dictionary containing the status of the request and a list
-              of inventory items, where each item is represented as a
-              dictionary with 'name' and 'quantity' keys.
+              with one result per operation.
+    Raises:
+        HTTPException: If the batch could not be written to the database
+                       (status code 400).
     """
-    log_request("/inventory", {})
-    items = get_inventory()
-    return {
-        "status": "success",
-        "inventory": [
-            {"name": i.name, "quantity": i.quantity} for i in items
-        ]
-    }
+    log_request("/batch", {"operations": len(batch.operations)})
+    try:
+        results = await apply_batch(
+            [op.model_dump() for op in batch.operations]
+        )
+        return {"status": "success", "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/get_inventory", status_code=200,
+            response_model=InventoryResponse)
+async def get_inventory_items(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+    sort: Literal["name", "quantity", "id"] = "name",
+    order: Literal["asc", "desc"] = "asc",
+    q: str | None = None,
+    match: Literal["prefix", "contains"] = "prefix",
+):
+    """
+    Asynchronously retrieves inventory items.
+    Without query parameters the whole inventory is returned from a
+    pre-serialized snapshot. Otherwise the matching items are returned in
+    the requested order, one page at a time when `limit` is given, along
+    with the cursor for the next page.
+    Every response carries an ETag derived from the inventory revision, and
+    a request whose If-None-Match header matches it is answered with 304.
+    Concurrent identical requests share one database query and one
+    serialized body.
+    Args:
+        request (Request): The incoming request.
+        limit (int, optional): The maximum number of items per page.
+        cursor (str, optional): The `next_cursor` of the previous page.
+        sort (str): The column to sort by: 'name', 'quantity' or 'id'.
+        order (str): The sort order: 'asc' or 'desc'.
+        q (str, optional): Only return items whose name matches this text.
+        match (str): How `q` is matched: 'prefix' or 'contains'.
+    Returns:
+        Response: A JSON body containing the status of the request and a
+                  list of inventory items, where each item is represented
+                  as a dictionary with 'name' and 'quantity' keys. Paged
+                  responses also contain 'next_cursor', which is None on
+                  the last page.
+    Raises:
+        HTTPException: If the cursor is invalid (status code 400).
+    """
+    log_request("/inventory", {
+        "limit": limit, "cursor": cursor, "sort": sort, "order": order,
+        "q": q, "match": match
+    })
+    if_none_match = request.headers.get("if-none-match")
+
+    # Identical concurrent reads share one query and one serialized body
+    if (limit, cursor, q, sort, order) == (None, None, None, "name", "asc"):
+        revision, body = await read_coalescer.do(
+            "snapshot", run_in_db_executor, inventory_snapshot.get
+        )
+        headers = {
+            "ETag": make_etag(revision, request.url.query),
+            "X-Inventory-Revision": str(revision)
+        }
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=body, media_type="application/json", headers=headers
+        )
+
+    revision, etag = await read_coalescer.do(
+        ("etag", request.url.query), run_in_db_executor, current_etag,
+        request.url.query
+    )
+    headers = {"ETag": etag, "X-Inventory-Revision": str(revision)}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        body = await read_coalescer.do(
+            ("page", limit, cursor, sort, order, q, match),
+            run_in_db_executor, render_inventory_page,
+            limit, cursor, sort, order, q, match
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(
+        content=body, media_type="application/json", headers=headers
+    )
+
+
+@router.get("/search", status_code=200, response_model=SearchResponse)
+async def search_inventory(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = True,
+):
+    """
+    Asynchronously searches item names, best matches first.
+    Names starting with the search text come first, then names containing
+    it, ranked by relevance, then (unless `fuzzy` is false) names close to
+    it, to catch misspellings. Matching is case-insensitive and backed by a
+    full-text index, so a search costs about the same however large the
+    inventory is.
+    Args:
+        q (str): The text to search for.
+        limit (int): The maximum number of results.
+        fuzzy (bool): Whether to include approximate matches.
+    Returns:
+        dict: A dictionary containing the status of the request and the
+              'results', each a dictionary with 'name', 'quantity' and
+              'match' ('prefix', 'substring' or 'fuzzy') keys.
+    Raises:
+        HTTPException: If the search text is blank (status code 400).
+    """
+    log_request("/search", {"q": q, "limit": limit, "fuzzy": fuzzy})
+    try:
+        results = await read_coalescer.do(
+            ("search", q, limit, fuzzy), search_items, q, limit, fuzzy
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(content={"status": "success", "results": results})
+
+
+@router.get("/inventory/export", status_code=200)
+async def export_inventory(
+    format: Literal["ndjson", "csv"] = "ndjson",
+):
+    """
+    Streams the whole inventory, ordered by name.
+    Items are read through a server-side cursor and sent in chunks as they
+    are fetched, so memory use does not grow with the inventory.
+    Args:
+        format (str): 'ndjson' for one JSON object with 'name' and
+                      'quantity' keys per line, or 'csv' for a
+                      'name,quantity' header followed by one row per item.
+    Returns:
+        StreamingResponse: The exported items, with the revision they were
+                           read at in the X-Inventory-Revision header.
+    """
+    log_request("/inventory/export", {"format": format})
+    revision = await run_in_db_executor(get_revision)
+
+    async def stream():
+        if format == "csv":
+            yield CSV_HEADER_LINE
+        async for rows in iter_inventory(EXPORT_BATCH_SIZE):
+            yield format_rows(rows, format)
+
+    return StreamingResponse(
+        stream(),
+        media_type=BULK_FORMATS[format],
+        headers={
+            "Content-Disposition":
+                f'attachment; filename="inventory.{format}"',
+            "X-Inventory-Revision": str(revision)
+        }
+    )
+
+
+@router.post("/inventory/import", status_code=200)
+async def import_inventory(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+):
+    """
+    Adds or updates items from an uploaded NDJSON or CSV stream.
+    The request body uses the layout produced by /inventory/export. It is
+    parsed as it arrives and written in transactions of a bounded number of
+    records, with upsert semantics: new items are added and existing items
+    have their quantity set. If a record is malformed, the records before
+    it stay imported and the error names the offending line.
+    Args:
+        request (Request): The incoming request, whose body is the upload.
+        format (str): 'ndjson' or 'csv'.
+    Returns:
+        dict: A dictionary containing the status of the request and the
+              number of items 'added', 'updated' and left 'unchanged'.
+    Raises:
+        HTTPException: If a record is malformed (status code 400).
+    """
+    log_request("/inventory/import", {"format": format})
+    totals = {"added": 0, "updated": 0, "unchanged": 0}
+    batch = []
+
+    async def flush():
+        counts = await upsert_items(batch)
+        for key in totals:
+            totals[key] += counts[key]
+        batch.clear()
+
+    try:
+        async for record in read_records(request.stream(), format):
+            batch.append(record)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+    except ValueError as e:
+        if batch:
+            await flush()
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"{e} Records before it were imported: "
+                f"{totals['added']} added, {totals['updated']} updated."
+            )
+        )
+    if batch:
+        await flush()
+    return {"status": "success", **totals}
+
+
+@router.get("/get_inventory/changes", status_code=200,
+            response_model=InventoryChangesResponse)
+async def get_inventory_changes(
+    since: int = Query(..., ge=0),
+    limit: int = Query(10000, ge=1, le=100000),
+):
+    """
+    Asynchronously retrieves the inventory changes made after a revision.
+    Clients pass the revision of the data they hold (from the
+    X-Inventory-Revision header of /get_inventory or from /events) and
+    receive only the items changed since then.
+    Args:
+        since (int): The last revision the client has seen.
+        limit (int): The maximum number of changed items to return before
+                     asking the client to resync instead.
+    Returns:
+        dict: A dictionary containing the status of the request, the
+              current 'revision' and a 'resync_required' flag. Unless a
+              full reload is required, 'upserted' lists the changed items
+              as dictionaries with 'name' and 'quantity' keys and
+              'deleted' lists the names of removed items.
+    """
+    log_request("/get_inventory/changes", {"since": since, "limit": limit})
+    changes = await get_changes_since(since, limit)
+    return FastJSONResponse(content={"status": "success", **changes})
+
+
+@router.get("/codec/dictionary", status_code=200)
+async def codec_dictionary():
+    """
+    Asynchronously retrieves the zstd dictionary trained on item names.
+    Clients that store it can send its SHA-256 in an Available-Dictionary
+    header together with 'dcz' in Accept-Encoding to receive small
+    responses compressed against it, and may compress request bodies the
+    same way.
+    Returns:
+        Response: The raw dictionary, with its hex SHA-256 as the ETag.
+    Raises:
+        HTTPException: If the inventory is too small to train a dictionary
+                       yet (status code 404).
+    """
+    log_request("/codec/dictionary", {})
+    data = await run_in_db_executor(compression_dictionary.get)
+    if data is None:
+        raise HTTPException(
+            status_code=404, detail="No compression dictionary available."
+        )
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={
+            "ETag": f'"{compression_dictionary.hash.hex()}"',
+            "Use-As-Dictionary": 'match="/*"'
+        }
+    )
+
+
+@router.get("/events", status_code=200)
+async def inventory_events():
+    """
+    Streams inventory changes as server-sent events.
+    The stream starts with a 'hello' event carrying the current revision,
+    followed by one 'added', 'removed' or 'quantity_changed' event per
+    changed item. Each event's data is a JSON object with 'type', 'name',
+    'quantity' and 'revision' keys, and its id is the revision. A client
+    that falls too far behind receives a 'resync' event and the stream is
+    closed; it should reload the inventory and reconnect.
+    Returns:
+        StreamingResponse: A text/event-stream response.
+    """
+    log_request("/events", {})
+
+    async def stream():
+        subscription = event_bus.subscribe()
+        try:
+            yield await run_in_db_executor(hello_event)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscription.get(), EVENT_KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if frame is None:
+                    revision = await run_in_db_executor(get_revision)
+                    yield format_event("resync", {"revision": revision})
+                    return
+                yield frame
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@monitoring_router.get("/metrics", status_code=200)
+async def metrics():
+    """
+    Reports server metrics in the Prometheus text format.
+    Includes request counts and latency histograms per route and status,
+    requests in flight, database statement counts and durations, session
+    outcomes, connection pool usage and event stream subscribers.
+    Returns:
+        Response: The metrics as text/plain.
+    """
+    return Response(
+        content=registry.render(), media_type=METRICS_CONTENT_TYPE
+    )
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import threading
+from .database import add_change_listener, get_changelog, get_revision
+from .metrics import registry, event_subscribers
+
+# Events a subscriber may fall behind by before it is told to resync
+MAX_PENDING_EVENTS = 1000
+
+# Revisions the changelog follower reads per query
+FOLLOW_BATCH_REVISIONS = 1000
+
+
+def format_event(event: str, data: dict, event_id: int | None = None):
+    """
+    Encode one server-sent event frame.
+    Args:
+        event (str): The event type.
+        data (dict): The event payload, sent as JSON.
+        event_id (int, optional): The event id, used by clients to resume.
+    Returns:
+        bytes: The encoded frame.
+    """
+    frame = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        frame = f"id: {event_id}\n" + frame
+    return frame.encode()
+
+
+class Subscription:
+    """
+    A single client's queue of pending event frames.
+    The queue belongs to the event loop that created the subscription and
+    is only touched from that loop. If the client falls more than
+    `MAX_PENDING_EVENTS` behind, its queue is replaced by a single None
+    sentinel telling the stream to send a resync event and close.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def resync(self):
+        """
+        Drop the pending frames and tell the client to resync. Runs on the
+        subscription's loop.
+        Returns:
+            None
+        """
+        if self.overflowed:
+            return
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def deliver(self, frames: list):
+        """
+        Queue event frames for the client. Runs on the subscription's loop.
+        Args:
+            frames (list): The encoded frames to queue.
+        Returns:
+            None
+        """
+        if self.overflowed:
+            return
+        if self.queue.qsize() + len(frames) > MAX_PENDING_EVENTS:
+            self.resync()
+            return
+        for frame in frames:
+            self.queue.put_nowait(frame)
+
+    async def get(self):
+        """
+        Wait for the next frame.
+        Returns:
+            bytes: The next frame, or None if the client must resync.
+        """
+        return await self.queue.get()
+
+
+class InventoryEventBus:
+    """
+    Fans inventory changes out to connected event stream clients.
+    Each committed change is encoded once and handed to every subscriber's
+    event loop with a single thread-safe callback per loop, so the cost of
+    a change grows with the number of subscribers only by a queue append.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self):
+        """The number of connected subscribers."""
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """
+        Register a new subscriber on the running event loop.
+        Returns:
+            Subscription: The new subscription.
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Remove a subscriber.
+        Args:
+            subscription (Subscription): The subscription to remove.
+        Returns:
+            None
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, revision: int, changes: list):
+        """
+        Broadcast committed changes to every subscriber.
+        Safe to call from any thread; it is registered as a database change
+        listener.
+        Args:
+            revision (int): The revision the changes were committed under.
+            changes (list): The (kind, name, quantity) tuples.
+        Returns:
+            None
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        frames = [
+            format_event(kind, {
+                "type": kind,
+                "name": name,
+                "quantity": quantity,
+                "revision": revision
+            }, revision)
+            for kind, name, quantity in changes
+        ]
+
+        self._dispatch(subscribers, _deliver_all, frames)
+
+    def resync(self):
+        """
+        Tell every subscriber to reload the inventory and reconnect, for
+        when changes may have been missed. Safe to call from any thread.
+        Returns:
+            None
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self._dispatch(subscribers, _resync_all)
+
+    def _dispatch(self, subscribers: list, callback, *args):
+        """
+        Run `callback(group, *args)` on each subscriber loop, with the group
+        of that loop's subscribers.
+        """
+        by_loop = {}
+        for subscription in subscribers:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(callback, group, *args)
+            except RuntimeError:
+                # The loop has shut down; its subscribers are gone
+                for subscription in group:
+                    self.unsubscribe(subscription)
+
+
+def _deliver_all(subscriptions: list, frames: list):
+    """
+    Queue frames for a group of subscriptions sharing one event loop.
+    Args:
+        subscriptions (list): The subscriptions to deliver to.
+        frames (list): The encoded frames.
+    Returns:
+        None
+    """
+    for subscription in subscriptions:
+        subscription.deliver(frames)
+
+
+def _resync_all(subscriptions: list):
+    """Tell a group of subscriptions sharing one event loop to resync."""
+    for subscription in subscriptions:
+        subscription.resync()
+
+
+class ChangelogFollower:
+    """
+    Feeds changes committed by every process sharing the database to the
+    event bus.
+    Change listeners only see commits made by their own process, so when
+    the server runs as several worker processes a client connected to one
+    worker would miss writes handled by the others. The follower instead
+    polls the changelog on a background thread and publishes every
+    revision, in order, no matter which process committed it. Revisions
+    are also passed to `listeners`, so per-process caches can drop views
+    made stale by other processes.
+    """
+
+    def __init__(self, bus: InventoryEventBus, interval: float,
+                 listeners: tuple = ()):
+        self.bus = bus
+        self.interval = interval
+        self.listeners = tuple(listeners)
+        self.revision = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start following the changelog from the current revision.
+        Returns:
+            None
+        """
+        self.revision = get_revision()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="changelog-follower", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread and wait for it to exit.
+        Returns:
+            None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                while self.poll():
+                    pass
+            except Exception:
+                logging.exception("Following the inventory changelog failed")
+
+    def poll(self):
+        """
+        Publish the revisions committed since the last poll.
+        If the changelog has been compacted past the last published
+        revision, or the database was replaced, subscribers are told to
+        resync and following restarts from the current revision.
+        Returns:
+            bool: True if there may be more revisions to read.
+        """
+        result = get_changelog(self.revision, FOLLOW_BATCH_REVISIONS)
+        if result is None:
+            self.revision = get_revision()
+            self.bus.resync()
+            self._notify(self.revision, [])
+            return False
+
+        through, changelog = result
+        for revision, changes in changelog:
+            self.bus.publish(revision, changes)
+            self._notify(revision, changes)
+        more = through - self.revision == FOLLOW_BATCH_REVISIONS
+        self.revision = through
+        return more
+
+    def _notify(self, revision: int, changes: list):
+        for listener in self.listeners:
+            listener(revision, changes)
+
+
+def hello_event():
+    """
+    Build the first frame sent on a new stream.
+    Returns:
+        bytes: A 'hello' event carrying the current inventory revision.
+    """
+    revision = get_revision()
+    return format_event("hello", {"revision": revision}, revision)
+
+
+event_bus = InventoryEventBus()
+add_change_listener(event_bus.publish)
+registry.add_collector(
+    lambda: event_subscribers.set(event_bus.subscriber_count)
+)
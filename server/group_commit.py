@@ -0,0 +1,108 @@
+import asyncio
+from .metrics import registry, Histogram
+
+# Upper bounds of the group size histogram buckets
+GROUP_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+group_commit_size = registry.register(Histogram(
+    "dcc_group_commit_writes",
+    "Writes committed together in one transaction.",
+    buckets=GROUP_SIZE_BUCKETS
+))
+
+
+class GroupCommitter:
+    """
+    Commits concurrent writes together in one transaction.
+    Writes submitted while a group is being committed, or within `window`
+    seconds of the first write of a group, are queued and committed
+    together as the next group of at most `max_ops` writes. A single
+    writer commits on its own straight away, while a burst of writes pays
+    for one commit per group instead of one per write.
+
+    Only one group is committed at a time, which is all SQLite allows
+    anyway, so the writes of a group never wait for each other's locks.
+    Each submitter receives the outcome of its own write.
+    """
+
+    def __init__(self, apply, max_ops: int = 64, window: float = 0):
+        """
+        Args:
+            apply (callable): A coroutine function taking a list of
+                              (name, args) calls and returning one
+                              (succeeded, value) tuple per call, such as
+                              `database.apply_writes` run on the database
+                              executor.
+            max_ops (int): The most writes committed in one group.
+            window (float): Seconds to wait for more writes before
+                            committing a group that is not full.
+        """
+        self.apply = apply
+        self.max_ops = max_ops
+        self.window = window
+        self._loop = None
+        self._pending = []
+        self._full = None
+        self._committer = None
+
+    async def submit(self, name: str, *args):
+        """
+        Queue a write and wait for the group containing it to commit.
+        Args:
+            name (str): The name of the write function.
+            *args: Arguments for the write function.
+        Returns:
+            The return value of the write.
+        Raises:
+            Exception: The exception raised by the write, or by the commit
+                       of its group.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._full = asyncio.Event()
+            self._committer = None
+        future = loop.create_future()
+        self._pending.append((name, args, future))
+        if len(self._pending) >= self.max_ops:
+            self._full.set()
+        if self._committer is None:
+            self._committer = loop.create_task(self._commit_groups())
+        return await future
+
+    async def _commit_groups(self):
+        try:
+            while self._pending:
+                if self.window and len(self._pending) < self.max_ops:
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.window)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    # Let writes received in the same loop iteration join
+                    await asyncio.sleep(0)
+                group = self._pending[:self.max_ops]
+                del self._pending[:self.max_ops]
+                if len(self._pending) < self.max_ops:
+                    self._full.clear()
+                await self._commit(group)
+        finally:
+            self._committer = None
+
+    async def _commit(self, group: list):
+        group_commit_size.observe(len(group))
+        try:
+            outcomes = await self.apply(
+                [(name, args) for name, args, _ in group]
+            )
+        except Exception as e:
+            outcomes = [(False, e)] * len(group)
+        for (_, _, future), (succeeded, value) in zip(group, outcomes):
+            if future.done():
+                # The submitter was cancelled; the write still happened
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,299 @@
+import collections
+import itertools
+import logging
+import queue
+import secrets
+import threading
+import time
+from fastapi import Request
+from sqlalchemy import select, insert, update, delete
+from .config import load_server_config
+from .database import get_database_session, TransformJob
+from .metrics import registry, Counter, Gauge
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Routes that run as background jobs when the client sends the RFC 7240
+# header 'Prefer: respond-async'
+JOB_ROUTES = ("/transform", "/translation", "/rotation", "/scale")
+
+# Statuses of jobs that will not change any more
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Jobs a worker finishes between deletions of expired jobs
+CLEANUP_INTERVAL = 100
+
+jobs_queued = registry.register(Gauge(
+    "dcc_jobs_queued", "Transform jobs waiting for a worker."
+))
+jobs_running = registry.register(Gauge(
+    "dcc_jobs_running", "Transform jobs being run."
+))
+jobs_finished = registry.register(Counter(
+    "dcc_jobs_finished_total", "Transform jobs finished, by status.",
+    ("status",)
+))
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted to a queue that has no room left."""
+
+
+def prefers_async(request: Request):
+    """
+    Tell whether a request should run as a background job.
+    Args:
+        request (Request): The incoming request.
+    Returns:
+        bool: True if the route supports jobs and the client sent
+              'Prefer: respond-async'.
+    """
+    route = request.scope.get("route")
+    return (
+        getattr(route, "path", None) in JOB_ROUTES
+        and "respond-async" in request.headers.get("prefer", "").lower()
+    )
+
+
+def _now_ms():
+    return time.time_ns() // 1_000_000
+
+
+def create_job(route: str, priority: int = 0):
+    """
+    Record a new queued job.
+    Args:
+        route (str): The endpoint the job was submitted to.
+        priority (int): Jobs with a higher priority run first.
+    Returns:
+        str: The job id.
+    """
+    job_id = secrets.token_hex(16)
+    now = _now_ms()
+    with get_database_session() as session:
+        session.execute(insert(TransformJob).values(
+            id=job_id, route=route, priority=priority, status="queued",
+            created_at=now, updated_at=now
+        ))
+    return job_id
+
+
+def set_job_status(job_id: str, status: str, result=None,
+                   error: str | None = None):
+    """
+    Record a job's progress.
+    Args:
+        job_id (str): The job id.
+        status (str): 'queued', 'running', 'succeeded' or 'failed'.
+        result (optional): The JSON-serializable result of a job that
+                           succeeded.
+        error (str, optional): Why a failed job failed.
+    Returns:
+        None
+    """
+    with get_database_session() as session:
+        session.execute(
+            update(TransformJob).where(TransformJob.id == job_id).values(
+                status=status, updated_at=_now_ms(), error=error,
+                result=None if result is None else dumps(result).decode()
+            )
+        )
+
+
+def get_jobs(ids: list):
+    """
+    Look up the status of several jobs.
+    Args:
+        ids (list): The job ids.
+    Returns:
+        dict: Job dicts with 'id', 'route', 'status', 'created_at',
+              'updated_at' and, once finished, 'result' or 'error' keys,
+              keyed by id. Unknown or expired ids are left out.
+    """
+    with get_database_session() as session:
+        rows = session.execute(
+            select(TransformJob).where(TransformJob.id.in_(ids))
+        ).scalars()
+        jobs = {}
+        for job in rows:
+            jobs[job.id] = {
+                "id": job.id,
+                "route": job.route,
+                "status": job.status,
+                "created_at": job.created_at,
+                "updated_at": job.updated_at,
+            }
+            if job.result is not None:
+                jobs[job.id]["result"] = loads(job.result)
+            if job.error is not None:
+                jobs[job.id]["error"] = job.error
+        return jobs
+
+
+def fail_interrupted_jobs():
+    """
+    Mark jobs left unfinished by a previous server run as failed.
+    Job queues live in the server processes, so the jobs still queued or
+    running when the server stopped will never finish. Only call this
+    before any worker of the current run accepts jobs.
+    Returns:
+        int: The number of jobs marked as failed.
+    """
+    with get_database_session() as session:
+        return session.execute(
+            update(TransformJob)
+            .where(TransformJob.status.not_in(FINISHED_STATUSES))
+            .values(
+                status="failed", error="The server was restarted.",
+                updated_at=_now_ms()
+            )
+        ).rowcount
+
+
+def delete_expired_jobs(retention_s: int):
+    """
+    Delete jobs that finished more than `retention_s` seconds ago.
+    Args:
+        retention_s (int): Seconds finished jobs are kept.
+    Returns:
+        int: The number of jobs deleted.
+    """
+    with get_database_session() as session:
+        return session.execute(
+            delete(TransformJob).where(
+                TransformJob.status.in_(FINISHED_STATUSES),
+                TransformJob.updated_at < _now_ms() - retention_s * 1000
+            )
+        ).rowcount
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a pool of worker threads.
+    Waiting jobs are taken highest priority first, and in submission order
+    within a priority. Jobs submitted with the same key, such as the name
+    of the object they transform, run one at a time in submission order:
+    a job waits, whatever its priority, until the key's previous job has
+    finished, so that concurrent workers cannot reorder them. Each job's
+    status is recorded in the database as it
+    is picked up and when it finishes, along with its result or error. The
+    worker threads are started on first use.
+    Args:
+        workers (int): The number of worker threads.
+        max_pending (int): The most jobs waiting for a worker.
+        retention_s (int): Seconds finished jobs are kept in the database.
+    """
+
+    def __init__(self, workers: int = 8, max_pending: int = 1000,
+                 retention_s: int = 3600):
+        self.workers = workers
+        self.retention_s = retention_s
+        self.max_pending = max_pending
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._pending = 0
+        # Jobs waiting for the job ahead of them with the same key, by key;
+        # a key is present while one of its jobs is queued or running
+        self._chains = {}
+        self._threads = []
+        self._finished = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """The number of jobs waiting for a worker."""
+        return self._pending
+
+    def submit(self, job_id: str, func, *args, priority: int = 0,
+               key=None):
+        """
+        Queue a job created with `create_job`.
+        Args:
+            job_id (str): The job id.
+            func (callable): The blocking function doing the work; its
+                             JSON-serializable return value is the job's
+                             result.
+            *args: Arguments for `func`.
+            priority (int): Jobs with a higher priority run first.
+            key (hashable, optional): Jobs with the same key run one at a
+                                      time, in submission order.
+        Raises:
+            JobQueueFull: If `max_pending` jobs are already waiting.
+        """
+        self.start()
+        entry = (-priority, next(self._order), job_id, key, func, args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull("Too many transform jobs are waiting.")
+            self._pending += 1
+            jobs_queued.inc()
+            if key is not None:
+                if key in self._chains:
+                    self._chains[key].append(entry)
+                    return
+                self._chains[key] = collections.deque()
+            self._queue.put(entry)
+
+    def start(self):
+        """Start the worker threads if they are not running."""
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"job-{len(self._threads)}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            _, _, job_id, key, func, args = self._queue.get()
+            with self._lock:
+                self._pending -= 1
+                jobs_queued.dec()
+            jobs_running.inc()
+            try:
+                set_job_status(job_id, "running")
+                try:
+                    result = func(*args)
+                except Exception as e:
+                    set_job_status(job_id, "failed", error=str(e))
+                    jobs_finished.inc(status="failed")
+                else:
+                    set_job_status(job_id, "succeeded", result=result)
+                    jobs_finished.inc(status="succeeded")
+                if next(self._finished) % CLEANUP_INTERVAL == 0:
+                    delete_expired_jobs(self.retention_s)
+            except Exception:
+                logger.exception("Could not record the status of job %s",
+                                 job_id)
+            finally:
+                jobs_running.dec()
+                if key is not None:
+                    self._release(key)
+
+    def _release(self, key):
+        # Queue the key's next job, now that the one ahead of it finished
+        with self._lock:
+            chain = self._chains[key]
+            if chain:
+                self._queue.put(chain.popleft())
+            else:
+                del self._chains[key]
+
+
+def create_job_queue():
+    """
+    Build a job queue configured from environment variables.
+    See `config.load_server_config`.
+    Returns:
+        JobQueue: The job queue.
+    """
+    config = load_server_config()
+    return JobQueue(
+        config.job_workers, config.job_queue_size, config.job_retention_s
+    )
+
+
+job_queue = create_job_queue()
@@ -0,0 +1,191 @@
+import asyncio
+import bisect
+import json
+import os
+import random
+from fastapi import Request
+from .jobs import prefers_async
+
+# Routes that slept for 10 seconds before latency profiles were introduced
+LEGACY_ROUTES = (
+    "/transform", "/translation", "/rotation", "/scale", "/file-path",
+    "/add-item", "/remove-item", "/update-quantity", "/adjust-quantity",
+    "/batch"
+)
+
+_random = random.Random()
+
+
+class LatencyDistribution:
+    """
+    A distribution of simulated response delays, in seconds.
+    Supported kinds:
+        fixed: `seconds`, plus a uniform `jitter` of up to +/- that many
+               seconds.
+        uniform: Any delay between `min` and `max`.
+        percentiles: Delays matching the given `p50`, `p95` and `p99`
+                     (and optionally `min` and `max`), interpolated
+                     linearly between those points.
+    """
+
+    def __init__(self, spec: dict):
+        kind = spec.get("distribution", "fixed")
+        if kind == "fixed":
+            seconds = float(spec.get("seconds", 0))
+            jitter = float(spec.get("jitter", 0))
+            self._points = [(0.0, seconds - jitter), (1.0, seconds + jitter)]
+        elif kind == "uniform":
+            self._points = [
+                (0.0, float(spec["min"])), (1.0, float(spec["max"]))
+            ]
+        elif kind == "percentiles":
+            p50, p95, p99 = (float(spec[k]) for k in ("p50", "p95", "p99"))
+            self._points = [
+                (0.0, float(spec.get("min", 0))), (0.5, p50), (0.95, p95),
+                (0.99, p99), (1.0, float(spec.get("max", p99)))
+            ]
+        else:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+
+        delays = [delay for _, delay in self._points]
+        if min(delays) < 0 or delays != sorted(delays):
+            raise ValueError(
+                f"Latency distribution {spec} must be non-negative and "
+                "increasing"
+            )
+        self._quantiles = [quantile for quantile, _ in self._points]
+
+    def sample(self, u: float | None = None):
+        """
+        Draw a delay from the distribution.
+        Args:
+            u (float, optional): A quantile in [0, 1]. Defaults to a random
+                                 one.
+        Returns:
+            float: The delay in seconds.
+        """
+        u = _random.random() if u is None else u
+        i = max(1, bisect.bisect_left(self._quantiles, u))
+        (q0, d0), (q1, d1) = self._points[i - 1], self._points[i]
+        return d0 + (d1 - d0) * (u - q0) / (q1 - q0)
+
+
+class LatencyProfile:
+    """
+    Simulated latency for each route, used to reproduce slow DCC backends.
+    Args:
+        routes (dict): Distribution specs keyed by route path.
+        default (dict, optional): The spec used for routes not listed.
+                                  Unlisted routes have no delay if omitted.
+    """
+
+    def __init__(self, routes: dict, default: dict | None = None):
+        self.routes = {
+            path: LatencyDistribution(spec) for path, spec in routes.items()
+        }
+        self.default = LatencyDistribution(default) if default else None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Build a profile from its JSON form.
+        Args:
+            data (dict): A dict with optional 'routes' and 'default' keys.
+        Returns:
+            LatencyProfile: The profile.
+        """
+        return cls(data.get("routes", {}), data.get("default"))
+
+    def delay_for(self, path: str):
+        """
+        Draw the delay for one request.
+        Args:
+            path (str): The route path of the request.
+        Returns:
+            float: The delay in seconds.
+        """
+        distribution = self.routes.get(path, self.default)
+        return distribution.sample() if distribution else 0.0
+
+
+def legacy_profile():
+    """
+    Return the profile matching the original hardcoded delays: 10 seconds
+    on every endpoint except the inventory reads.
+    Returns:
+        LatencyProfile: The profile.
+    """
+    return LatencyProfile({
+        path: {"distribution": "fixed", "seconds": 10}
+        for path in LEGACY_ROUTES
+    })
+
+
+def load_latency_profile(environ=None):
+    """
+    Load the latency profile named by the DCC_LATENCY_PROFILE variable.
+    The variable may be unset or 'off' to disable simulated latency,
+    'legacy' for the original 10 second delays, or the path of a JSON file
+    with 'routes' and 'default' distribution specs.
+    Args:
+        environ (dict, optional): The environment to read. Defaults to
+                                  `os.environ`.
+    Returns:
+        LatencyProfile: The profile, or None if latency is disabled.
+    Raises:
+        ValueError: If the profile is invalid.
+    """
+    environ = os.environ if environ is None else environ
+    source = environ.get("DCC_LATENCY_PROFILE", "off").strip()
+    if source.lower() in ("", "off"):
+        return None
+    if source.lower() == "legacy":
+        return legacy_profile()
+    with open(source, encoding="utf-8") as f:
+        return LatencyProfile.from_dict(json.load(f))
+
+
+_profile = load_latency_profile()
+
+
+def set_latency_profile(profile: LatencyProfile | None):
+    """
+    Replace the active latency profile.
+    Args:
+        profile (LatencyProfile, optional): The new profile, or None to
+                                            disable simulated latency.
+    Returns:
+        None
+    """
+    global _profile
+    _profile = profile
+
+
+def delay_for(path: str):
+    """
+    Draw a delay for a route from the active latency profile.
+    Args:
+        path (str): The route path.
+    Returns:
+        float: The delay in seconds; 0 when latency is disabled.
+    """
+    return 0.0 if _profile is None else _profile.delay_for(path)
+
+
+async def simulate_latency(request: Request):
+    """
+    Delay the request according to the active latency profile.
+    Used as a router dependency; does nothing when latency is disabled.
+    Requests run as background jobs are not delayed here, the job applies
+    the delay instead.
+    Args:
+        request (Request): The incoming request.
+    Returns:
+        None
+    """
+    if _profile is None or prefers_async(request):
+        return
+    route = request.scope.get("route")
+    delay = _profile.delay_for(route.path if route else request.url.path)
+    if delay > 0:
+        await asyncio.sleep(delay)
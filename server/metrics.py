@@ -0,0 +1,337 @@
+import bisect
+import threading
+import time
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+REQUEST_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+# Upper bounds, in seconds, of the database query histogram buckets
+QUERY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 1
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = ""):
+    """
+    Format a label set in the Prometheus text format.
+    Args:
+        names (tuple): The label names.
+        values (tuple): The label values, in the same order.
+        extra (str): An already formatted label appended to the set.
+    Returns:
+        str: The formatted labels, e.g. '{route="/batch",status="200"}', or
+             an empty string if there are none.
+    """
+    pairs = [
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n")
+        )
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    A named family of samples, one per combination of label values.
+    Subclasses define the metric type and how samples are updated.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        """
+        Render the metric in the Prometheus text format.
+        Returns:
+            list: The HELP and TYPE lines followed by one line per sample.
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            samples = sorted(self._values.items())
+        for key, value in samples:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} "
+            f"{_format_value(value)}"
+        ]
+
+
+class Counter(Metric):
+    """A value that only goes up, such as a number of requests."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """A value that can go up and down, such as requests in flight."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """A distribution of observed values, counted in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            sample[0][index] += 1
+            sample[1] += value
+
+    def count(self, **labels):
+        sample = self._values.get(self._key(labels))
+        return sum(sample[0]) if sample else 0
+
+    def _render_sample(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(
+                self.labelnames, key, f'le="{_format_value(bound)}"'
+            )
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Holds metrics and renders them for the /metrics endpoint.
+    Collectors registered with `add_collector` run before every render to
+    refresh gauges read from elsewhere, such as connection pool stats.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "dcc_http_requests_total", "HTTP requests handled.",
+    ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "dcc_http_request_duration_seconds",
+    "Time from receiving an HTTP request to finishing its response.",
+    ("method", "route", "status")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "dcc_http_requests_in_flight", "HTTP requests being handled."
+))
+db_queries = registry.register(Counter(
+    "dcc_db_queries_total", "Database statements executed.",
+    ("statement",)
+))
+db_query_errors = registry.register(Counter(
+    "dcc_db_query_errors_total", "Database statements that failed.",
+    ("statement",)
+))
+db_query_duration = registry.register(Histogram(
+    "dcc_db_query_duration_seconds", "Time spent executing statements.",
+    ("statement",), QUERY_BUCKETS
+))
+db_sessions = registry.register(Counter(
+    "dcc_db_sessions_total", "Database sessions closed, by outcome.",
+    ("outcome",)
+))
+db_sessions_active = registry.register(Gauge(
+    "dcc_db_sessions_active", "Database sessions currently open."
+))
+event_subscribers = registry.register(Gauge(
+    "dcc_event_subscribers", "Clients connected to the /events stream."
+))
+request_log_dropped = registry.register(Counter(
+    "dcc_request_log_dropped_total",
+    "Request log entries dropped because the log queue was full."
+))
+db_pool = registry.register(Gauge(
+    "dcc_db_pool_connections",
+    "Connections in the database pool, by state.", ("state",)
+))
+
+
+def statement_kind(statement: str):
+    """
+    Classify a SQL statement by its leading keyword.
+    Args:
+        statement (str): The SQL text.
+    Returns:
+        str: The lower-cased keyword, e.g. 'select' or 'insert'.
+    """
+    keyword = statement.lstrip().split(None, 1)[:1]
+    return keyword[0].lower() if keyword else "unknown"
+
+
+def instrument_engine(engine):
+    """
+    Record the count, duration and failures of every statement run on an
+    engine.
+    Args:
+        engine (Engine): The engine to instrument.
+    """
+    # Imported here so that the metrics can be used without SQLAlchemy
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context,
+                    executemany):
+        conn.info.setdefault("query_start_times", []).append(
+            time.perf_counter()
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context,
+                     executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+        kind = statement_kind(statement)
+        db_queries.inc(statement=kind)
+        db_query_duration.observe(elapsed, statement=kind)
+
+    @event.listens_for(engine, "handle_error")
+    def record_error(context):
+        start_times = context.connection and context.connection.info.get(
+            "query_start_times"
+        )
+        if start_times:
+            start_times.pop()
+        db_query_errors.inc(
+            statement=statement_kind(context.statement or "")
+        )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests and timing them per route and
+    status. Routes are reported by their path template, e.g.
+    '/transforms/{name}/history', so that path parameters do not create a
+    new series per value; unmatched paths are reported as 'unmatched'.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", "unmatched"),
+                "status": status,
+            }
+            http_requests.inc(**labels)
+            http_request_duration.observe(
+                time.perf_counter() - start, **labels
+            )
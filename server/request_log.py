@@ -0,0 +1,189 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueListener
+from .metrics import request_log_dropped
+
+# Entries waiting to be written; further requests are dropped when full
+MAX_PENDING_ENTRIES = 10000
+
+REQUEST_LOGGER_NAME = "server.requests"
+
+
+def render_payload(data):
+    """
+    Turn a logged payload into JSON-serializable data.
+    Payloads are rendered on the listener thread, so endpoints can pass
+    request models or callables without paying for `model_dump()` or
+    formatting on the event loop.
+    Args:
+        data: A dict, a pydantic model, or a callable returning either.
+    Returns:
+        The rendered payload.
+    """
+    if callable(data):
+        data = data()
+    if hasattr(data, "model_dump"):
+        data = data.model_dump()
+    return data
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line, including the
+    'endpoint' and 'data' of request records.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("endpoint", "data", "sample_rate"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _RequestListener(QueueListener):
+    """Builds log records from queued request entries before handling."""
+
+    def prepare(self, entry):
+        created, endpoint, data, rate = entry
+        record = logging.LogRecord(
+            REQUEST_LOGGER_NAME, logging.INFO, __file__, 0,
+            "Received request to %s", (endpoint,), None
+        )
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        record.endpoint = endpoint
+        record.sample_rate = rate
+        try:
+            record.data = render_payload(data)
+        except Exception as e:
+            record.data = f"<unrenderable payload: {e}>"
+        return record
+
+
+def load_sample_rates(environ=None):
+    """
+    Read the request log sampling rates from environment variables.
+    DCC_LOG_SAMPLE_RATE sets the fraction of requests logged by default
+    and DCC_LOG_SAMPLE_RATES overrides it per endpoint, as comma-separated
+    'endpoint=rate' pairs, e.g. '/inventory=0.01,/events=0'.
+    Args:
+        environ (dict, optional): The environment to read. Defaults to
+                                  `os.environ`.
+    Returns:
+        tuple: The default rate and a dict of per-endpoint rates.
+    Raises:
+        ValueError: If a rate is not a number between 0 and 1.
+    """
+    environ = os.environ if environ is None else environ
+
+    def parse_rate(value, key):
+        try:
+            rate = float(value)
+        except ValueError:
+            rate = -1
+        if not 0 <= rate <= 1:
+            raise ValueError(f"{key} must be between 0 and 1, got {value!r}")
+        return rate
+
+    default = parse_rate(
+        environ.get("DCC_LOG_SAMPLE_RATE", "1"), "DCC_LOG_SAMPLE_RATE"
+    )
+    rates = {}
+    for pair in environ.get("DCC_LOG_SAMPLE_RATES", "").split(","):
+        if not pair.strip():
+            continue
+        endpoint, _, value = pair.partition("=")
+        rates[endpoint.strip()] = parse_rate(
+            value.strip(), f"DCC_LOG_SAMPLE_RATES[{endpoint.strip()}]"
+        )
+    return default, rates
+
+
+class RequestLogger:
+    """
+    Writes sampled request logs from a background thread.
+    `log` only decides whether the request is sampled and enqueues a small
+    tuple; building the record, rendering the payload, formatting it as
+    JSON and writing it all happen on the listener thread, which is
+    started on first use. When the queue is full, entries are dropped and
+    counted rather than blocking the caller.
+    """
+
+    def __init__(self, handler: logging.Handler | None = None,
+                 default_rate: float = 1.0, rates: dict | None = None,
+                 maxsize: int = MAX_PENDING_ENTRIES):
+        if handler is None:
+            handler = logging.StreamHandler()
+            handler.setFormatter(JsonFormatter())
+        self.handler = handler
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def log(self, endpoint: str, data=None):
+        """
+        Log a request, subject to the endpoint's sampling rate.
+        Args:
+            endpoint (str): The endpoint that received the request.
+            data: The payload; see `render_payload`.
+        """
+        rate = self.rates.get(endpoint, self.default_rate)
+        if rate < 1 and (rate <= 0 or random.random() >= rate):
+            return
+        if self._listener is None:
+            self.start()
+        try:
+            self._queue.put_nowait((time.time(), endpoint, data, rate))
+        except queue.Full:
+            self.dropped += 1
+            request_log_dropped.inc()
+
+    def start(self):
+        """Start the listener thread if it is not running."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = _RequestListener(self._queue, self.handler)
+                self._listener.start()
+
+    def stop(self):
+        """Write out the queued entries and stop the listener thread."""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+
+def create_request_logger(environ=None):
+    """
+    Build a request logger configured from environment variables.
+    See `load_sample_rates`.
+    Returns:
+        RequestLogger: The logger, writing JSON lines to stderr.
+    """
+    default_rate, rates = load_sample_rates(environ)
+    request_logger = RequestLogger(default_rate=default_rate, rates=rates)
+    atexit.register(request_logger.stop)
+    return request_logger
+
+
+request_logger = create_request_logger()
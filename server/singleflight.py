@@ -0,0 +1,62 @@
+import asyncio
+from .database import add_change_listener
+from .metrics import registry, Counter
+
+coalesced_reads = registry.register(Counter(
+    "dcc_singleflight_calls_total",
+    "Coalesced reads, by whether the call ran the work or shared it.",
+    ("result",)
+))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+    While a call for a key is in flight, further calls with the same key
+    wait for it and receive its result (or exception) instead of repeating
+    the work, so a burst of identical reads costs a single query.
+
+    Calls are also keyed by a generation that `invalidate` bumps after
+    every inventory write, so a read issued after a write never joins a
+    flight that started before it and always sees that write.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._generation = 0
+
+    def invalidate(self, *args):
+        """Make calls from now on start new flights. Thread-safe."""
+        self._generation += 1
+
+    async def do(self, key, func, *args):
+        """
+        Run `func(*args)`, or join an identical call already in flight.
+        The work runs in its own task, so a caller that is cancelled (for
+        example because its client disconnected) does not cancel it for
+        the others.
+        Args:
+            key: A hashable description of the call.
+            func (callable): A coroutine function doing the work.
+            *args: Arguments for `func`.
+        Returns:
+            The result of the shared call.
+        Raises:
+            Exception: Any exception raised by the shared call.
+        """
+        flight_key = (asyncio.get_running_loop(), self._generation, key)
+        task = self._flights.get(flight_key)
+        if task is None:
+            coalesced_reads.inc(result="leader")
+            task = asyncio.ensure_future(func(*args))
+            self._flights[flight_key] = task
+            task.add_done_callback(
+                lambda _: self._flights.pop(flight_key, None)
+            )
+        else:
+            coalesced_reads.inc(result="shared")
+        return await asyncio.shield(task)
+
+
+read_coalescer = SingleFlight()
+add_change_listener(read_coalescer.invalidate)
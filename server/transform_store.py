@@ -0,0 +1,255 @@
+import struct
+import time
+import numpy as np
+from sqlalchemy import select, insert, update
+from .database import (
+    get_database_session, ObjectTransform, TransformHistory, _chunks,
+    _begin_write_transaction, BATCH_CHUNK_SIZE
+)
+from .transforms import TRANSFORM_FIELDS
+
+# Position, rotation and scale of an object seen for the first time
+DEFAULT_STATE = np.array([0, 0, 0, 0, 0, 0, 1, 1, 1], dtype="<f4")
+
+# A full-state history record is written after this many delta records,
+# bounding how far back a history query has to start decoding
+KEYFRAME_INTERVAL = 64
+
+# History records come in two fixed-width layouts:
+#   keyframe: the nine float32 components of the state (36 bytes)
+#   delta:    a uint16 bitmask of the components that changed, followed by
+#             one float32 per changed component (6 bytes for a move along
+#             one axis, 14 bytes for a full position change)
+_MASK = struct.Struct("<H")
+_BITS = 1 << np.arange(9, dtype=np.uint16)
+
+
+def _now_ms():
+    """
+    Return the current time in milliseconds since the Unix epoch.
+    Returns:
+        int: The timestamp.
+    """
+    return time.time_ns() // 1_000_000
+
+
+def encode_delta(state, changed):
+    """
+    Encode the changed components of a state as a delta record.
+    Args:
+        state (numpy.ndarray): The new nine-component float32 state.
+        changed (numpy.ndarray): Nine booleans marking changed components.
+    Returns:
+        bytes: The delta record.
+    """
+    mask = int(_BITS[changed].sum())
+    return _MASK.pack(mask) + state[changed].tobytes()
+
+
+def decode_record(previous, record: bytes, keyframe: bool):
+    """
+    Apply a history record to the state that preceded it.
+    Args:
+        previous (numpy.ndarray): The previous state, ignored for keyframes.
+        record (bytes): The encoded record.
+        keyframe (bool): Whether the record is a keyframe.
+    Returns:
+        numpy.ndarray: The state after the record.
+    """
+    if keyframe:
+        return np.frombuffer(record, dtype="<f4").copy()
+    (mask,) = _MASK.unpack_from(record)
+    state = previous.copy()
+    state[(mask & _BITS) != 0] = np.frombuffer(
+        record, dtype="<f4", offset=_MASK.size
+    )
+    return state
+
+
+def _states_to_dicts(states):
+    """
+    Convert (n, 9) states into dicts of position, rotation and scale.
+    Args:
+        states (numpy.ndarray): The states.
+    Returns:
+        list: One dict per state.
+    """
+    return [
+        dict(zip(TRANSFORM_FIELDS, vectors))
+        for vectors in states.reshape(-1, 3, 3).tolist()
+    ]
+
+
+def record_transforms(names: list, arrays: dict, timestamp: int | None = None):
+    """
+    Store the transforms of several objects and append them to history.
+    Components missing from `arrays` keep their stored values (or the
+    defaults for new objects). Objects whose resulting state matches the
+    stored one are skipped entirely, so repeated syncs of an unchanged
+    scene write nothing. All objects are written in one transaction with
+    bulk statements. The write lock is taken before the stored transforms
+    are read, so concurrent calls for the same object are applied one
+    after the other and each delta is computed against the state it
+    replaces.
+    Args:
+        names (list): The object names, one per row of the arrays.
+        arrays (dict): (len(names), 3) float arrays keyed by field name.
+        timestamp (int, optional): The time of the change in milliseconds
+                                   since the Unix epoch. Defaults to now.
+    Returns:
+        int: The number of objects whose transform changed.
+    """
+    with get_database_session() as session:
+        _begin_write_transaction(session)
+        # Taken under the lock, so that history timestamps follow its order
+        timestamp = _now_ms() if timestamp is None else timestamp
+        stored = {}
+        for chunk in _chunks(list(names), BATCH_CHUNK_SIZE):
+            rows = session.execute(
+                select(
+                    ObjectTransform.name, ObjectTransform.state,
+                    ObjectTransform.since_keyframe
+                ).where(ObjectTransform.name.in_(chunk))
+            )
+            for name, state, since_keyframe in rows:
+                stored[name] = (state, since_keyframe)
+
+        previous = np.tile(DEFAULT_STATE, (len(names), 1))
+        for row, name in enumerate(names):
+            if name in stored:
+                previous[row] = np.frombuffer(stored[name][0], dtype="<f4")
+
+        current = previous.copy()
+        for i, field in enumerate(TRANSFORM_FIELDS):
+            if field in arrays:
+                current[:, i * 3:i * 3 + 3] = arrays[field]
+
+        changed = current != previous
+        is_new = np.array([name not in stored for name in names])
+        rows_to_write = np.flatnonzero(changed.any(axis=1) | is_new)
+
+        inserts, updates, history = [], [], []
+        for row in rows_to_write:
+            name, state = names[row], current[row]
+            since_keyframe = stored[name][1] + 1 if name in stored else 0
+            keyframe = name not in stored or (
+                since_keyframe >= KEYFRAME_INTERVAL
+            )
+            if keyframe:
+                since_keyframe = 0
+                record = state.tobytes()
+            else:
+                record = encode_delta(state, changed[row])
+
+            history.append({
+                "name": name, "timestamp": timestamp,
+                "keyframe": keyframe, "record": record
+            })
+            (inserts if name not in stored else updates).append({
+                "name": name, "state": state.tobytes(),
+                "updated_at": timestamp, "since_keyframe": since_keyframe
+            })
+
+        if inserts:
+            session.execute(insert(ObjectTransform), inserts)
+        if updates:
+            session.execute(update(ObjectTransform), updates)
+        if history:
+            session.execute(insert(TransformHistory), history)
+
+    return len(rows_to_write)
+
+
+def get_current_transforms(names: list | None = None):
+    """
+    Retrieve the latest stored transform of every object.
+    Args:
+        names (list, optional): Only return these objects.
+    Returns:
+        dict: Dicts with 'position', 'rotation', 'scale' and 'updated_at'
+              keys, keyed by object name.
+    """
+    query = select(
+        ObjectTransform.name, ObjectTransform.state,
+        ObjectTransform.updated_at
+    ).order_by(ObjectTransform.name)
+    if names is not None:
+        query = query.where(ObjectTransform.name.in_(names))
+
+    with get_database_session() as session:
+        rows = session.execute(query).all()
+
+    states = np.frombuffer(
+        b"".join(row.state for row in rows), dtype="<f4"
+    ).reshape(-1, 9)
+    return {
+        row.name: {**transform, "updated_at": row.updated_at}
+        for row, transform in zip(rows, _states_to_dicts(states))
+    }
+
+
+def get_transform_history(name: str, start: int | None = None,
+                          end: int | None = None):
+    """
+    Retrieve the transforms an object went through in a time range.
+    Decoding starts from the last keyframe at or before `start`, so the
+    cost is bounded by the records in the range plus at most
+    `KEYFRAME_INTERVAL` earlier ones.
+    Args:
+        name (str): The object name.
+        start (int, optional): Earliest timestamp to include, in
+                               milliseconds since the Unix epoch.
+        end (int, optional): Latest timestamp to include.
+    Returns:
+        list: Dicts with 'timestamp', 'position', 'rotation' and 'scale'
+              keys, oldest first.
+    Raises:
+        ValueError: If the object has no stored history.
+    """
+    with get_database_session() as session:
+        anchor = select(TransformHistory.id).where(
+            TransformHistory.name == name, TransformHistory.keyframe
+        )
+        if start is not None:
+            anchor = anchor.where(TransformHistory.timestamp <= start)
+        anchor_id = session.scalar(
+            anchor.order_by(TransformHistory.id.desc()).limit(1)
+        )
+        if anchor_id is None:
+            # The range starts before the object's first record
+            anchor_id = session.scalar(
+                select(TransformHistory.id)
+                .where(
+                    TransformHistory.name == name, TransformHistory.keyframe
+                )
+                .order_by(TransformHistory.id).limit(1)
+            )
+            if anchor_id is None:
+                raise ValueError("Object not found.")
+
+        query = select(
+            TransformHistory.timestamp, TransformHistory.keyframe,
+            TransformHistory.record
+        ).where(
+            TransformHistory.name == name, TransformHistory.id >= anchor_id
+        ).order_by(TransformHistory.id)
+        if end is not None:
+            query = query.where(TransformHistory.timestamp <= end)
+        records = session.execute(query).all()
+
+    timestamps, states = [], []
+    state = DEFAULT_STATE
+    for timestamp, keyframe, record in records:
+        state = decode_record(state, record, keyframe)
+        if start is None or timestamp >= start:
+            timestamps.append(timestamp)
+            states.append(state)
+
+    if not states:
+        return []
+    return [
+        {"timestamp": timestamp, **transform}
+        for timestamp, transform in zip(
+            timestamps, _states_to_dicts(np.stack(states))
+        )
+    ]
@@ -0,0 +1,134 @@
+import base64
+import binascii
+
+# numpy is imported by the functions that use it, so that importing this
+# module, and with it the application, does not load numpy
+
+# Transform components, each a vector of three floats per object
+TRANSFORM_FIELDS = ("position", "rotation", "scale")
+
+
+def decode_column(values, count: int, field: str):
+    """
+    Decode one transform component for every object into an array.
+    Args:
+        values (list | str): Either a flat list of 3 * `count` numbers, or
+                             a base64 string of 3 * `count` little-endian
+                             float32 values.
+        count (int): The number of objects.
+        field (str): The component name, used in error messages.
+    Returns:
+        numpy.ndarray: A (count, 3) float32 array.
+    Raises:
+        ValueError: If the data cannot be decoded, has the wrong length or
+                    contains NaN or infinite values.
+    """
+    import numpy as np
+    if isinstance(values, str):
+        try:
+            raw = base64.b64decode(values, validate=True)
+        except binascii.Error:
+            raise ValueError(f"{field} is not valid base64")
+        if len(raw) % 4:
+            raise ValueError(f"{field} is not a whole number of float32s")
+        array = np.frombuffer(raw, dtype="<f4")
+    else:
+        array = np.asarray(values, dtype=np.float32)
+
+    if array.size != count * 3:
+        raise ValueError(
+            f"{field} must contain {count * 3} values, got {array.size}"
+        )
+    array = array.reshape(count, 3)
+    if not np.isfinite(array).all():
+        raise ValueError(f"{field} contains NaN or infinite values")
+    return array
+
+
+def encode_column(array):
+    """
+    Encode a float array as base64 little-endian float32, the inverse of
+    `decode_column`.
+    Args:
+        array (numpy.ndarray): The values to encode.
+    Returns:
+        str: The base64 string.
+    """
+    import numpy as np
+    return base64.b64encode(
+        np.ascontiguousarray(array, dtype="<f4").tobytes()
+    ).decode()
+
+
+def decode_batch(objects: list, columns: dict):
+    """
+    Validate and decode a columnar batch of transforms.
+    Args:
+        objects (list): The object names, one per row.
+        columns (dict): The encoded components keyed by field name. Fields
+                        that are missing or None are not part of the batch.
+    Returns:
+        dict: The decoded (len(objects), 3) float32 arrays keyed by field.
+    Raises:
+        ValueError: If the batch is empty, names are repeated, no field is
+                    given or a column is invalid.
+    """
+    if not objects:
+        raise ValueError("objects must not be empty")
+    if len(set(objects)) != len(objects):
+        raise ValueError("objects must not contain duplicate names")
+
+    arrays = {
+        field: decode_column(columns[field], len(objects), field)
+        for field in TRANSFORM_FIELDS
+        if columns.get(field) is not None
+    }
+    if not arrays:
+        raise ValueError(
+            f"At least one of {', '.join(TRANSFORM_FIELDS)} is required"
+        )
+    return arrays
+
+
+def parse_transform(transform: dict, fields: tuple = TRANSFORM_FIELDS):
+    """
+    Extract the components of a single object's transform that can be
+    stored. A component is kept if it is a three-element vector or a single
+    number (applied to all three axes) of finite values; anything else is
+    ignored.
+    Args:
+        transform (dict): The transform sent by the client.
+        fields (tuple): The components to look for. Defaults to all.
+    Returns:
+        dict: (1, 3) float32 arrays keyed by field name.
+    """
+    import numpy as np
+    arrays = {}
+    for field in fields:
+        value = transform.get(field)
+        if value is None:
+            continue
+        try:
+            vector = np.broadcast_to(np.asarray(value, dtype=np.float32), 3)
+        except (TypeError, ValueError):
+            continue
+        if np.isfinite(vector).all():
+            arrays[field] = vector.reshape(1, 3)
+    return arrays
+
+
+def summarize_batch(arrays: dict):
+    """
+    Compute per-axis bounds of every component in one vectorized pass.
+    Args:
+        arrays (dict): (n, 3) arrays keyed by field name.
+    Returns:
+        dict: For each field, 'min' and 'max' lists of three floats.
+    """
+    return {
+        field: {
+            "min": array.min(axis=0).tolist(),
+            "max": array.max(axis=0).tolist()
+        }
+        for field, array in arrays.items()
+    }
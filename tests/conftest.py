@@ -1,5 +1,6 @@
 import sys
 import os
+import pytest
 
 sys.path.insert(
     0,
@@ -7,3 +8,10 @@ sys.path.insert(
         os.path.join(os.path.dirname(__file__), "..")
     )
 )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_database_tables():
+    """Create the tables, as the app's lifespan does at startup."""
+    from server.database import create_tables
+    create_tables()
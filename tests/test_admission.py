@@ -0,0 +1,78 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from server import endpoints
+from server.admission import (
+    ConcurrencyLimit, Overloaded, load_admission_limits,
+    set_admission_limits, admission_shed
+)
+from server.latency import LatencyProfile, set_latency_profile
+
+
+def test_load_admission_limits():
+    limits = load_admission_limits({
+        "DCC_ADMISSION_LIMITS": "/transform=4:10, /scale=2",
+        "DCC_ADMISSION_QUEUE_TIMEOUT_MS": "500",
+    })
+    assert (limits["/transform"].limit, limits["/transform"].max_queue) == (
+        4, 10
+    )
+    assert limits["/scale"].max_queue == 8
+    assert limits["/scale"].queue_timeout == 0.5
+    assert "/transform" in load_admission_limits({})
+    assert load_admission_limits({"DCC_ADMISSION_LIMITS": "off"}) == {}
+    with pytest.raises(ValueError):
+        load_admission_limits({"DCC_ADMISSION_LIMITS": "/transform=0"})
+
+
+def test_requests_queue_in_order_and_are_shed_when_full():
+    limit = ConcurrencyLimit("/test", 1, 1, queue_timeout=0.05)
+
+    async def scenario():
+        await limit.acquire()
+        waiter = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await limit.acquire()
+        limit.release(2.0)
+        await waiter
+        with pytest.raises(Overloaded) as late:
+            await limit.acquire()
+        limit.release()
+        return full.value, late.value
+
+    full, late = asyncio.run(scenario())
+    assert (full.reason, late.reason) == ("queue_full", "queue_timeout")
+    assert full.retry_after == 2
+    assert (limit.active, limit.queued) == (0, 0)
+
+
+def test_router_sheds_with_retry_after():
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    shed = admission_shed.value(route="/file-path", reason="queue_full")
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await asyncio.gather(
+                *(client.get("/file-path") for _ in range(3))
+            )
+
+    set_admission_limits({"/file-path": ConcurrencyLimit("/file-path", 1, 1)})
+    set_latency_profile(LatencyProfile({"/file-path": {"seconds": 0.1}}))
+    try:
+        responses = asyncio.run(burst())
+    finally:
+        set_latency_profile(None)
+        set_admission_limits(load_admission_limits())
+
+    assert sorted(r.status_code for r in responses) == [200, 200, 503]
+    rejected = next(r for r in responses if r.status_code == 503)
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert admission_shed.value(
+        route="/file-path", reason="queue_full"
+    ) == shed + 1
@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+from benchmarks import bench_database
+from benchmarks.stats import percentile, summarize
+from server import database
+
+
+def test_percentile():
+    assert percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert percentile([1, 2], 0.5) == 1.5
+    assert percentile([], 0.99) == 0.0
+    assert summarize([0.001, 0.003])["ops_per_sec"] == 500
+
+
+def test_database_benchmark_smoke():
+    original = database.storage_config
+    results = bench_database.benchmark([200], ["memory"], 20, 1, 0)
+    assert database.storage_config == original
+    assert {r["function"] for r in results} >= {
+        "add_item", "update_quantity", "remove_item", "get_inventory"
+    }
+    assert all(r["count"] > 0 for r in results)
+
+    slower = [dict(r, ops_per_sec=r["ops_per_sec"] / 2) for r in results]
+    lines = bench_database.compare(
+        {"results": results}, {"results": slower}, 0.1
+    )
+    assert all(line.endswith("REGRESSION") for line in lines)
+
+
+def test_load_test_smoke(tmp_path):
+    from benchmarks import load_test
+    output = tmp_path / "report.json"
+    original = database.storage_config
+    assert load_test.main([
+        "--plugins", "2", "--guis", "1", "--duration", "0.5",
+        "--stages", "1,2", "--items", "20", "--poll-interval", "0.1",
+        "--transform-interval", "0.1", "--gui-interval", "0.1",
+        "--output", str(output)
+    ]) == 0
+    assert database.storage_config == original
+
+    report = json.loads(output.read_text())
+    assert [stage["factor"] for stage in report["stages"]] == [1, 2]
+    assert report["last_healthy_factor"] == 2
+    endpoints = report["stages"][0]["endpoints"]
+    assert endpoints["POST /transform"]["count"] > 0
+    assert endpoints["total"]["errors"] == 0
+
+
+def test_forbidden_imports():
+    # Timings depend on the machine; budgets are enforced by running
+    # `python -m benchmarks.import_time --enforce`
+    from benchmarks import import_time
+    for module in import_time.FORBIDDEN_IMPORTS:
+        result = import_time.measure(module, repeat=1)
+        assert import_time.check(result, timing=False) == []
+
+
+def test_package_exports_the_app():
+    # `uvicorn server:app` looks the app up on the package
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import server; from server import app; import server.app; "
+         "print(type(app).__name__, type(server.app).__name__)"],
+        capture_output=True, text=True
+    )
+    assert result.stdout.split() == ["FastAPI", "FastAPI"]
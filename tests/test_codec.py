@@ -0,0 +1,214 @@
+import base64
+import hashlib
+import json
+import uuid
+import msgpack
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from server import endpoints
+from server.codec import (
+    ContentNegotiationMiddleware, CompressionDictionary, DCZ_HEADER,
+    MAX_REQUEST_BODY, BodyTooLarge, compression_dictionary,
+    decode_request_body, encode_response_body
+)
+from server.database import (
+    apply_batch, get_database_session, CodecDictionary
+)
+
+app = FastAPI()
+app.include_router(endpoints.router)
+app.add_middleware(ContentNegotiationMiddleware)
+
+client = TestClient(app)
+
+added_names = []
+
+
+@pytest.fixture(scope="module", autouse=True)
+def remove_added_items():
+    yield
+    apply_batch([{"op": "remove", "name": name} for name in added_names])
+
+
+def add_items(count: int):
+    names = [f"Codec Item {uuid.uuid4().hex}" for _ in range(count)]
+    apply_batch([{"op": "add", "name": n, "quantity": 1} for n in names])
+    added_names.extend(names)
+    return names
+
+
+def test_request_body_round_trip():
+    data = {"objects": ["Cube"], "position": b"\x00\x00\x80?" * 3}
+    body = zstandard.ZstdCompressor().compress(msgpack.packb(data))
+    decoded, changed = decode_request_body(body, "application/msgpack",
+                                           "zstd")
+    assert changed
+    assert decoded == (
+        b'{"objects": ["Cube"], "position": "'
+        + base64.b64encode(data["position"]) + b'"}'
+    )
+
+
+def test_dictionary_round_trip():
+    dictionary = CompressionDictionary()
+    samples = [f"Crate {i:04d} Wooden".encode() for i in range(500)]
+    dictionary.load(zstandard.train_dictionary(4096, samples).as_bytes())
+    body = b'{"name": "Crate 0042 Wooden", "quantity": 3}' * 10
+
+    compressed = dictionary.compress(body)
+    assert compressed.startswith(DCZ_HEADER + dictionary.hash)
+    assert dictionary.decompress(compressed) == body
+
+
+def test_small_bodies_are_not_compressed():
+    body, media_type, encoding = encode_response_body(
+        b'{"status": "success"}', True, True, False
+    )
+    assert msgpack.unpackb(body) == {"status": "success"}
+    assert media_type == "application/msgpack"
+    assert encoding is None
+
+
+def test_msgpack_zstd_inventory():
+    names = add_items(100)
+
+    response = client.get(
+        "/get_inventory",
+        headers={"Accept": "application/msgpack", "Accept-Encoding": "zstd"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.headers["etag"].startswith("W/")
+    inventory = msgpack.unpackb(response.content)["inventory"]
+    assert set(names) <= {item["name"] for item in inventory}
+
+    revalidated = client.get(
+        "/get_inventory",
+        headers={
+            "Accept": "application/msgpack", "Accept-Encoding": "zstd",
+            "If-None-Match": response.headers["etag"]
+        }
+    )
+    assert revalidated.status_code == 304
+
+
+def test_msgpack_request():
+    name = f"Codec Item {uuid.uuid4().hex}"
+    added_names.append(name)
+    response = client.post(
+        "/add-item",
+        content=zstandard.ZstdCompressor().compress(
+            msgpack.packb({"name": name, "quantity": 4})
+        ),
+        headers={
+            "Content-Type": "application/msgpack",
+            "Content-Encoding": "zstd",
+            "Accept": "application/msgpack"
+        }
+    )
+    assert response.status_code == 201
+    assert msgpack.unpackb(response.content)["item"] == {
+        "name": name, "quantity": 4
+    }
+
+    response = client.post(
+        "/add-item", content=b"not zstd",
+        headers={"Content-Type": "application/json",
+                 "Content-Encoding": "zstd"}
+    )
+    assert response.status_code == 400
+
+
+def test_dictionary_encoding():
+    add_items(100)
+    response = client.get("/codec/dictionary")
+    assert response.status_code == 200
+    assert response.content == compression_dictionary.get()
+    digest = base64.b64encode(compression_dictionary.hash).decode()
+
+    response = client.get(
+        "/get_inventory", params={"limit": 20},
+        headers={
+            "Accept-Encoding": "dcz, zstd",
+            "Available-Dictionary": f":{digest}:"
+        }
+    )
+    assert response.headers["content-encoding"] == "dcz"
+    body = compression_dictionary.decompress(response.content)
+    assert body.startswith(b'{"status":"success"')
+
+
+def test_dictionary_is_shared_by_worker_processes():
+    add_items(100)
+    current = compression_dictionary.get()
+    # Another worker adopts the stored dictionary instead of training one
+    assert CompressionDictionary().get() == current
+
+    samples = [f"Barrel {i:04d} Oak".encode() for i in range(500)]
+    older = zstandard.train_dictionary(4096, samples).as_bytes()
+    with get_database_session() as session:
+        session.add(CodecDictionary(
+            hash=hashlib.sha256(older).digest(), data=older, created_at=0
+        ))
+    sender = CompressionDictionary()
+    sender.load(older)
+    name = f"Barrel {uuid.uuid4().hex}"
+    body = sender.compress(
+        json.dumps({"name": name, "quantity": 1}).encode()
+    )
+
+    worker = CompressionDictionary()
+    with pytest.raises(ValueError):
+        worker.decompress(body)
+    assert worker.find(sender.hash)
+    assert worker.hash == compression_dictionary.hash
+
+    response = client.post(
+        "/add-item", content=body,
+        headers={"Content-Type": "application/json",
+                 "Content-Encoding": "dcz"}
+    )
+    assert response.status_code == 201
+    added_names.append(name)
+
+
+def test_decompressed_size_is_limited():
+    bomb = zstandard.ZstdCompressor().compress(b" " * (MAX_REQUEST_BODY + 1))
+    with pytest.raises(BodyTooLarge):
+        decode_request_body(bomb, "application/json", "zstd")
+
+    headers = {"Content-Type": "application/json", "Content-Encoding": "zstd"}
+    response = client.post("/add-item", content=bomb, headers=headers)
+    assert response.status_code == 413
+    response = client.post("/inventory/import", content=bomb, headers=headers)
+    assert response.status_code == 413
+
+
+def test_compressed_import_is_streamed():
+    prefix = f"Streamed {uuid.uuid4().hex}"
+    upload = "".join(
+        f'{{"name": "{prefix} {i}", "quantity": {i}}}\n' for i in range(50)
+    )
+    compressed = zstandard.ZstdCompressor().compress(upload.encode())
+
+    def chunks():
+        for start in range(0, len(compressed), 64):
+            yield compressed[start:start + 64]
+
+    response = client.post(
+        "/inventory/import", content=chunks(),
+        headers={"Content-Type": "application/x-ndjson",
+                 "Content-Encoding": "zstd"}
+    )
+    added_names.extend(f"{prefix} {i}" for i in range(50))
+    assert response.status_code == 200
+    assert response.json()["added"] == 50
+
+    response = client.post(
+        "/inventory/import", content=b"not zstd",
+        headers={"Content-Encoding": "zstd"}
+    )
+    assert response.status_code == 400
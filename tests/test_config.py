@@ -0,0 +1,51 @@
+import os
+import pytest
+from server.config import (
+    load_storage_config, load_server_config, StorageConfig,
+    DEFAULT_DATABASE_URL
+)
+
+
+def test_defaults():
+    config = load_storage_config({})
+    assert config.url == DEFAULT_DATABASE_URL
+    assert config.journal_mode == "WAL"
+    assert config.synchronous == "NORMAL"
+    assert config.pool_size == config.executor_workers + 1
+
+
+def test_environment_overrides():
+    config = load_storage_config({
+        "DATABASE_URL": "sqlite:///inventory-{pid}.db",
+        "DCC_SQLITE_JOURNAL_MODE": "delete",
+        "DCC_SQLITE_BUSY_TIMEOUT": "100",
+        "DCC_DB_EXECUTOR_WORKERS": "8",
+    })
+    assert config.url == f"sqlite:///inventory-{os.getpid()}.db"
+    assert config.journal_mode == "DELETE"
+    assert config.busy_timeout == 100
+    assert config.pool_size == 9
+
+
+def test_invalid_values():
+    with pytest.raises(ValueError):
+        load_storage_config({"DCC_SQLITE_SYNCHRONOUS": "sometimes"})
+    with pytest.raises(ValueError):
+        load_storage_config({"DCC_SQLITE_MMAP_SIZE": "lots"})
+    with pytest.raises(ValueError):
+        load_storage_config({"DCC_GROUP_COMMIT_MAX_OPS": "0"})
+
+
+def test_memory_urls():
+    assert StorageConfig(url="sqlite://").is_memory
+    assert StorageConfig(url="sqlite:///:memory:").is_memory
+    assert not StorageConfig(url="sqlite:///inventory.db").is_memory
+
+
+def test_server_config():
+    config = load_server_config({"DCC_WORKERS": "4", "DCC_PORT": "9000"})
+    assert config.workers == 4
+    assert config.port == 9000
+    assert load_server_config({}).workers == 1
+    with pytest.raises(ValueError):
+        load_server_config({"DCC_WORKERS": "0"})
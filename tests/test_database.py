@@ -1,9 +1,18 @@
 # filepath: /d:/Python/Blender Plugin/dcc-integration/tests/test_database.py
+import asyncio
+import threading
+import time
 import pytest
+from sqlalchemy import create_engine
+from server import async_database, database
+from server.config import StorageConfig
 from server.database import (
-    add_item, remove_item, update_quantity, get_inventory,
-    create_tables, Session
+    add_item, remove_item, update_quantity, adjust_quantity, get_inventory,
+    get_inventory_page, get_revision, get_changes_since, compact_changelog,
+    apply_batch, create_tables, Session, configure_database,
+    get_inventory_rows, search_items, InsufficientQuantityError
 )
+from server.serialization import render_inventory
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -24,11 +33,286 @@ def test_update_quantity():
     assert item.quantity == 20
 
 
+def test_adjust_quantity():
+    assert adjust_quantity("Test Item", -5) == ("Test Item", 15)
+    assert adjust_quantity("Test Item", 5) == ("Test Item", 20)
+    with pytest.raises(InsufficientQuantityError):
+        adjust_quantity("Test Item", -21)
+    with pytest.raises(ValueError, match="Item not found"):
+        adjust_quantity("Missing Item", 1)
+
+
 def test_remove_item():
     item = remove_item("Test Item")
     assert item.name == "Test Item"
 
 
+def test_apply_batch():
+    results = apply_batch([
+        {"op": "add", "name": "Batch Item A", "quantity": 5},
+        {"op": "add", "name": "Batch Item B", "quantity": 7},
+        {"op": "update", "name": "Batch Item A", "quantity": 9},
+        {"op": "remove", "name": "Batch Item B"},
+        {"op": "remove", "name": "Missing Item"},
+        {"op": "add", "name": "Batch Item A", "quantity": 1},
+    ])
+    assert [r["status"] for r in results] == [
+        "success", "success", "success", "success", "error", "error"
+    ]
+    assert results[2]["quantity"] == 9
+    assert results[4]["detail"] == "Item not found."
+
+    inventory = {i.name: i.quantity for i in get_inventory()}
+    assert inventory == {"Batch Item A": 9}
+
+    results = apply_batch([{"op": "remove", "name": "Batch Item A"}])
+    assert results == [{
+        "op": "remove", "name": "Batch Item A",
+        "status": "success", "quantity": 9
+    }]
+
+
+def test_concurrent_batches_adding_one_name():
+    results = []
+
+    def add():
+        results.extend(apply_batch([
+            {"op": "add", "name": "Contended Item", "quantity": 1},
+            {"op": "add", "name": "Contended Item 2", "quantity": 1},
+        ]))
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 16
+    assert sum(r["status"] == "success" for r in results) == 2
+    apply_batch([
+        {"op": "remove", "name": "Contended Item"},
+        {"op": "remove", "name": "Contended Item 2"},
+    ])
+
+
+def test_get_inventory_page():
+    names = [f"Page Item {i:02d}" for i in range(25)]
+    apply_batch([
+        {"op": "add", "name": name, "quantity": i % 5}
+        for i, name in enumerate(names)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = get_inventory_page(10, cursor, q="Page Item")
+        seen.extend(item.name for item in items)
+        if cursor is None:
+            break
+    assert seen == names
+
+    items, _ = get_inventory_page(3, sort="quantity", order="desc")
+    assert [item.quantity for item in items] == [4, 4, 4]
+
+    items, _ = get_inventory_page(q="item 1", match="contains")
+    assert len(items) == 10
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        get_inventory_page(10, "not-a-cursor")
+
+    apply_batch([{"op": "remove", "name": name} for name in names])
+
+
+def test_revision_tracks_writes():
+    revision = get_revision()
+    add_item("Revision Item", 1)
+    assert get_revision() == revision + 1
+
+    # Failed and read-only operations leave the revision unchanged
+    with pytest.raises(ValueError):
+        update_quantity("Missing Item", 1)
+    get_inventory()
+    assert get_revision() == revision + 1
+
+    remove_item("Revision Item")
+    assert get_revision() == revision + 2
+
+
+def test_async_database():
+    async def purchase_concurrently():
+        await async_database.add_item("Async Item", 10)
+        await asyncio.gather(*[
+            async_database.adjust_quantity("Async Item", -1)
+            for _ in range(10)
+        ])
+        return await async_database.remove_item("Async Item")
+
+    item = asyncio.run(purchase_concurrently())
+    assert item.quantity == 0
+
+
+def test_sqlite_pragmas():
+    with database.engine.connect() as connection:
+        pragma = connection.exec_driver_sql
+        assert pragma("PRAGMA journal_mode").scalar() == "wal"
+        assert pragma("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+def test_configure_in_memory_database():
+    original = database.storage_config
+    configure_database(StorageConfig(url="sqlite://"))
+    try:
+        create_tables()
+        add_item("Memory Item", 1)
+        assert [i.name for i in get_inventory()] == ["Memory Item"]
+    finally:
+        configure_database(original)
+    assert "Memory Item" not in [i.name for i in get_inventory()]
+
+
+def test_in_memory_sessions_do_not_share_transactions():
+    class Abort(Exception):
+        pass
+
+    def write(name, flushed, rollback):
+        try:
+            with database.get_database_session() as session:
+                session.add(database.Item(name=name, quantity=1))
+                session.flush()
+                flushed.set()
+                time.sleep(0.1)
+                if rollback:
+                    raise Abort()
+        except Abort:
+            pass
+
+    original = database.storage_config
+    configure_database(StorageConfig(url="sqlite://"))
+    try:
+        create_tables()
+        for first_rolls_back in (True, False):
+            flushed = threading.Event()
+            first = threading.Thread(target=write, args=(
+                f"First {first_rolls_back}", flushed, first_rolls_back
+            ))
+            first.start()
+            assert flushed.wait(5)
+            write(f"Second {first_rolls_back}", threading.Event(),
+                  not first_rolls_back)
+            first.join(5)
+
+        assert sorted(i.name for i in get_inventory()) == [
+            "First False", "Second True"
+        ]
+    finally:
+        configure_database(original)
+
+
+def test_get_changes_since():
+    since = get_revision()
+    add_item("Delta Item A", 1)
+    add_item("Delta Item B", 2)
+    update_quantity("Delta Item A", 5)
+    remove_item("Delta Item B")
+
+    changes = get_changes_since(since)
+    assert changes == {
+        "revision": since + 4,
+        "resync_required": False,
+        "upserted": [{"name": "Delta Item A", "quantity": 5}],
+        "deleted": ["Delta Item B"]
+    }
+    assert get_changes_since(since + 4)["upserted"] == []
+    assert get_changes_since(since, limit=1)["resync_required"]
+    assert get_changes_since(since + 5)["resync_required"]
+
+    compact_changelog(since + 1)
+    assert get_changes_since(since)["resync_required"]
+    assert not get_changes_since(since + 1)["resync_required"]
+
+    remove_item("Delta Item A")
+
+
+def test_upgrade_existing_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    old_engine = create_engine(url)
+    with old_engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, "
+            "name VARCHAR UNIQUE NOT NULL, quantity INTEGER NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO items (name, quantity) VALUES ('Old Item', 1)"
+        )
+    old_engine.dispose()
+
+    original = database.storage_config
+    configure_database(StorageConfig(url=url))
+    try:
+        create_tables()
+        assert get_revision() == 0
+        update_quantity("Old Item", 2)
+        assert get_changes_since(0)["upserted"] == [
+            {"name": "Old Item", "quantity": 2}
+        ]
+        # Items stored before the search index existed are indexed
+        assert [r["name"] for r in search_items("ld ite")] == ["Old Item"]
+    finally:
+        configure_database(original)
+
+
 def test_get_inventory():
     inventory = get_inventory()
     assert len(inventory) == 0
+
+
+def test_get_inventory_rows():
+    apply_batch([
+        {"op": "add", "name": "Row Item B", "quantity": 2},
+        {"op": "add", "name": "Row Item A", "quantity": 1},
+    ])
+    try:
+        rows = get_inventory_rows()
+        assert [tuple(row) for row in rows] == [
+            ("Row Item A", 1), ("Row Item B", 2)
+        ]
+        assert render_inventory(rows) == (
+            b'{"status":"success","inventory":[{"name":"Row Item A",'
+            b'"quantity":1},{"name":"Row Item B","quantity":2}]}'
+        )
+    finally:
+        apply_batch([
+            {"op": "remove", "name": "Row Item A"},
+            {"op": "remove", "name": "Row Item B"},
+        ])
+
+
+def test_search_items():
+    names = [
+        "Search Lamp", "Search Lamp Shade", "Desk Search Lamp",
+        "Wooden Chair", "Vintage Wooden Chair",
+    ]
+    apply_batch([{"op": "add", "name": n, "quantity": 1} for n in names])
+    try:
+        results = search_items("search lamp")
+        assert [(r["name"], r["match"]) for r in results] == [
+            ("Search Lamp", "prefix"),
+            ("Search Lamp Shade", "prefix"),
+            ("Desk Search Lamp", "substring"),
+        ]
+        assert results[0]["quantity"] == 1
+        assert len(search_items("search", limit=2)) == 2
+
+        fuzzy = search_items("wooden chiar")
+        assert {r["name"] for r in fuzzy} == {
+            "Wooden Chair", "Vintage Wooden Chair"
+        }
+        assert {r["match"] for r in fuzzy} == {"fuzzy"}
+        assert fuzzy[0]["name"] == "Wooden Chair"
+        assert search_items("wooden chiar", fuzzy=False) == []
+    finally:
+        apply_batch([{"op": "remove", "name": n} for n in names])
+
+    # Removed items leave the index with them
+    assert search_items("search lamp") == []
+    with pytest.raises(ValueError):
+        search_items("  ")
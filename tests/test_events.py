@@ -0,0 +1,79 @@
+import asyncio
+from server import async_database, database
+from server.events import event_bus, InventoryEventBus, ChangelogFollower
+
+
+def test_write_paths_publish_events():
+    async def collect():
+        subscription = event_bus.subscribe()
+        try:
+            await async_database.add_item("Event Item", 2)
+            await async_database.adjust_quantity("Event Item", 1)
+            await async_database.remove_item("Event Item")
+            return [await subscription.get() for _ in range(3)]
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    frames = asyncio.run(collect())
+    assert [frame.split(b"\n")[1] for frame in frames] == [
+        b"event: added", b"event: quantity_changed", b"event: removed"
+    ]
+    assert b'"quantity": 3' in frames[1]
+
+
+def test_slow_subscriber_is_told_to_resync():
+    bus = InventoryEventBus()
+
+    async def overflow():
+        subscription = bus.subscribe()
+        changes = [("added", f"Item {i}", 1) for i in range(1001)]
+        bus.publish(1, changes)
+        await asyncio.sleep(0)
+        return await subscription.get()
+
+    assert asyncio.run(overflow()) is None
+
+
+def test_follower_publishes_every_revision_in_order():
+    bus = InventoryEventBus()
+    seen = []
+    follower = ChangelogFollower(bus, 1, (lambda r, c: seen.append((r, c)),))
+    follower.revision = database.get_revision()
+
+    async def follow():
+        subscription = bus.subscribe()
+        database.add_item("Follower Item", 1)
+        database.update_quantity("Follower Item", 5)
+        database.remove_item("Follower Item")
+        follower.poll()
+        await asyncio.sleep(0)
+        return [subscription.queue.get_nowait() for _ in range(3)]
+
+    frames = asyncio.run(follow())
+    assert [frame.split(b"\n")[1] for frame in frames] == [
+        b"event: added", b"event: quantity_changed", b"event: removed"
+    ]
+    assert [changes for _, changes in seen] == [
+        [("added", "Follower Item", 1)],
+        [("quantity_changed", "Follower Item", 5)],
+        [("removed", "Follower Item", None)],
+    ]
+    assert follower.revision == seen[-1][0] == database.get_revision()
+
+
+def test_follower_resyncs_after_compaction():
+    bus = InventoryEventBus()
+    follower = ChangelogFollower(bus, 1)
+    database.add_item("Compacted Item", 1)
+    database.remove_item("Compacted Item")
+    follower.revision = database.get_revision() - 2
+    database.compact_changelog(database.get_revision() - 1)
+
+    async def follow():
+        subscription = bus.subscribe()
+        follower.poll()
+        await asyncio.sleep(0)
+        return await subscription.get()
+
+    assert asyncio.run(follow()) is None
+    assert follower.revision == database.get_revision()
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from server import async_database, database
+from server.group_commit import GroupCommitter
+
+
+def test_concurrent_writes_share_one_commit():
+    database.add_item("Group Item", 10)
+    revision = database.get_revision()
+
+    async def burst():
+        return await asyncio.gather(
+            async_database.adjust_quantity("Group Item", -3),
+            async_database.adjust_quantity("Group Item", -20),
+            async_database.update_quantity("Missing Group Item", 1),
+            async_database.add_item("Group Item", 1),
+            async_database.add_item("Other Group Item", 2),
+            async_database.remove_item("Other Group Item"),
+            return_exceptions=True
+        )
+
+    adjusted, short, missing, duplicate, added, removed = asyncio.run(
+        burst()
+    )
+    assert adjusted == ("Group Item", 7)
+    assert isinstance(short, database.InsufficientQuantityError)
+    assert str(missing) == "Item not found."
+    assert "Database error" in str(duplicate)
+    assert (added.name, added.quantity) == ("Other Group Item", 2)
+    assert removed.name == "Other Group Item"
+
+    assert database.get_revision() == revision + 1
+    changes = database.get_changes_since(revision)
+    assert changes["upserted"] == [{"name": "Group Item", "quantity": 7}]
+    assert changes["deleted"] == ["Other Group Item"]
+    database.remove_item("Group Item")
+
+
+def test_groups_are_limited_and_commit_errors_are_shared():
+    groups = []
+
+    async def apply(calls):
+        groups.append([args[0] for _, args in calls])
+        await asyncio.sleep(0.01)
+        if len(groups) == 3:
+            raise RuntimeError("commit failed")
+        return [(True, args[0]) for _, args in calls]
+
+    committer = GroupCommitter(apply, max_ops=2, window=1)
+
+    async def burst():
+        return await asyncio.gather(
+            *(committer.submit("write", i) for i in range(5)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(burst())
+    assert groups == [[0, 1], [2, 3], [4]]
+    assert results[:4] == [0, 1, 2, 3]
+    with pytest.raises(RuntimeError):
+        raise results[4]
@@ -0,0 +1,76 @@
+import threading
+import time
+import pytest
+from server import jobs
+from server.jobs import JobQueue, JobQueueFull
+
+
+def test_jobs_run_by_priority_and_record_their_outcome():
+    queue = JobQueue(workers=1, max_pending=3)
+    started = threading.Event()
+    gate = threading.Event()
+    order = []
+
+    def work(label):
+        started.set()
+        gate.wait(5)
+        order.append(label)
+        if label == "broken":
+            raise ValueError("boom")
+        return {"label": label}
+
+    ids = [jobs.create_job("/test") for _ in range(5)]
+    queue.submit(ids[0], work, "first")
+    assert started.wait(5)
+    queue.submit(ids[1], work, "low", priority=-1)
+    queue.submit(ids[2], work, "broken")
+    queue.submit(ids[3], work, "high", priority=5)
+    with pytest.raises(JobQueueFull):
+        queue.submit(ids[4], work, "rejected")
+
+    gate.set()
+    deadline = time.monotonic() + 5
+    while jobs.get_jobs([ids[1]])[ids[1]]["status"] != "succeeded":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    assert order == ["first", "high", "broken", "low"]
+    found = jobs.get_jobs(ids)
+    assert found[ids[0]]["result"] == {"label": "first"}
+    assert found[ids[2]]["status"] == "failed"
+    assert found[ids[2]]["error"] == "boom"
+    assert found[ids[4]]["status"] == "queued"
+
+    assert jobs.fail_interrupted_jobs() >= 1
+    assert jobs.get_jobs([ids[4]])[ids[4]]["status"] == "failed"
+
+
+def test_jobs_for_one_key_run_in_submission_order():
+    queue = JobQueue(workers=4)
+    gate = threading.Event()
+    order = []
+
+    def work(label):
+        if label == "cube 1":
+            gate.wait(5)
+        order.append(label)
+
+    ids = [jobs.create_job("/test") for _ in range(4)]
+    queue.submit(ids[0], work, "cube 1", key="Cube")
+    queue.submit(ids[1], work, "cube 2", priority=5, key="Cube")
+    queue.submit(ids[2], work, "cube 3", key="Cube")
+    queue.submit(ids[3], work, "sphere", key="Sphere")
+
+    deadline = time.monotonic() + 5
+    while "sphere" not in order:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert order == ["sphere"]
+    assert queue.pending == 2
+
+    gate.set()
+    while jobs.get_jobs([ids[2]])[ids[2]]["status"] != "succeeded":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert order == ["sphere", "cube 1", "cube 2", "cube 3"]
+    assert queue.pending == 0
@@ -0,0 +1,68 @@
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from server import endpoints
+from server.latency import (
+    LatencyDistribution, LatencyProfile, load_latency_profile,
+    set_latency_profile
+)
+
+
+def test_fixed_with_jitter():
+    distribution = LatencyDistribution(
+        {"distribution": "fixed", "seconds": 1.0, "jitter": 0.2}
+    )
+    samples = [distribution.sample() for _ in range(1000)]
+    assert 0.8 <= min(samples) and max(samples) <= 1.2
+
+
+def test_percentiles():
+    distribution = LatencyDistribution({
+        "distribution": "percentiles", "p50": 0.1, "p95": 0.5, "p99": 2.0,
+        "max": 4.0
+    })
+    assert distribution.sample(0.5) == pytest.approx(0.1)
+    assert distribution.sample(0.95) == pytest.approx(0.5)
+    assert distribution.sample(0.995) == pytest.approx(3.0)
+    assert distribution.sample(0.0) == 0.0
+
+
+def test_invalid_distributions():
+    with pytest.raises(ValueError):
+        LatencyDistribution({"distribution": "gaussian"})
+    with pytest.raises(ValueError):
+        LatencyDistribution({"distribution": "uniform", "min": 2, "max": 1})
+
+
+def test_load_profile(tmp_path):
+    assert load_latency_profile({}) is None
+    assert load_latency_profile({"DCC_LATENCY_PROFILE": "off"}) is None
+
+    legacy = load_latency_profile({"DCC_LATENCY_PROFILE": "legacy"})
+    assert legacy.delay_for("/transform") == 10
+    assert legacy.delay_for("/get_inventory") == 0
+
+    path = tmp_path / "profile.json"
+    path.write_text(
+        '{"default": {"seconds": 0.5}, '
+        '"routes": {"/scale": {"distribution": "uniform", '
+        '"min": 1, "max": 2}}}'
+    )
+    profile = load_latency_profile({"DCC_LATENCY_PROFILE": str(path)})
+    assert profile.delay_for("/file-path") == 0.5
+    assert 1 <= profile.delay_for("/scale") <= 2
+
+
+def test_router_applies_profile():
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    client = TestClient(app)
+
+    set_latency_profile(LatencyProfile({"/file-path": {"seconds": 0.2}}))
+    try:
+        start = time.perf_counter()
+        assert client.get("/file-path").status_code == 200
+        assert time.perf_counter() - start >= 0.2
+    finally:
+        set_latency_profile(None)
@@ -0,0 +1,63 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from server import endpoints
+from server.metrics import (
+    Counter, Histogram, MetricsMiddleware, db_queries, http_requests,
+    statement_kind
+)
+
+app = FastAPI()
+app.include_router(endpoints.router)
+app.include_router(endpoints.monitoring_router)
+app.add_middleware(MetricsMiddleware)
+
+client = TestClient(app)
+
+
+def test_histogram_rendering():
+    histogram = Histogram("test_seconds", "Test.", ("route",), (0.1, 1))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.1, route="/a")
+    histogram.observe(5, route="/a")
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_seconds_bucket{route="/a",le="1"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_seconds_sum{route="/a"} 5.15',
+        'test_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_counter_labels():
+    counter = Counter("test_total", "Test.", ("kind",))
+    counter.inc(kind='say "hi"')
+    assert counter.render()[-1] == 'test_total{kind="say \\"hi\\""} 1'
+    assert statement_kind("  SELECT 1") == "select"
+
+
+def test_metrics_endpoint():
+    before = http_requests.value(
+        method="GET", route="/transforms/{name}/history", status=404
+    )
+    queries = db_queries.value(statement="select")
+    client.get("/transforms/Metrics Missing Object/history")
+
+    assert http_requests.value(
+        method="GET", route="/transforms/{name}/history", status=404
+    ) == before + 1
+    assert db_queries.value(statement="select") > queries
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE dcc_http_request_duration_seconds histogram" in text
+    assert (
+        'dcc_http_request_duration_seconds_count{method="GET",'
+        'route="/transforms/{name}/history",status="404"}'
+    ) in text
+    assert "dcc_http_requests_in_flight 1" in text
+    assert 'dcc_db_sessions_total{outcome="error"}' in text
+    assert 'dcc_db_pool_connections{state="checked_out"} 0' in text
@@ -0,0 +1,55 @@
+import json
+import logging
+import pytest
+from server.endpoints import AddItem
+from server.request_log import (
+    JsonFormatter, RequestLogger, load_sample_rates
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JsonFormatter())
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_records_are_rendered_on_the_listener():
+    handler = ListHandler()
+    request_logger = RequestLogger(handler)
+    request_logger.log("/add-item", AddItem(name="Log Item", quantity=3))
+    request_logger.log("/batch", lambda: {"operations": 2})
+    request_logger.stop()
+
+    entries = [json.loads(line) for line in handler.lines]
+    assert [entry["endpoint"] for entry in entries] == ["/add-item", "/batch"]
+    assert entries[0]["data"] == {"name": "Log Item", "quantity": 3}
+    assert entries[0]["message"] == "Received request to /add-item"
+    assert entries[1]["data"] == {"operations": 2}
+
+
+def test_sampling_and_overflow():
+    handler = ListHandler()
+    request_logger = RequestLogger(
+        handler, rates={"/inventory": 0}, maxsize=2
+    )
+    request_logger.log("/inventory", {})
+    assert request_logger._listener is None
+
+    request_logger._listener = object()  # Keep the queue from draining
+    for _ in range(3):
+        request_logger.log("/add-item", {})
+    assert request_logger.dropped == 1
+
+
+def test_load_sample_rates():
+    assert load_sample_rates({}) == (1.0, {})
+    assert load_sample_rates({
+        "DCC_LOG_SAMPLE_RATE": "0.5",
+        "DCC_LOG_SAMPLE_RATES": "/inventory=0.01, /events=0"
+    }) == (0.5, {"/inventory": 0.01, "/events": 0.0})
+    with pytest.raises(ValueError, match="DCC_LOG_SAMPLE_RATE"):
+        load_sample_rates({"DCC_LOG_SAMPLE_RATE": "2"})
@@ -1,6 +1,9 @@
+import time
+import uuid
 import pytest
 from fastapi.testclient import TestClient
 from server import endpoints
+from server.transforms import encode_column
 from fastapi import FastAPI
 
 app = FastAPI()
@@ -38,6 +41,24 @@ def test_update_quantity(test_client):
     }
 
 
+def test_adjust_quantity(test_client):
+    response = test_client.post(
+        "/adjust-quantity",
+        json={"name": "Test Item", "delta": -5}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "success",
+        "item": {"name": "Test Item", "quantity": 15}
+    }
+
+    response = test_client.post(
+        "/adjust-quantity",
+        json={"name": "Test Item", "delta": -16, "min": 0}
+    )
+    assert response.status_code == 409
+
+
 def test_remove_item(test_client):
     response = test_client.post(
         "/remove-item",
@@ -47,6 +68,24 @@ def test_remove_item(test_client):
     assert response.json() == {"status": "success", "item": "Test Item"}
 
 
+def test_batch(test_client):
+    response = test_client.post(
+        "/batch",
+        json={"operations": [
+            {"op": "add", "name": "Batch Item", "quantity": 3},
+            {"op": "update", "name": "Batch Item", "quantity": 4},
+            {"op": "remove", "name": "Batch Item"},
+            {"op": "update", "name": "Batch Item", "quantity": 1},
+        ]}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == [
+        "success", "success", "success", "error"
+    ]
+    assert results[1]["quantity"] == 4
+
+
 def test_get_inventory(test_client):
     response = test_client.get("/get_inventory")
     assert response.status_code == 200
@@ -54,6 +93,74 @@ def test_get_inventory(test_client):
     assert response.json()["status"] == "success"
 
 
+def test_get_inventory_etag(test_client):
+    response = test_client.get("/get_inventory")
+    etag = response.headers["etag"]
+
+    response = test_client.get(
+        "/get_inventory", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    test_client.post(
+        "/batch",
+        json={"operations": [
+            {"op": "add", "name": "ETag Item", "quantity": 1}
+        ]}
+    )
+    response = test_client.get(
+        "/get_inventory", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert {"name": "ETag Item", "quantity": 1} in response.json()["inventory"]
+
+    test_client.post(
+        "/batch", json={"operations": [{"op": "remove", "name": "ETag Item"}]}
+    )
+
+
+def test_get_inventory_changes(test_client):
+    response = test_client.get("/get_inventory")
+    revision = int(response.headers["x-inventory-revision"])
+
+    test_client.post(
+        "/batch",
+        json={"operations": [
+            {"op": "add", "name": "Delta Item", "quantity": 1}
+        ]}
+    )
+    response = test_client.get(
+        "/get_inventory/changes", params={"since": revision}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "success",
+        "revision": revision + 1,
+        "resync_required": False,
+        "upserted": [{"name": "Delta Item", "quantity": 1}],
+        "deleted": []
+    }
+
+    test_client.post(
+        "/batch", json={"operations": [{"op": "remove", "name": "Delta Item"}]}
+    )
+
+
+def test_get_inventory_page(test_client):
+    response = test_client.get(
+        "/get_inventory", params={"limit": 1, "sort": "id"}
+    )
+    assert response.status_code == 200
+    assert "next_cursor" in response.json()
+
+    response = test_client.get(
+        "/get_inventory", params={"limit": 1, "cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+
 def test_transform(test_client):
     response = test_client.post(
         "/transform",
@@ -93,6 +200,95 @@ def test_scale(test_client):
     assert response.json() == {"status": "success", "scale": 2}
 
 
+def test_transform_batch(test_client):
+    objects = [f"cube-{uuid.uuid4()}", f"sphere-{uuid.uuid4()}"]
+    batch = {
+        "objects": objects,
+        "position": [1, 2, 3, -1, 0, 5],
+        "scale": encode_column([[1, 1, 1], [2, 2, 2]])
+    }
+    response = test_client.post("/transform/batch", json=batch)
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "success",
+        "count": 2,
+        "changed": 2,
+        "fields": ["position", "scale"],
+        "bounds": {
+            "position": {"min": [-1, 0, 3], "max": [1, 2, 5]},
+            "scale": {"min": [1, 1, 1], "max": [2, 2, 2]}
+        }
+    }
+
+    # Re-sending an unchanged scene writes nothing
+    response = test_client.post("/transform/batch", json=batch)
+    assert response.json()["changed"] == 0
+
+    response = test_client.post(
+        "/transform/batch",
+        json={"objects": objects, "position": [1, 2, 3]}
+    )
+    assert response.status_code == 422
+    assert "position must contain 6 values" in response.json()["detail"]
+
+
+def test_stored_transforms(test_client):
+    name = f"cone-{uuid.uuid4()}"
+    for position in ([0, 0, 0], [1, 0, 0], [1, 2, 0]):
+        test_client.post(
+            "/translation",
+            json={"object": name, "transform": {"position": position}}
+        )
+
+    response = test_client.get("/transforms", params={"objects": [name]})
+    assert response.status_code == 200
+    transform = response.json()["transforms"][name]
+    assert transform["position"] == [1, 2, 0]
+    assert transform["scale"] == [1, 1, 1]
+
+    response = test_client.get(f"/transforms/{name}/history")
+    assert [h["position"] for h in response.json()["history"]] == [
+        [0, 0, 0], [1, 0, 0], [1, 2, 0]
+    ]
+
+    response = test_client.get("/transforms/missing-object/history")
+    assert response.status_code == 404
+
+
+def test_transform_job(test_client):
+    name = f"torus-{uuid.uuid4()}"
+    response = test_client.post(
+        "/translation",
+        json={"object": name, "transform": {"position": [4, 5, 6]}},
+        headers={"Prefer": "respond-async"}
+    )
+    assert response.status_code == 202
+    assert response.headers["Preference-Applied"] == "respond-async"
+    job_id = response.json()["job_id"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+
+    deadline = time.monotonic() + 5
+    while True:
+        job = test_client.get(f"/jobs/{job_id}").json()["job"]
+        if job["status"] in ("succeeded", "failed") or (
+            time.monotonic() > deadline
+        ):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"status": "success", "position": [4, 5, 6]}
+
+    response = test_client.get("/transforms", params={"objects": [name]})
+    assert response.json()["transforms"][name]["position"] == [4, 5, 6]
+
+    response = test_client.get(
+        "/jobs", params={"ids": [job_id, "missing-job"]}
+    )
+    assert [job["id"] for job in response.json()["jobs"]] == [job_id]
+    assert response.json()["missing"] == ["missing-job"]
+    assert test_client.get("/jobs/missing-job").status_code == 404
+
+
 def test_file_path(test_client):
     response = test_client.get("/file-path")
     assert response.status_code == 200
@@ -101,3 +297,69 @@ def test_file_path(test_client):
     response = test_client.get("/file-path?projectpath=true")
     assert response.status_code == 200
     assert response.json() == {"path": "/path/to/project/folder"}
+
+
+def test_inventory_export_import(test_client):
+    prefix = f"Bulk {uuid.uuid4().hex}"
+    upload = "".join(
+        f'{{"name": "{prefix} {i}", "quantity": {i}}}\n' for i in range(5)
+    )
+    response = test_client.post("/inventory/import", content=upload)
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "success", "added": 5, "updated": 0, "unchanged": 0
+    }
+
+    csv_upload = f"name,quantity\n{prefix} 0,10\n\"{prefix}, new\",1\n"
+    response = test_client.post(
+        "/inventory/import", params={"format": "csv"}, content=csv_upload
+    )
+    assert response.json() == {
+        "status": "success", "added": 1, "updated": 1, "unchanged": 0
+    }
+
+    response = test_client.get("/inventory/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [
+        line for line in response.text.splitlines() if prefix in line
+    ]
+    assert exported[:2] == [
+        f'{{"name":"{prefix} 0","quantity":10}}',
+        f'{{"name":"{prefix} 1","quantity":1}}',
+    ]
+
+    response = test_client.get(
+        "/inventory/export", params={"format": "csv"}
+    )
+    lines = response.text.splitlines()
+    assert lines[0] == "name,quantity"
+    assert f'"{prefix}, new",1' in lines
+
+    response = test_client.post(
+        "/inventory/import",
+        content=f'{{"name": "{prefix} 9", "quantity": 1}}\nnot json\n'
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 2: Invalid JSON.")
+
+    names = [f"{prefix} {i}" for i in (0, 1, 2, 3, 4, 9)]
+    test_client.post("/batch", json={"operations": [
+        {"op": "remove", "name": name} for name in names + [f"{prefix}, new"]
+    ]})
+
+
+def test_search(test_client):
+    test_client.post("/add-item", json={"name": "Searchable Crate",
+                                        "quantity": 4})
+    try:
+        response = test_client.get("/search", params={"q": "able cra"})
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "success",
+            "results": [{"name": "Searchable Crate", "quantity": 4,
+                         "match": "substring"}]
+        }
+        response = test_client.get("/search", params={"q": " "})
+        assert response.status_code == 400
+    finally:
+        test_client.post("/remove-item", json={"name": "Searchable Crate"})
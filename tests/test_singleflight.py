@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from server.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_flight():
+    flights = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def burst():
+        first = await asyncio.gather(
+            *(flights.do("key", work, 21) for _ in range(10))
+        )
+        second = await flights.do("key", work, 21)
+        return first, second
+
+    first, second = asyncio.run(burst())
+    assert first == [42] * 10
+    assert second == 42
+    assert calls == [21, 21]
+
+
+def test_errors_are_shared_and_writes_start_new_flights():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def burst():
+        first = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        flights.invalidate()
+        second = asyncio.ensure_future(flights.do("key", work))
+        third = asyncio.ensure_future(flights.do("key", work))
+        return await asyncio.gather(
+            first, second, third, return_exceptions=True
+        )
+
+    results = asyncio.run(burst())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_flight():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def burst():
+        leader = asyncio.ensure_future(flights.do("key", work))
+        follower = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(burst()) == "done"
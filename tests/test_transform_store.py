@@ -0,0 +1,78 @@
+import threading
+import uuid
+import numpy as np
+import pytest
+from server.transform_store import (
+    record_transforms, get_current_transforms, get_transform_history,
+    decode_record, encode_delta, DEFAULT_STATE, KEYFRAME_INTERVAL
+)
+
+
+def test_delta_record_round_trip():
+    state = DEFAULT_STATE.copy()
+    state[1] = 2.5
+    changed = state != DEFAULT_STATE
+    record = encode_delta(state, changed)
+    assert len(record) == 6
+    assert np.array_equal(decode_record(DEFAULT_STATE, record, False), state)
+
+
+def test_partial_updates_merge_and_no_ops_are_skipped():
+    name = f"object-{uuid.uuid4()}"
+    position = np.array([[1, 2, 3]], dtype=np.float32)
+    assert record_transforms([name], {"position": position}, 1000) == 1
+    assert record_transforms([name], {"position": position}, 2000) == 0
+
+    scale = np.array([[2, 2, 2]], dtype=np.float32)
+    assert record_transforms([name], {"scale": scale}, 3000) == 1
+
+    current = get_current_transforms([name])[name]
+    assert current == {
+        "position": [1, 2, 3], "rotation": [0, 0, 0], "scale": [2, 2, 2],
+        "updated_at": 3000
+    }
+    assert [h["timestamp"] for h in get_transform_history(name)] == [
+        1000, 3000
+    ]
+
+
+def test_history_range_across_keyframes():
+    name = f"object-{uuid.uuid4()}"
+    count = KEYFRAME_INTERVAL * 2 + 10
+    for t in range(count):
+        position = np.array([[t, 0, 0]], dtype=np.float32)
+        record_transforms([name], {"position": position}, t)
+
+    history = get_transform_history(name, start=100, end=110)
+    assert [h["timestamp"] for h in history] == list(range(100, 111))
+    assert [h["position"][0] for h in history] == list(range(100, 111))
+
+
+def test_unknown_object():
+    with pytest.raises(ValueError):
+        get_transform_history("missing-object")
+
+
+def test_concurrent_writes_to_one_object():
+    name = f"object-{uuid.uuid4()}"
+    errors = []
+
+    def move(x):
+        try:
+            position = np.array([[x, x, 0]], dtype=np.float32)
+            record_transforms([name], {"position": position})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=move, args=(x,)) for x in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    history = get_transform_history(name)
+    assert len(history) == 16
+    latest = get_current_transforms([name])[name]
+    assert history[-1]["position"] == latest["position"]
+    assert sorted(h["position"][0] for h in history) == list(range(16))
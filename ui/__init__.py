@@ -1,3 +1,10 @@
-from .gui import app, window
+import importlib
 
-__all__ = ['app', 'window']
+__all__ = ['create_app']
+
+
+def __getattr__(name):
+    # Loaded on first access, so that importing the package does not load Qt
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(".gui", __name__), name)
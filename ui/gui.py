@@ -1,4 +1,8 @@
 import sys
+import json
+import time
+import base64
+import hashlib
 import requests
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QTableWidget, QTableWidgetItem,
@@ -6,15 +10,141 @@ from PyQt6.QtWidgets import (
     QLineEdit, QMenu
 )
 from PyQt6.QtCore import (
-    QThread, pyqtSignal, Qt
+    QThread, QTimer, pyqtSignal, Qt
 )
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # FastAPI server URL
 SERVER_URL = "http://127.0.0.1:8000"
 
+# Magic number opening a dictionary-compressed (dcz) response body
+DCZ_HEADER = b"\x5e\x2a\x4d\x18\x20\x00\x00\x00"
+
+# Seconds to wait before asking again for a dictionary the server lacks
+DICTIONARY_RETRY_INTERVAL = 60
+
+# Milliseconds of typing pause before the search box queries the server
+SEARCH_DELAY_MS = 250
+
+# Search results shown, best matches first
+SEARCH_LIMIT = 50
+
+# Milliseconds during which events asking for a reload are coalesced into
+# one reload
+RELOAD_DELAY_MS = 200
+
+
+class ServerCodec:
+    """
+    Negotiates compact response bodies with the server.
+    msgpack bodies and zstd compression, optionally against the server's
+    trained dictionary, are requested only when the optional msgpack and
+    zstandard packages are installed; otherwise plain JSON is used.
+    """
+
+    def __init__(self):
+        self.dictionary_hash = None
+        self._decompressor = None
+        self._dictionary_decompressor = None
+        self._dictionary_checked = 0
+        if zstandard is not None:
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def load_dictionary(self):
+        """Fetch the server's compression dictionary, if it has one."""
+        if (zstandard is None or self.dictionary_hash is not None
+                or time.monotonic() - self._dictionary_checked
+                < DICTIONARY_RETRY_INTERVAL):
+            return
+        self._dictionary_checked = time.monotonic()
+        try:
+            response = requests.get(
+                f"{SERVER_URL}/codec/dictionary", timeout=10
+            )
+        except requests.exceptions.RequestException:
+            return
+        if response.status_code != 200:
+            return
+        dictionary = zstandard.ZstdCompressionDict(response.content)
+        self._dictionary_decompressor = zstandard.ZstdDecompressor(
+            dict_data=dictionary
+        )
+        self.dictionary_hash = hashlib.sha256(response.content).digest()
+
+    def headers(self):
+        """
+        Build the negotiation headers for a request.
+        Returns:
+            dict: The Accept, Accept-Encoding and Available-Dictionary
+                  headers to send.
+        """
+        headers = {"Accept-Encoding": "identity"}
+        if msgpack is not None:
+            headers["Accept"] = "application/msgpack, application/json;q=0.9"
+        if zstandard is not None:
+            self.load_dictionary()
+            headers["Accept-Encoding"] = "zstd"
+            if self.dictionary_hash is not None:
+                digest = base64.b64encode(self.dictionary_hash).decode()
+                headers["Accept-Encoding"] = "dcz, zstd"
+                headers["Available-Dictionary"] = f":{digest}:"
+        return headers
+
+    def get(self, url, **kwargs):
+        """
+        Send a GET request with the negotiation headers.
+        Args:
+            url (str): The URL to request.
+            **kwargs: Further arguments for `requests.get`.
+        Returns:
+            tuple: The response and its decoded body.
+        """
+        headers = {**self.headers(), **kwargs.pop("headers", {})}
+        response = requests.get(url, headers=headers, stream=True, **kwargs)
+        body = response.raw.read(decode_content=False)
+        return response, self.decode(response, body)
+
+    def decode(self, response, body):
+        """
+        Decode a response body according to its headers.
+        Args:
+            response (requests.Response): The response.
+            body (bytes): The raw body, as sent on the wire.
+        Returns:
+            The parsed JSON or msgpack body, or the body as text if it is
+            neither.
+        """
+        encoding = response.headers.get("Content-Encoding", "identity")
+        if encoding == "dcz":
+            body = self._dictionary_decompressor.decompress(
+                body[len(DCZ_HEADER) + 32:]
+            )
+        elif encoding == "zstd":
+            body = self._decompressor.decompressobj().decompress(body)
+        content_type = response.headers.get("Content-Type", "")
+        if content_type.startswith("application/msgpack"):
+            return msgpack.unpackb(body)
+        if content_type.startswith("application/json"):
+            return json.loads(body)
+        return body.decode(errors="replace")
+
+
+server_codec = ServerCodec()
+
 
 class Worker(QThread):
-    data_ready = pyqtSignal(list)
+    # Items, next page cursor, and the inventory revision they reflect
+    # (-1 if unknown)
+    data_ready = pyqtSignal(list, str, int)
     operation_complete = pyqtSignal(str)
 
     def __init__(self, operation, *args):
@@ -25,12 +155,27 @@ class Worker(QThread):
     def run(self):
         try:
             if self.operation == "get_inventory":
-                response = requests.get(f"{SERVER_URL}/get_inventory")
+                params = self.args[0]
+                response, data = server_codec.get(
+                    f"{SERVER_URL}/get_inventory", params=params
+                )
                 if response.status_code == 200:
-                    inventory = response.json()["inventory"]
-                    self.data_ready.emit(inventory)
+                    self.data_ready.emit(
+                        data["inventory"], data.get("next_cursor") or "",
+                        int(response.headers.get("X-Inventory-Revision", -1))
+                    )
                 else:
-                    self.operation_complete.emit(f"Error: {response.text}")
+                    self.operation_complete.emit(f"Error: {data}")
+
+            elif self.operation == "search":
+                params = self.args[0]
+                response, data = server_codec.get(
+                    f"{SERVER_URL}/search", params=params
+                )
+                if response.status_code == 200:
+                    self.data_ready.emit(data["results"], "", -1)
+                else:
+                    self.operation_complete.emit(f"Error: {data}")
 
             elif self.operation == "update_quantity":
                 name, new_quantity = self.args
@@ -45,6 +190,23 @@ class Worker(QThread):
                 else:
                     self.operation_complete.emit(f"Error: {response.text}")
 
+            elif self.operation == "adjust_quantity":
+                name, delta = self.args
+                response = requests.post(
+                    f"{SERVER_URL}/adjust-quantity",
+                    json={"name": name, "delta": delta, "min": 0}
+                )
+                if response.status_code == 200:
+                    self.operation_complete.emit(
+                        "Quantity updated successfully"
+                    )
+                elif response.status_code == 409:
+                    self.operation_complete.emit(
+                        "Error: Quantity cannot be negative."
+                    )
+                else:
+                    self.operation_complete.emit(f"Error: {response.text}")
+
             elif self.operation == "add_item":
                 name, quantity = self.args
                 response = requests.post(
@@ -75,6 +237,49 @@ class Worker(QThread):
             self.operation_complete.emit(f"Error: {e}")
 
 
+class EventListener(QThread):
+    """Receives inventory change events pushed by the server."""
+    event_received = pyqtSignal(str, dict)
+    # Whether the stream is connected, and why it is not
+    connection_changed = pyqtSignal(bool, str)
+
+    def __init__(self):
+        super().__init__()
+        self.connected = False
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            try:
+                with requests.get(
+                    f"{SERVER_URL}/events", stream=True, timeout=(5, 60)
+                ) as response:
+                    if response.status_code != 200:
+                        raise requests.exceptions.RequestException(
+                            response.text
+                        )
+                    self.connected = True
+                    self.connection_changed.emit(True, "")
+
+                    event = None
+                    for line in response.iter_lines(decode_unicode=True):
+                        if self.isInterruptionRequested():
+                            break
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:") and event:
+                            self.event_received.emit(
+                                event, json.loads(line[5:])
+                            )
+                            event = None
+                error = "Connection closed"
+            except Exception as e:
+                error = str(e)
+                print(f"Inventory event stream error: {e}")
+            self.connected = False
+            self.connection_changed.emit(False, error)
+            self.msleep(5000)
+
+
 class InventoryApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -91,6 +296,18 @@ class InventoryApp(QMainWindow):
         self.search_bar.textChanged.connect(self.filter_table)
         self.layout.addWidget(self.search_bar)
 
+        # Search once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.load_inventory)
+
+        # Reload once for a burst of added or removed items
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(RELOAD_DELAY_MS)
+        self.reload_timer.timeout.connect(self.load_inventory)
+
         # Table
         self.table = QTableWidget()
         self.table.setColumnCount(2)
@@ -101,9 +318,19 @@ class InventoryApp(QMainWindow):
         self.table.customContextMenuRequested.connect(self.show_context_menu)
         self.layout.addWidget(self.table)
 
-        # Pagination
+        # Pagination (keyset cursors returned by the server, one per page)
         self.current_page = 0
         self.items_per_page = 10
+        self.page_cursors = [None]
+        self.next_cursor = None
+        self.inventory = []
+        self.search_text = ""
+        self.revision = None  # Inventory revision of the displayed page
+
+        # Running workers are kept referenced until they finish; only the
+        # latest load may update the table
+        self.workers = set()
+        self.load_worker = None
         self.pagination_layout = QHBoxLayout()
         self.prev_button = QPushButton("Previous")
         self.next_button = QPushButton("Next")
@@ -151,23 +378,76 @@ class InventoryApp(QMainWindow):
             self.handle_update_quantity
         )
 
+        # Server push channel for inventory changes
+        self.event_listener = EventListener()
+        self.event_listener.event_received.connect(self.handle_inventory_event)
+        self.event_listener.connection_changed.connect(
+            self.handle_event_connection
+        )
+        self.event_listener.start()
+
         self.load_inventory()
 
-    def load_inventory(self):
-        self.worker = Worker("get_inventory")
-        self.worker.data_ready.connect(self.update_table)
-        self.worker.operation_complete.connect(self.handle_operation_complete)
-        self.worker.start()
+    def handle_inventory_event(self, event, data):
+        revision = data.get("revision")
+        if (revision is not None and self.revision is not None
+                and revision <= self.revision):
+            return  # Already reflected by the displayed page
+
+        if event == "quantity_changed":
+            # Update the quantity in place if the item is on this page
+            for item in self.inventory:
+                if item["name"] == data["name"]:
+                    item["quantity"] = data["quantity"]
+            for row in range(self.table.rowCount()):
+                if self.table.item(row, 0).text() == data["name"]:
+                    self.table.item(row, 1).setText(str(data["quantity"]))
+        elif event in ("added", "removed", "resync"):
+            if not self.reload_timer.isActive():
+                self.reload_timer.start()
+
+    def handle_event_connection(self, connected, error):
+        if connected:
+            self.statusBar().showMessage("Live updates connected")
+            # Catch up on changes missed while disconnected
+            self.load_inventory()
+        else:
+            self.statusBar().showMessage(
+                f"Live updates disconnected: {error}"
+            )
+
+    def start_worker(self, worker):
+        worker.operation_complete.connect(self.handle_operation_complete)
+        worker.finished.connect(lambda: self.workers.discard(worker))
+        self.workers.add(worker)
+        worker.start()
 
-    def update_table(self, inventory):
-        self.full_inventory = inventory
+    def load_inventory(self):
+        if self.search_text:
+            # Ranked server-side search, showing the best matches only
+            worker = Worker(
+                "search", {"q": self.search_text, "limit": SEARCH_LIMIT}
+            )
+        else:
+            worker = Worker("get_inventory", {
+                "limit": self.items_per_page,
+                "cursor": self.page_cursors[self.current_page],
+            })
+        worker.data_ready.connect(self.update_table)
+        self.load_worker = worker
+        self.start_worker(worker)
+
+    def update_table(self, inventory, next_cursor, revision):
+        if self.sender() is not self.load_worker:
+            return  # Superseded by a later load
+        if revision >= 0:
+            self.revision = revision
         self.inventory = inventory
+        self.next_cursor = next_cursor or None
         self.display_page()
 
     def display_page(self):
-        start = self.current_page * self.items_per_page
-        end = start + self.items_per_page
-        page_items = self.inventory[start:end]
+        page_items = self.inventory
 
         self.table.setRowCount(len(page_items))
         for row, item in enumerate(page_items):
@@ -184,25 +464,22 @@ class InventoryApp(QMainWindow):
             self.table.setItem(row, 1, quantity_item)
 
     def filter_table(self, text):
-        if not text:
-            self.inventory = self.full_inventory
-        else:
-            self.inventory = [
-                item for item in self.full_inventory
-                if text.lower() in item["name"].lower()
-            ]
+        self.search_text = text.strip()
         self.current_page = 0
-        self.display_page()
+        self.page_cursors = [None]
+        self.search_timer.start()
 
     def prev_page(self):
         if self.current_page > 0:
             self.current_page -= 1
-            self.display_page()
+            self.load_inventory()
 
     def next_page(self):
-        if (self.current_page + 1) * self.items_per_page < len(self.inventory):
+        if self.next_cursor:
+            del self.page_cursors[self.current_page + 1:]
+            self.page_cursors.append(self.next_cursor)
             self.current_page += 1
-            self.display_page()
+            self.load_inventory()
 
     def show_context_menu(self, position):
         menu = QMenu()
@@ -226,20 +503,9 @@ class InventoryApp(QMainWindow):
             QMessageBox.warning(self, "No Selection", "Please select an item.")
             return
 
+        # The server applies the delta atomically and rejects negative stock
         item_name = self.table.item(selected_row, 0).text()
-        current_quantity = int(self.table.item(selected_row, 1).text())
-        new_quantity = current_quantity + delta
-
-        if new_quantity < 0:
-            QMessageBox.warning(
-                self,
-                "Invalid Operation", "Quantity cannot be negative."
-            )
-            return
-
-        self.worker = Worker("update_quantity", item_name, new_quantity)
-        self.worker.operation_complete.connect(self.handle_operation_complete)
-        self.worker.start()
+        self.start_worker(Worker("adjust_quantity", item_name, delta))
 
     def handle_add_item(self):
         name, ok = QInputDialog.getText(self, "Add Item", "Enter item name:")
@@ -256,9 +522,7 @@ class InventoryApp(QMainWindow):
         if not ok:
             return
 
-        self.worker = Worker("add_item", name.strip(), quantity)
-        self.worker.operation_complete.connect(self.handle_operation_complete)
-        self.worker.start()
+        self.start_worker(Worker("add_item", name.strip(), quantity))
 
     def handle_remove_item(self):
         selected_row = self.table.currentRow()
@@ -271,9 +535,7 @@ class InventoryApp(QMainWindow):
             return
 
         item_name = self.table.item(selected_row, 0).text()
-        self.worker = Worker("remove_item", item_name)
-        self.worker.operation_complete.connect(self.handle_operation_complete)
-        self.worker.start()
+        self.start_worker(Worker("remove_item", item_name))
 
     def handle_update_quantity(self):
         selected_row = self.table.currentRow()
@@ -293,16 +555,19 @@ class InventoryApp(QMainWindow):
         if not ok:
             return
 
-        self.worker = Worker("update_quantity", item_name, new_quantity)
-        self.worker.operation_complete.connect(self.handle_operation_complete)
-        self.worker.start()
+        self.start_worker(Worker("update_quantity", item_name, new_quantity))
+
+    def closeEvent(self, event):
+        self.event_listener.requestInterruption()
+        super().closeEvent(event)
 
     def handle_operation_complete(self, message):
         if message.startswith("Error"):
             QMessageBox.critical(self, "Error", message)
         else:
             QMessageBox.information(self, "Success", message)
-            self.load_inventory()
+            if not self.event_listener.connected:
+                self.load_inventory()
 
 
 qss = """QTableWidget {
@@ -368,11 +633,26 @@ QPushButton#update_quantity_button:hover {
 """
 
 
-app = QApplication(sys.argv)
-window = InventoryApp()
-app.setStyleSheet(qss)
+def create_app(argv=None):
+    """
+    Build the Qt application and the inventory window.
+    Nothing is created when the module is imported, so importing it stays
+    cheap; the window starts loading the inventory when it is built.
+    Args:
+        argv (list, optional): The command line arguments for Qt. Defaults
+                               to `sys.argv`.
+    Returns:
+        tuple: The QApplication and the InventoryApp window.
+    """
+    app = QApplication.instance() or QApplication(
+        sys.argv if argv is None else argv
+    )
+    app.setStyleSheet(qss)
+    window = InventoryApp()
+    return app, window
 
 
 if __name__ == "__main__":
+    app, window = create_app()
     window.show()
     sys.exit(app.exec())